@@ -25,6 +25,34 @@ apps:
       memory_limit: 1G
       cpu: 200m
       cpu_limit: 200m
+  chain-heads:
+    deployment_enabled: true
+    replica_count: 1
+    service:
+      enabled: false
+    command:
+      - /bin/bash
+      - -c
+      - python3 console.py track-chain-heads
+    resources:
+      memory: 128M
+      memory_limit: 256M
+      cpu: 50m
+      cpu_limit: 100m
+  indexer:
+    deployment_enabled: true
+    replica_count: 1
+    service:
+      enabled: false
+    command:
+      - /bin/bash
+      - -c
+      - python3 console.py run-indexer
+    resources:
+      memory: 256M
+      memory_limit: 512M
+      cpu: 100m
+      cpu_limit: 200m
   launchpad:
     has_hook: true
     deployment_enabled: true
@@ -57,28 +85,6 @@ apps:
 
 cron_enabled: true
 cron:
-  schedule-listen-staking-events:
-    enabled: true
-    schedule: "*/1 * * * *"
-    concurrency_policy: Forbid
-    restart_policy: OnFailure
-    pass_env: true
-    command:
-      - /bin/sh
-    args:
-      - "-c"
-      - "python3 console.py listen-staking-events"
-  schedule-listen-blp-staking-events:
-    enabled: true
-    schedule: "* * * * *"
-    concurrency_policy: Forbid
-    restart_policy: OnFailure
-    pass_env: true
-    command:
-      - /bin/sh
-    args:
-      - "-c"
-      - "python3 console.py listen-blp-staking-events"
   schedule-monitor-onramp-balance:
     enabled: true
     schedule: "*/7 * * * *"
@@ -101,17 +107,6 @@ cron:
     args:
       - "-c"
       - "python3 console.py update-project-total-raised"
-  schedule-process-launchpad-contract-events:
-    enabled: true
-    schedule: "*/15 * * * *"
-    concurrency_policy: Forbid
-    restart_policy: OnFailure
-    pass_env: true
-    command:
-      - /bin/sh
-    args:
-      - "-c"
-      - "python3 console.py process-launchpad-contract-events"
   schedule-process-launchpad-multichain-contract-events:
     enabled: true
     schedule: "*/5 * * * *"
@@ -167,6 +162,17 @@ cron:
     args:
       - "-c"
       - "python3 console.py change-projects-status"
+  schedule-rebuild-leaderboard:
+    enabled: true
+    schedule: "17 * * * *"
+    concurrency_policy: Forbid
+    restart_policy: OnFailure
+    pass_env: true
+    command:
+      - /bin/sh
+    args:
+      - "-c"
+      - "python3 console.py rebuild-leaderboard"
 
 env:
   APP_ENV: dev
@@ -0,0 +1,17 @@
+from app.cache.codec import CacheEntry
+from app.cache.entities import user_entity
+from app.cache.two_tier import two_tier_cache
+from app.cache.values import (
+    CachedValue,
+    CachedHash,
+    EntityLayout,
+    TtlPolicy,
+    NO_EXPIRATION,
+    IntCodec,
+    FloatCodec,
+    TextCodec,
+    JsonCodec,
+    DataclassCodec,
+    get_all,
+    set_all,
+)
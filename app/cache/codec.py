@@ -0,0 +1,58 @@
+"""
+Cache entries are stored as msgpack arrays [version, updated_at, expires_at, data].
+The version is set by the owner of the key and bumped when the shape of the data
+changes: entries of other versions are treated as missing, so a deploy never reads
+values written by the previous one. msgpack keeps int dict keys, unlike json.
+Integers out of 64-bit range (wei amounts) are packed as an extension type.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+import msgpack
+
+
+_BIG_INT_EXT_CODE = 1
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, int):
+        size = (value.bit_length() + 8) // 8
+        return msgpack.ExtType(_BIG_INT_EXT_CODE, value.to_bytes(size, "big", signed=True))
+    raise TypeError(f"Can't cache {type(value)}: {value!r:.100}")
+
+
+def _decode_ext(code: int, data: bytes) -> Any:
+    if code == _BIG_INT_EXT_CODE:
+        return int.from_bytes(data, "big", signed=True)
+    return msgpack.ExtType(code, data)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    data: Any
+    # wall clock time when the data was loaded
+    updated_at: float
+    # wall clock time when the data should be loaded again
+    expires_at: float
+
+
+def encode_entry(entry: CacheEntry, version: int) -> bytes:
+    return msgpack.packb(
+        [version, entry.updated_at, entry.expires_at, entry.data], default=_encode_default
+    )
+
+
+def decode_entry(raw: bytes | None, version: int) -> CacheEntry | None:
+    if not raw:
+        return None
+    try:
+        entry_version, updated_at, expires_at, data = msgpack.unpackb(
+            raw, strict_map_key=False, ext_hook=_decode_ext
+        )
+    except (ValueError, TypeError, msgpack.UnpackException):
+        # written in another format, e.g. json by an older release
+        return None
+    if entry_version != version:
+        return None
+    return CacheEntry(data=data, updated_at=updated_at, expires_at=expires_at)
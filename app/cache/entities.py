@@ -0,0 +1,11 @@
+from datetime import timedelta
+
+from app.cache.values import EntityLayout
+
+
+def _get_user_key(address: str) -> str:
+    return f"user_cache_{address.lower()}"
+
+
+# per-user values live for 3 minutes at most, the hash outlives every one of them
+user_entity = EntityLayout("user", key=_get_user_key, ttl=timedelta(minutes=10))
@@ -0,0 +1,44 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LocalCache:
+    """
+    Bounded LRU of values in process memory.
+    Every value has its own expiration time, expired values are dropped when read.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        # key -> (value, wall clock time when the value expires)
+        self._values: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        if (cached := self._values.get(key)) is None:
+            self.misses += 1
+            return None
+        value, expires_at = cached
+        if expires_at <= time.time():
+            del self._values[key]
+            self.misses += 1
+            return None
+        self._values.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:  # noqa: A003
+        if expires_at <= time.time():
+            return
+        self._values[key] = (value, expires_at)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {"size": len(self._values), "hits": self.hits, "misses": self.misses}
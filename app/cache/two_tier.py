@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app.env import settings
+from app.cache.codec import CacheEntry, encode_entry, decode_entry
+from app.cache.local import LocalCache
+from app.redis import hash_tag, mget
+
+
+class TwoTierCache:
+    """
+    Values in redis with a bounded LRU of fresh values in front of it in process memory.
+    Every value is kept twice in redis: fresh one at `{key}` and long-lived one at
+    `{key}:long`, which is served when the data can't be loaded. Both are read in one
+    round trip, the hash tag keeps them in one Redis Cluster slot.
+    A local copy never outlives the fresh value in redis.
+    Local values are kept encoded, so every reader decodes its own copy.
+    """
+
+    def __init__(self, local: LocalCache) -> None:
+        self.local = local
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.long_hits = 0
+
+    @staticmethod
+    def _get_redis_key(key: str) -> str:
+        return hash_tag(key)
+
+    @staticmethod
+    def _get_long_key(key: str) -> str:
+        return f"{hash_tag(key)}:long"
+
+    async def get(
+        self, redis: Redis, key: str, version: int = 1
+    ) -> tuple[CacheEntry | None, CacheEntry | None]:
+        """Returns the fresh entry and, if there is none, the long-lived one"""
+        if (entry := decode_entry(self.local.get(key), version)) is not None:
+            return entry, None
+
+        raw, raw_long = await redis.mget(self._get_redis_key(key), self._get_long_key(key))
+        if (entry := decode_entry(raw, version)) is not None:
+            self.redis_hits += 1
+            self.local.set(key, raw, entry.expires_at)
+            return entry, None
+        self.redis_misses += 1
+        if (long_entry := decode_entry(raw_long, version)) is not None:
+            self.long_hits += 1
+        return None, long_entry
+
+    async def prefetch(self, redis: Redis, keys: list[str], version: int = 1) -> None:
+        """Reads fresh values of many keys with one MGET (per slot) into process memory"""
+        if not keys:
+            return
+        for key, raw in zip(keys, await mget(redis, [self._get_redis_key(x) for x in keys])):
+            if (entry := decode_entry(raw, version)) is not None:
+                self.local.set(key, raw, entry.expires_at)
+
+    async def get_fresh(self, redis: Redis, key: str, version: int = 1) -> CacheEntry | None:
+        entry, _ = await self.get(redis, key, version)
+        return entry
+
+    async def get_long(self, redis: Redis, key: str, version: int = 1) -> CacheEntry | None:
+        if (entry := decode_entry(await redis.get(self._get_long_key(key)), version)) is not None:
+            self.long_hits += 1
+        return entry
+
+    async def set(  # noqa: A003
+        self,
+        redis: Redis,
+        key: str,
+        data: Any,
+        exp_seconds: int,
+        long_exp_minutes: int,
+        version: int = 1,
+    ) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(data=data, updated_at=now, expires_at=now + exp_seconds)
+        raw = encode_entry(entry, version)
+        await (
+            redis.pipeline(transaction=False)
+            .set(self._get_redis_key(key), raw, ex=timedelta(seconds=exp_seconds))
+            .set(self._get_long_key(key), raw, ex=timedelta(minutes=long_exp_minutes))
+            .execute()
+        )
+        self.local.set(key, raw, entry.expires_at)
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "long_hits": self.long_hits,
+            },
+        }
+
+
+two_tier_cache = TwoTierCache(local=LocalCache(max_size=settings.local_cache_max_size))
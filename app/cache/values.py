@@ -0,0 +1,390 @@
+"""
+Declarative values in redis. Every kind of cached value is declared once with its key,
+codec and TTL policy:
+
+    n_referrals_cache = CachedValue(
+        "n_referrals", key=_get_n_referrals_key, codec=IntCodec(), ttl=timedelta(minutes=1)
+    )
+    await n_referrals_cache.set(10, address)
+    await n_referrals_cache.get(address)
+
+Reads and writes of many values, even of different kinds, take one round trip.
+Values of an entity (declared with `entity=`, the first key argument is the entity id)
+may be packed into one small hash of the entity instead of a key per value.
+"""
+
+import dataclasses
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Generic, Hashable, Iterable, ParamSpec, Protocol, TypeVar
+
+from redis.asyncio import Redis
+
+from app.base import logger
+from app.env import settings
+from app.redis import redis_cli as default_redis_cli, mget, atomic_pipeline, is_cluster
+
+P = ParamSpec("P")
+V = TypeVar("V")
+
+# every declared value of the process, for stats
+cached_values: list["_CachedKind"] = []
+
+
+class Codec(Protocol[V]):
+    def encode(self, value: V) -> str | bytes:
+        """Value as it is written to redis"""
+
+    def decode(self, raw: bytes) -> V:
+        """Value from what was read from redis"""
+
+
+class IntCodec:
+    def encode(self, value: int) -> str:
+        return str(value)
+
+    def decode(self, raw: bytes) -> int:
+        return int(raw)
+
+
+class FloatCodec:
+    def encode(self, value: float) -> str:
+        return repr(float(value))
+
+    def decode(self, raw: bytes) -> float:
+        return float(raw)
+
+
+class TextCodec:
+    def encode(self, value: str) -> str:
+        return value
+
+    def decode(self, raw: bytes) -> str:
+        return raw.decode()
+
+
+class JsonCodec:
+    def encode(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class DataclassCodec(Generic[V]):
+    def __init__(self, cls: type[V]) -> None:
+        self.cls = cls
+
+    def encode(self, value: V) -> str:
+        return json.dumps(dataclasses.asdict(value))
+
+    def decode(self, raw: bytes) -> V:
+        return self.cls(**json.loads(raw))
+
+
+@dataclass(frozen=True)
+class TtlPolicy:
+    ttl: timedelta | None
+    # values set together expire over ttl * (1 ± jitter) instead of all at once
+    jitter: float = 0.0
+
+    def get_ttl_ms(self) -> int | None:
+        if self.ttl is None:
+            return None
+        ttl_ms = self.ttl.total_seconds() * 1000
+        if self.jitter:
+            ttl_ms *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(int(ttl_ms), 1)
+
+
+NO_EXPIRATION = TtlPolicy(ttl=None)
+
+
+@dataclass(frozen=True)
+class EntityLayout:
+    """
+    Cached values of one entity (e.g. a user) packed into one hash, a field per value,
+    when CACHE_COMPACT_ENTITIES is on. A key costs ~70 bytes of redis overhead (more with
+    a TTL), while a small hash is stored as one listpack. Redis expires whole keys only,
+    so a field keeps its expiration time in front of the value ("{expires_at_ms}|{value}")
+    and expired fields are read as missing. The hash lives for `ttl` after the last write,
+    it must be longer than TTLs of its values.
+    """
+
+    name: str
+    key: Callable[[str], str]
+    ttl: timedelta
+
+    def get_ttl_ms(self) -> int:
+        return int(self.ttl.total_seconds() * 1000)
+
+
+_FIELD_SEPARATOR = b"|"
+
+
+def _pack_field(encoded: str | bytes, ttl_ms: int | None) -> bytes:
+    if isinstance(encoded, str):
+        encoded = encoded.encode()
+    # 0 never expires
+    expires_at_ms = int(time.time() * 1000) + ttl_ms if ttl_ms is not None else 0
+    return b"%d%s%s" % (expires_at_ms, _FIELD_SEPARATOR, encoded)
+
+
+def _unpack_field(raw: bytes | None) -> bytes | None:
+    if raw is None:
+        return None
+    expires_at_ms, _, encoded = raw.partition(_FIELD_SEPARATOR)
+    if (expires_at_ms := int(expires_at_ms)) and expires_at_ms <= time.time() * 1000:
+        return None
+    return encoded
+
+
+@dataclass(frozen=True)
+class Location:
+    """A key of a value, or a field of an entity hash"""
+
+    key: str
+    field: str | None = None
+
+
+class _CachedKind(Generic[P, V]):
+    def __init__(
+        self,
+        name: str,
+        key: Callable[P, str],
+        codec: Codec[V],
+        ttl: TtlPolicy | timedelta | None,
+        redis_cli: Redis | None = None,
+        entity: EntityLayout | None = None,
+    ) -> None:
+        self.name = name
+        self._get_key = key
+        self.codec = codec
+        self.ttl = ttl if isinstance(ttl, TtlPolicy) else TtlPolicy(ttl=ttl)
+        self.redis_cli = redis_cli or default_redis_cli
+        self.entity = entity
+
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.decode_errors = 0
+        cached_values.append(self)
+
+    def key(self, *args: P.args, **kwargs: P.kwargs) -> str:
+        return self._get_key(*args, **kwargs)
+
+    @property
+    def is_compact(self) -> bool:
+        return self.entity is not None and settings.cache_compact_entities
+
+    def _get_location(self, args: tuple, kwargs: dict, field: Hashable | None = None) -> Location:
+        """
+        Where the value is stored. In the compact layout the first argument is the entity id,
+        the other ones (and the field of a hash) are joined to the name of the value.
+        """
+        if not self.is_compact:
+            return Location(self._get_key(*args, **kwargs), None if field is None else str(field))
+        entity_id, *rest = args
+        parts = [self.name, *rest, *kwargs.values()]
+        if field is not None:
+            parts.append(field)
+        return Location(self.entity.key(entity_id), ":".join(map(str, parts)))
+
+    def _check_not_compact(self) -> None:
+        if self.is_compact:
+            raise TypeError(f"CachedValue[{self.name}]: is stored in {self.entity.name} hashes")
+
+    def _decode(self, raw: bytes | None) -> V | None:
+        if raw is None:
+            self.misses += 1
+            return None
+        try:
+            value = self.codec.decode(raw)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"CachedValue[{self.name}]: can't decode {raw!r:.100}: {e}")
+            self.decode_errors += 1
+            return None
+        self.hits += 1
+        return value
+
+    def _decode_field(self, raw: bytes | None) -> V | None:
+        return self._decode(_unpack_field(raw) if self.is_compact else raw)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "compact": self.is_compact,
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "decode_errors": self.decode_errors,
+        }
+
+
+class CachedValue(_CachedKind[P, V]):
+    """A kind of values in redis: how the key is built, how the value is encoded, its TTL"""
+
+    def bind(self, *args: P.args, **kwargs: P.kwargs) -> "BoundValue[V]":
+        return BoundValue(self, self._get_location(args, kwargs))
+
+    def _get_to_pipeline(self, pipe: Any, location: Location) -> None:
+        if location.field is None:
+            pipe.get(location.key)
+        else:
+            pipe.hget(location.key, location.field)
+
+    def _set_to_pipeline(self, pipe: Any, location: Location, value: V) -> None:
+        self.sets += 1
+        encoded = self.codec.encode(value)
+        if location.field is None:
+            pipe.set(location.key, encoded, px=self.ttl.get_ttl_ms())
+            return
+        pipe.hset(location.key, location.field, _pack_field(encoded, self.ttl.get_ttl_ms()))
+        pipe.pexpire(location.key, self.entity.get_ttl_ms())
+
+    async def get(self, *args: P.args, **kwargs: P.kwargs) -> V | None:
+        location = self._get_location(args, kwargs)
+        if location.field is None:
+            return self._decode(await self.redis_cli.get(location.key))
+        return self._decode_field(await self.redis_cli.hget(location.key, location.field))
+
+    async def set(self, value: V, *args: P.args, **kwargs: P.kwargs) -> None:  # noqa: A003
+        location = self._get_location(args, kwargs)
+        if location.field is None:
+            self.sets += 1
+            await self.redis_cli.set(
+                location.key, self.codec.encode(value), px=self.ttl.get_ttl_ms()
+            )
+            return
+        async with atomic_pipeline(self.redis_cli) as pipe:
+            self._set_to_pipeline(pipe, location, value)
+            await pipe.execute()
+
+    async def delete(self, *args: P.args, **kwargs: P.kwargs) -> None:
+        location = self._get_location(args, kwargs)
+        if location.field is None:
+            await self.redis_cli.delete(location.key)
+        else:
+            await self.redis_cli.hdel(location.key, location.field)
+
+    async def get_many(self, keys: Iterable[str]) -> list[V | None]:
+        """Values of keys built with `key()`, in the same order, with one MGET per slot"""
+        self._check_not_compact()
+        if not (keys := list(keys)):
+            return []
+        return [self._decode(raw) for raw in await mget(self.redis_cli, keys)]
+
+    async def set_many(self, values_by_key: dict[str, V]) -> None:
+        """
+        Sets values of keys built with `key()` with one MSET,
+        followed by PEXPIRE of every key in the same transaction if the values expire.
+        MSET can't span cluster slots: in a cluster, keys are grouped by slot with one MSET
+        per slot, or SET one by one in a pipeline if the values expire.
+        """
+        self._check_not_compact()
+        if not values_by_key:
+            return
+        self.sets += len(values_by_key)
+        encoded = {key: self.codec.encode(value) for key, value in values_by_key.items()}
+        if self.ttl.ttl is None:
+            if is_cluster(self.redis_cli):
+                await self.redis_cli.mset_nonatomic(encoded)
+            else:
+                await self.redis_cli.mset(encoded)
+            return
+        if is_cluster(self.redis_cli):
+            async with self.redis_cli.pipeline() as pipe:
+                for key, value in encoded.items():
+                    pipe.set(key, value, px=self.ttl.get_ttl_ms())
+                await pipe.execute()
+            return
+        async with atomic_pipeline(self.redis_cli) as pipe:
+            pipe.mset(encoded)
+            for key in encoded:
+                pipe.pexpire(key, self.ttl.get_ttl_ms())
+            await pipe.execute()
+
+
+class CachedHash(_CachedKind[P, V]):
+    """
+    A kind of redis hashes: fields of one entity (e.g. balances of an address by chain)
+    which are read with one HMGET and are set and expire together.
+    In the compact layout, the fields are stored in the hash of the entity.
+    """
+
+    async def get(
+        self, fields: Iterable[Hashable], *args: P.args, **kwargs: P.kwargs
+    ) -> dict[Hashable, V]:
+        """Cached values of the fields, missing fields are left out"""
+        if not (fields := list(fields)):
+            return {}
+        locations = [self._get_location(args, kwargs, field) for field in fields]
+        raws = await self.redis_cli.hmget(locations[0].key, [x.field for x in locations])
+        res = {}
+        for field, raw in zip(fields, raws):
+            if (value := self._decode_field(raw)) is not None:
+                res[field] = value
+        return res
+
+    async def set(  # noqa: A003
+        self, values_by_field: dict[Hashable, V], *args: P.args, **kwargs: P.kwargs
+    ) -> None:
+        if not values_by_field:
+            return
+        self.sets += len(values_by_field)
+        ttl_ms = self.ttl.get_ttl_ms()
+        mapping = {}
+        for field, value in values_by_field.items():
+            location = self._get_location(args, kwargs, field)
+            encoded = self.codec.encode(value)
+            mapping[location.field] = _pack_field(encoded, ttl_ms) if self.is_compact else encoded
+        if self.is_compact:
+            ttl_ms = self.entity.get_ttl_ms()
+        async with atomic_pipeline(self.redis_cli) as pipe:
+            pipe.hset(location.key, mapping=mapping)
+            if ttl_ms is not None:
+                pipe.pexpire(location.key, ttl_ms)
+            await pipe.execute()
+
+    async def delete(self, *args: P.args, **kwargs: P.kwargs) -> None:
+        self._check_not_compact()
+        await self.redis_cli.delete(self._get_key(*args, **kwargs))
+
+
+@dataclass(frozen=True)
+class BoundValue(Generic[V]):
+    """A value of a CachedValue at a specific location"""
+
+    cached_value: CachedValue[..., V]
+    location: Location
+
+
+async def get_all(*values: BoundValue, redis_cli: Redis | None = None) -> list[Any]:
+    """
+    Gets values of different kinds in the same order, with one MGET (per slot in a cluster),
+    or with one pipeline if some of them are stored in entity hashes.
+    """
+    if not values:
+        return []
+    redis_cli = redis_cli or default_redis_cli
+    if all(value.location.field is None for value in values):
+        raws = await mget(redis_cli, [value.location.key for value in values])
+        return [value.cached_value._decode(raw) for value, raw in zip(values, raws)]
+    async with redis_cli.pipeline(transaction=False) as pipe:
+        for value in values:
+            value.cached_value._get_to_pipeline(pipe, value.location)
+        raws = await pipe.execute()
+    return [value.cached_value._decode_field(raw) for value, raw in zip(values, raws)]
+
+
+async def set_all(*items: tuple[BoundValue[V], V], redis_cli: Redis | None = None) -> None:
+    """Sets values of different kinds with one pipeline"""
+    if not items:
+        return
+    async with (redis_cli or default_redis_cli).pipeline(transaction=False) as pipe:
+        for bound, value in items:
+            bound.cached_value._set_to_pipeline(pipe, bound.location, value)
+        await pipe.execute()
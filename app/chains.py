@@ -36,6 +36,11 @@ polygon_mumbai = ChainInfo(
     name="Polygon Mumbai",
     is_testnet=True,
 )
+polygon_amoy = ChainInfo(
+    id=ChainId(80002),
+    name="Polygon Amoy",
+    is_testnet=True,
+)
 base = ChainInfo(
     id=ChainId(8453),
     name="Base",
@@ -77,3 +82,12 @@ base_sepolia = ChainInfo(
     name="Base Testnet",
     is_testnet=True,
 )
+
+# networks used instead of mainnets when CRYPTO_ENVIRONMENT is testnet
+testnet_by_mainnet_chain_id: dict[ChainId, ChainInfo] = {
+    ethereum.id: ethereum_sepolia,
+    bsc.id: bsc_testnet,
+    polygon.id: polygon_amoy,
+    blast.id: blast_sepolia,
+    base.id: base_sepolia,
+}
@@ -1,4 +1,4 @@
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,14 +12,32 @@ class HistoryBlpStakingCrud(BaseCrud[HistoryBlpStake]):
         super().__init__(session, HistoryBlpStake)
 
     async def add_history(self, params: CreateBlpHistoryStake) -> None:
-        values = params.dict()
-        values["user_address"] = values["user_address"].lower()
-        st = (
-            insert(HistoryBlpStake)
-            .values(values)
-            .on_conflict_do_nothing(constraint="ux_stake_blp_history_txn_hash")
+        await self.add_histories([params])
+
+    async def add_histories(self, params: list[CreateBlpHistoryStake]) -> None:
+        """Inserts rows in bulk, rows of already saved transactions are skipped"""
+        values = []
+        for x in params:
+            row = x.dict()
+            row["user_address"] = row["user_address"].lower()
+            values.append(row)
+        # postgres allows up to 32767 parameters in a statement
+        for i in range(0, len(values), 1000):
+            st = (
+                insert(HistoryBlpStake)
+                .values(values[i : i + 1000])
+                .on_conflict_do_nothing(constraint="ux_stake_blp_history_txn_hash")
+            )
+            await self.session.execute(st)
+
+    async def delete_after_block(self, chain_id: int, pool_id: int, block_number: int) -> None:
+        await self.session.execute(
+            delete(HistoryBlpStake).where(
+                HistoryBlpStake.chain_id == str(chain_id),
+                HistoryBlpStake.pool_id == pool_id,
+                HistoryBlpStake.block_number > block_number,
+            )
         )
-        await self.session.execute(st)
 
     async def count_participants(self) -> int:
         query = select(
@@ -1,4 +1,4 @@
-from sqlalchemy import select, func, Sequence
+from sqlalchemy import select, func, Sequence, delete
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,15 +12,31 @@ class HistoryStakingCrud(BaseCrud[HistoryStake]):
         super().__init__(session, HistoryStake)
 
     async def add_history(self, params: CreateHistoryStake) -> None:
-        values = params.dict()
-        values["user_address"] = values["user_address"].lower()
-        values["token_address"] = values["token_address"].lower()
-        st = (
-            insert(HistoryStake)
-            .values(values)
-            .on_conflict_do_nothing(constraint="ux_stake_history_txn_hash")
+        await self.add_histories([params])
+
+    async def add_histories(self, params: list[CreateHistoryStake]) -> None:
+        """Inserts rows in bulk, rows of already saved transactions are skipped"""
+        values = []
+        for x in params:
+            row = x.dict()
+            row["user_address"] = row["user_address"].lower()
+            row["token_address"] = row["token_address"].lower()
+            values.append(row)
+        # postgres allows up to 32767 parameters in a statement
+        for i in range(0, len(values), 1000):
+            st = (
+                insert(HistoryStake)
+                .values(values[i : i + 1000])
+                .on_conflict_do_nothing(constraint="ux_stake_history_txn_hash")
+            )
+            await self.session.execute(st)
+
+    async def delete_after_block(self, chain_id: int, block_number: int) -> None:
+        await self.session.execute(
+            delete(HistoryStake).where(
+                HistoryStake.chain_id == str(chain_id), HistoryStake.block_number > block_number
+            )
         )
-        await self.session.execute(st)
 
     async def get_history(self, user_address: str, page: int, size: int) -> Sequence[HistoryStake]:
         offset = (page - 1) * size
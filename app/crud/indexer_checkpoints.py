@@ -0,0 +1,77 @@
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base import BaseCrud
+from app.models import IndexerCheckpoint
+
+
+class IndexerCheckpointsCrud(BaseCrud[IndexerCheckpoint]):
+    # enough to find the fork point of any reorg deeper than the confirmation blocks
+    KEEP_CHECKPOINTS = 100
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, IndexerCheckpoint)
+
+    async def get_last(self, chain_id: int, stream: str) -> IndexerCheckpoint | None:
+        checkpoints = await self.get_recent(chain_id, stream, limit=1)
+        return checkpoints[0] if checkpoints else None
+
+    async def get_recent(self, chain_id: int, stream: str, limit: int) -> list[IndexerCheckpoint]:
+        """The last checkpoints of the stream, the newest first"""
+        st = (
+            select(IndexerCheckpoint)
+            .where(IndexerCheckpoint.chain_id == chain_id, IndexerCheckpoint.stream == stream)
+            .order_by(IndexerCheckpoint.block_number.desc())
+            .limit(limit)
+        )
+        return list((await self.session.scalars(st)).all())
+
+    async def get_block_number(self, chain_id: int, stream: str) -> int | None:
+        checkpoint = await self.get_last(chain_id, stream)
+        return checkpoint.block_number if checkpoint else None
+
+    async def add(
+        self, chain_id: int, stream: str, block_number: int, block_hash: str | None = None
+    ) -> None:
+        st = insert(IndexerCheckpoint).values(
+            chain_id=chain_id,
+            stream=stream,
+            block_number=block_number,
+            block_hash=block_hash,
+            updated_at=func.now(),
+        )
+        await self.session.execute(
+            st.on_conflict_do_update(
+                index_elements=[
+                    IndexerCheckpoint.chain_id,
+                    IndexerCheckpoint.stream,
+                    IndexerCheckpoint.block_number,
+                ],
+                set_={"block_hash": st.excluded.block_hash, "updated_at": func.now()},
+            )
+        )
+        oldest_kept = (
+            select(IndexerCheckpoint.block_number)
+            .where(IndexerCheckpoint.chain_id == chain_id, IndexerCheckpoint.stream == stream)
+            .order_by(IndexerCheckpoint.block_number.desc())
+            .offset(self.KEEP_CHECKPOINTS - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+        await self.session.execute(
+            delete(IndexerCheckpoint).where(
+                IndexerCheckpoint.chain_id == chain_id,
+                IndexerCheckpoint.stream == stream,
+                IndexerCheckpoint.block_number < oldest_kept,
+            )
+        )
+
+    async def delete_after_block(self, chain_id: int, stream: str, block_number: int) -> None:
+        await self.session.execute(
+            delete(IndexerCheckpoint).where(
+                IndexerCheckpoint.chain_id == chain_id,
+                IndexerCheckpoint.stream == stream,
+                IndexerCheckpoint.block_number > block_number,
+            )
+        )
@@ -1,9 +1,9 @@
-from sqlalchemy import select, text
+from sqlalchemy import select, text, delete
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
 from app.base import BaseCrud
-from app.models import LaunchpadContractEvents
+from app.models import LaunchpadContractEvents, LaunchpadEventProjectType
 from app.schema import CreateLaunchpadEvent
 
 
@@ -17,16 +17,47 @@ class LaunchpadContractEventsCrud(BaseCrud[LaunchpadContractEvents]):
         return result
 
     async def add_event(self, params: CreateLaunchpadEvent):
-        values = params.dict()
-        values["user_address"] = values["user_address"].lower()
-        if values.get("token_address") is not None:
-            values["token_address"] = values["token_address"].lower()
-        st = (
-            insert(LaunchpadContractEvents)
-            .values(values)
-            .on_conflict_do_nothing(constraint="ux_launchpad_contract_events_txn_hash")
+        await self.add_events([params])
+
+    async def add_events(self, params: list[CreateLaunchpadEvent]) -> set[str]:
+        """
+        Inserts rows in bulk, rows of already saved transactions are skipped.
+        Returns hashes of the transactions whose rows are inserted.
+        """
+        values = []
+        for x in params:
+            row = x.dict()
+            row["user_address"] = row["user_address"].lower()
+            if row.get("token_address") is not None:
+                row["token_address"] = row["token_address"].lower()
+            values.append(row)
+        saved_txn_hashes = set()
+        # postgres allows up to 32767 parameters in a statement
+        for i in range(0, len(values), 1000):
+            st = (
+                insert(LaunchpadContractEvents)
+                .values(values[i : i + 1000])
+                .on_conflict_do_nothing(constraint="ux_launchpad_contract_events_txn_hash")
+                .returning(LaunchpadContractEvents.txn_hash)
+            )
+            saved_txn_hashes.update((await self.session.execute(st)).scalars())
+        return saved_txn_hashes
+
+    async def delete_after_block(
+        self,
+        chain_id: int,
+        block_number: int,
+        project_type: LaunchpadEventProjectType,
+        project_id: str | None = None,
+    ) -> None:
+        query = delete(LaunchpadContractEvents).where(
+            LaunchpadContractEvents.chain_id == chain_id,
+            LaunchpadContractEvents.project_type == project_type,
+            LaunchpadContractEvents.block_number > block_number,
         )
-        await self.session.execute(st)
+        if project_id is not None:
+            query = query.where(LaunchpadContractEvents.project_id == project_id)
+        await self.session.execute(query)
 
     async def get_tier_by_user_address_and_contract_project_id(
         self, conn: AsyncConnection
@@ -1,5 +1,6 @@
 import json
 from datetime import datetime
+from decimal import Decimal
 from typing import Sequence
 
 import dateutil.parser as dt
@@ -101,7 +102,9 @@ class ProfilesCrud(BaseCrud[Profile]):
         rank = result.scalars().one_or_none()
         return rank or 0
 
-    async def get_top_by_points(self, limit: int = 100) -> Sequence[LeaderboardData]:
+    async def get_top_by_points(
+        self, limit: int = 100, offset: int = 0
+    ) -> Sequence[LeaderboardData]:
         referral_subquery = (
             select(Profile.referrer, func.count(Profile.id).label("users_invited"))
             .group_by(Profile.referrer)
@@ -116,6 +119,7 @@ class ProfilesCrud(BaseCrud[Profile]):
             )
             .outerjoin(referral_subquery, Profile.address == referral_subquery.c.referrer)
             .order_by(Profile.points.desc())
+            .offset(offset)
             .limit(limit)
         )
         result = await self.session.execute(query)
@@ -132,6 +136,26 @@ class ProfilesCrud(BaseCrud[Profile]):
             )
         return leaderboard_data_results
 
+    async def get_points_after_id(
+        self, after_id: int, limit: int
+    ) -> Sequence[tuple[int, str, Decimal]]:
+        """(id, address, points) of profiles ordered by id, for reading all of them in pages"""
+        query = await self.session.execute(
+            select(Profile.id, Profile.address, Profile.points)
+            .where(Profile.id > after_id)
+            .order_by(Profile.id)
+            .limit(limit)
+        )
+        return query.tuples().all()
+
+    async def count_referrals_by_referrer(self) -> dict[str, int]:
+        query = await self.session.execute(
+            select(Profile.referrer, func.count(Profile.id))
+            .where(Profile.referrer.is_not(None))
+            .group_by(Profile.referrer)
+        )
+        return {referrer: n_referrals for referrer, n_referrals in query.tuples()}
+
     async def get_total_points(self) -> float:
         query = await self.session.execute(select(func.sum(Profile.points)))
         return float(query.scalars().one_or_none() or 0)
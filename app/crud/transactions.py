@@ -28,7 +28,8 @@ class TransactionsCrud(BaseCrud[Transaction]):
 
     async def add_transaction(
         self, params: CreateLaunchpadTransactionParams, session: AsyncSession | None = None
-    ) -> None:
+    ) -> bool:
+        """Returns False if the transaction is already saved"""
         values = params.dict()
         values["user_address"] = values["user_address"].lower()
         if values.get("token_address"):
@@ -41,7 +42,9 @@ class TransactionsCrud(BaseCrud[Transaction]):
             insert(Transaction)
             .values(values)
             .on_conflict_do_nothing(constraint="ux_transactions_txn_hash")
+            .returning(Transaction.id)
         )
         session = session or self.session
-        await session.execute(st)
+        res = await session.execute(st)
         await session.flush()
+        return res.scalar_one_or_none() is not None
@@ -8,6 +8,7 @@ from app.base import async_session
 from app.crud import OnRampCrud, LaunchpadProjectCrud
 from app.crud.history_blp_staking import HistoryBlpStakingCrud
 from app.crud.history_staking import HistoryStakingCrud
+from app.crud.indexer_checkpoints import IndexerCheckpointsCrud
 from app.crud.launchpad_events import LaunchpadContractEventsCrud
 from app.crud.points import PointsHistoryCrud, ExtraPointsCrud
 from app.crud.profiles import ProfilesCrud
@@ -119,6 +120,12 @@ async def get_transactions_crud(session: AsyncSession = Depends(get_session)) ->
     return TransactionsCrud(session)
 
 
+async def get_indexer_checkpoints_crud(
+    session: AsyncSession = Depends(get_session),
+) -> IndexerCheckpointsCrud:
+    return IndexerCheckpointsCrud(session)
+
+
 TransactionsCrudDep = Annotated[TransactionsCrud, Depends(get_transactions_crud)]
 
 RefcodesCrudDep = Annotated[RefcodesCrud, Depends(get_refcodes_crud)]
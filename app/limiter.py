@@ -1,6 +1,34 @@
 from slowapi import Limiter
 
 from app.env import settings
+from app.limiter_storage import LocalFirstRedisStorage
 from app.utils import get_ip_from_request
 
-limiter = Limiter(key_func=get_ip_from_request, storage_uri=str(settings.redis_url))
+
+def _get_storage_uri() -> str:
+    redis_url = str(settings.redis_url)
+    if settings.redis_cluster:
+        # limits discovers the other nodes of the cluster
+        redis_url = redis_url.replace("redis://", "redis+cluster://", 1)
+    if settings.rate_limit_local_first:
+        return f"local+{redis_url}"
+    return redis_url
+
+
+def _get_storage_options() -> dict:
+    if settings.rate_limit_local_first:
+        return {"sync_interval_ms": settings.rate_limit_sync_ms}
+    return {}
+
+
+limiter = Limiter(
+    key_func=get_ip_from_request,
+    storage_uri=_get_storage_uri(),
+    storage_options=_get_storage_options(),
+)
+
+
+def get_limiter_stats() -> dict:
+    if isinstance(storage := limiter._storage, LocalFirstRedisStorage):
+        return storage.stats()
+    return {}
@@ -0,0 +1,168 @@
+"""
+Local-first storage of rate limits for slowapi (fixed window strategy).
+
+Hits are counted in process memory and a request never waits for redis. A background
+thread sends the hits counted since the last sync to redis every RATE_LIMIT_SYNC_MS
+and reads back the counts of all workers. A worker sees the hits of the other workers
+with a delay of one sync, so a limit is exceeded at most by the hits the other workers
+get during one sync interval. If redis is down, limits are counted per worker.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import redis
+from limits.storage import Storage
+from redis.cluster import RedisCluster
+
+from app.base import logger
+
+# the same keys as in limits.storage.RedisStorage
+_KEY_PREFIX = "LIMITS"
+_CLUSTER_SCHEME = "local+redis+cluster://"
+
+
+@dataclass
+class _Counter:
+    expiry: int
+    expires_at: float
+    # count of all workers at the last sync, including the hits of this one
+    synced: int = 0
+    # hits of this worker which haven't been sent yet
+    pending: int = 0
+
+
+class LocalFirstRedisStorage(Storage):
+    STORAGE_SCHEME = ["local+redis", "local+rediss", "local+redis+cluster"]
+
+    def __init__(
+        self,
+        uri: str,
+        wrap_exceptions: bool = False,
+        sync_interval_ms: float = 100,
+        **options: float | str | bool,
+    ) -> None:
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        if uri.startswith(_CLUSTER_SCHEME):
+            self.storage = RedisCluster.from_url(uri.replace(_CLUSTER_SCHEME, "redis://", 1))
+        else:
+            self.storage = redis.from_url(uri.removeprefix("local+"))
+        self.sync_interval = float(sync_interval_ms) / 1000
+
+        self._counters: dict[str, _Counter] = {}
+        self._sync_thread: threading.Thread | None = None
+        # the thread doesn't survive a fork of the worker
+        self._sync_thread_pid: int | None = None
+
+        self.syncs = 0
+        self.sync_errors = 0
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return redis.RedisError
+
+    @staticmethod
+    def _get_redis_key(key: str) -> str:
+        return f"{_KEY_PREFIX}:{key}"
+
+    def _ensure_syncing(self) -> None:
+        pid = os.getpid()
+        if self._sync_thread_pid == pid and self._sync_thread and self._sync_thread.is_alive():
+            return
+        self._sync_thread_pid = pid
+        self._sync_thread = threading.Thread(
+            target=self._sync_forever, name="rate-limit-sync", daemon=True
+        )
+        self._sync_thread.start()
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        with self.lock:
+            counter = self._counters.get(key)
+            if counter is None or counter.expires_at <= now:
+                counter = self._counters[key] = _Counter(expiry=expiry, expires_at=now + expiry)
+            elif elastic_expiry:
+                counter.expires_at = now + expiry
+            counter.pending += amount
+            self._ensure_syncing()
+            return counter.synced + counter.pending
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            counter = self._counters.get(key)
+            if counter is None or counter.expires_at <= time.time():
+                return 0
+            return counter.synced + counter.pending
+
+    def get_expiry(self, key: str) -> int:
+        with self.lock:
+            counter = self._counters.get(key)
+            return int(counter.expires_at if counter else time.time())
+
+    def check(self) -> bool:
+        try:
+            return bool(self.storage.ping())
+        except redis.RedisError:
+            return False
+
+    def reset(self) -> int | None:
+        with self.lock:
+            self._counters.clear()
+        keys = list(self.storage.scan_iter(match=f"{_KEY_PREFIX}:*"))
+        for key in keys:
+            self.storage.delete(key)
+        return len(keys)
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self._counters.pop(key, None)
+        self.storage.delete(self._get_redis_key(key))
+
+    def _sync_forever(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                # pending hits are kept and sent with the next sync
+                self.sync_errors += 1
+                logger.warning(f"Rate limits: sync error: {e}")
+
+    def sync(self) -> None:
+        """Sends pending hits of the live windows and reads back the counts of all workers"""
+        now = time.time()
+        with self.lock:
+            for key in [key for key, x in self._counters.items() if x.expires_at <= now]:
+                del self._counters[key]
+            sent = [(key, x, x.pending) for key, x in self._counters.items()]
+        if not sent:
+            return
+
+        pipe = self.storage.pipeline(transaction=False)
+        for key, _, pending in sent:
+            pipe.incrby(self._get_redis_key(key), pending)
+            pipe.pttl(self._get_redis_key(key))
+        results = pipe.execute()
+        counts, ttls_ms = results[::2], results[1::2]
+
+        # a new window in redis: INCRBY has created the key without a TTL
+        pipe = self.storage.pipeline(transaction=False)
+        for (key, counter, _), ttl_ms in zip(sent, ttls_ms):
+            if ttl_ms < 0:
+                pipe.expire(self._get_redis_key(key), counter.expiry)
+        pipe.execute()
+
+        now = time.time()
+        with self.lock:
+            for (key, counter, pending), count, ttl_ms in zip(sent, counts, ttls_ms):
+                counter.synced = int(count)
+                counter.pending -= pending
+                # the window of all workers is the one in redis
+                if self._counters.get(key) is counter and ttl_ms > 0:
+                    counter.expires_at = now + ttl_ms / 1000
+        self.syncs += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"counters": len(self._counters), "syncs": self.syncs, "errors": self.sync_errors}
@@ -502,3 +502,20 @@ class BalanceSync(Base):
     should_be_synced = Column(
         Boolean, server_default="true", default=True, nullable=False, index=True
     )
+
+
+class IndexerCheckpoint(Base):
+    """
+    Recent checkpoints of a stream of logs: indexing continues after the last one,
+    and after a reorg from the last one whose block is still in the chain.
+    """
+
+    __tablename__ = "indexer_checkpoints"
+
+    chain_id = Column(BigIntegerType, primary_key=True)
+    stream = Column(Text(), primary_key=True)
+    # the last block whose logs are saved
+    block_number = Column(BigIntegerType, primary_key=True)
+    block_hash = Column(Text(), nullable=True)
+
+    updated_at = Column(DateTime(), nullable=False, default=func.now(), onupdate=func.now())
@@ -1,5 +1,49 @@
+from typing import Any
+
 from redis.asyncio import from_url, Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.cluster import ClusterPipeline, RedisCluster
 
 from app.env import settings
 
-redis_cli: Redis = from_url(str(settings.redis_url))
+
+def _create_redis_cli() -> Redis | RedisCluster:
+    if settings.redis_cluster:
+        # the other nodes and the slot map are discovered through REDIS_URL
+        return RedisCluster.from_url(str(settings.redis_url))
+    return from_url(str(settings.redis_url))
+
+
+redis_cli: Redis | RedisCluster = _create_redis_cli()
+
+
+def hash_tag(value: Any) -> str:
+    """
+    Only the part of a key in braces is hashed by Redis Cluster:
+    keys with the same tag are in the same slot and can be used in one multi-key command.
+    """
+    return f"{{{value}}}"
+
+
+def is_cluster(redis: Redis | RedisCluster) -> bool:
+    return isinstance(redis, RedisCluster)
+
+
+async def mget(redis: Redis | RedisCluster, keys: list[str]) -> list[bytes | None]:
+    """
+    Values of the keys in the same order. In a cluster, keys are grouped by slot
+    and every group is read with its own MGET, groups of a node are sent in one pipeline.
+    """
+    if is_cluster(redis):
+        return await redis.mget_nonatomic(keys)
+    return await redis.mget(keys)
+
+
+def atomic_pipeline(redis: Redis | RedisCluster) -> Pipeline | ClusterPipeline:
+    """
+    MULTI/EXEC pipeline. A cluster has no transactions in redis-py, commands are sent
+    in order in one pipeline per node instead, which is enough for writes of a cache.
+    """
+    if is_cluster(redis):
+        return redis.pipeline()
+    return redis.pipeline(transaction=True)
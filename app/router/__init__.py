@@ -4,6 +4,14 @@ from fastapi import APIRouter, Depends
 from redis.asyncio import Redis
 
 from app.dependencies import get_redis
+from app.services.rpc.providers import provider_registry
+from app.cache import two_tier_cache
+from app.cache.values import cached_values
+from app.limiter import get_limiter_stats
+from app.services.dataloader import dataloaders
+from app.services.indexer.contracts import blast_log_indexer
+from app.services.indexer.redis_cli import indexer_stats_cache
+from app.services.web3_nodes import web3_node
 from .v1.router import router as v1router
 
 
@@ -40,3 +48,40 @@ async def get_current_rpm(redis: Redis = Depends(get_redis)):
             "max": max(*stats) if len(stats) > 1 else 0,
         },
     }
+
+
+@router.get("/internal/rpc-pools")
+async def get_rpc_pools_stats():
+    return {"ok": True, "data": provider_registry.stats()}
+
+
+@router.get("/internal/rpc-endpoints")
+async def get_rpc_endpoints_stats():
+    return {"ok": True, "data": web3_node.stats()}
+
+
+@router.get("/internal/dataloaders")
+async def get_dataloaders_stats():
+    return {"ok": True, "data": [loader.stats() for loader in dataloaders]}
+
+
+@router.get("/internal/cache")
+async def get_cache_stats():
+    return {
+        "ok": True,
+        "data": {
+            **two_tier_cache.stats(),
+            "values": [cached_value.stats() for cached_value in cached_values],
+        },
+    }
+
+
+@router.get("/internal/rate-limits")
+async def get_rate_limits_stats():
+    return {"ok": True, "data": get_limiter_stats()}
+
+
+@router.get("/internal/indexer")
+async def get_indexer_stats():
+    chain_id = web3_node.get_network_chain_id(network="blast")
+    return {"ok": True, "data": await indexer_stats_cache.get(chain_id, blast_log_indexer.name)}
@@ -7,6 +7,7 @@ from fastapi_pagination import Page
 from starlette.responses import JSONResponse
 from web3 import Web3
 
+from app.cache import two_tier_cache, get_all
 from app.consts import NATIVE_TOKEN_ADDRESS
 from app.dependencies import (
     LaunchpadProjectCrudDep,
@@ -40,10 +41,14 @@ from app.schema import (
 )
 from app.services.balances.blastup_balance import get_blastup_tokens_balance_for_chains
 from app.services.blp_staking.reward import get_blp_staking_daily_reward_for_user
+from app.services.ido_staking.cache import user_tvl_cache
 from app.services.ido_staking.tvl import get_ido_staking_daily_reward_for_user
+from app.services.leaderboard import leaderboard_redis
+from app.services.leaderboard.leaderboard import get_leaderboard_rank, get_leaderboard_page
 from app.services.prices import get_tokens_price_for_chain, get_any2any_prices
-from app.services.prices.cache import token_price_cache
-from app.services.referral_system.referrals import get_n_referrals
+from app.services.prices.cache import token_price_updated_at_cache
+from app.services.referral_system.cache import n_referrals_cache
+from app.services.referral_system.referrals import count_n_referrals
 from app.services.tiers.consts import (
     bronze_tier,
     silver_tier,
@@ -109,6 +114,25 @@ async def get_user_info(
     if (profile := await profile_crud.first_by_address(address)) is None:
         return JSONResponse(content={"ok": False, "error": "Profile not found"}, status_code=404)
 
+    # cached values of the user are read at once, only misses are loaded below
+    (cached_n_referrals, cached_locked_amount), _ = await asyncio.gather(
+        get_all(n_referrals_cache.bind(address), user_tvl_cache.bind(address)),
+        two_tier_cache.prefetch(
+            redis,
+            [
+                f"blp_staked_balance_{address.lower()}",
+                f"balance_by_chain_id_{address.lower()}",
+                f"ido_daily_reward_{address.lower()}",
+                f"blp_daily_reward_{address.lower()}",
+            ],
+        ),
+    )
+
+    async def get_n_referrals() -> int:
+        if cached_n_referrals is not None:
+            return cached_n_referrals
+        return await count_n_referrals(address, profile_crud)
+
     # Retrieve user's tier based on BLP staking value
     # We check BLPStaking and LockedBLPStaking contracts
     blp_staked_balance = await get_data_with_cache(
@@ -130,11 +154,11 @@ async def get_user_info(
     refcode, n_referrals, leaderboard_rank, ido_daily_reward, blp_daily_reward = (
         await asyncio.gather(
             refcodes_crud.generate_refcode_if_not_exists(address),
-            get_n_referrals(address, profile_crud),
-            profile_crud.get_leaderboard_rank(address),
+            get_n_referrals(),
+            get_leaderboard_rank(address, profile_crud),
             get_data_with_cache(
                 key=f"ido_daily_reward_{address.lower()}",
-                func=partial(get_ido_staking_daily_reward_for_user, address),
+                func=partial(get_ido_staking_daily_reward_for_user, address, cached_locked_amount),
                 redis=redis,
             ),
             get_data_with_cache(
@@ -209,6 +233,7 @@ async def save_referrer_for_user(
     if not (profile := await profile_crud.first_by_address(address)):
         # create new profile with referrer
         await profile_crud.get_or_create_profile(address=address, referrer=referrer.address)
+        await leaderboard_redis.add_referral(referrer.address)
         return SaveReferrerResponse(ok=True)
 
     if profile.referrer:
@@ -217,6 +242,7 @@ async def save_referrer_for_user(
         )
 
     await profile_crud.update_referrer(address=address, referrer=referrer.address)
+    await leaderboard_redis.add_referral(referrer.address)
     return SaveReferrerResponse(ok=True)
 
 
@@ -235,12 +261,16 @@ async def get_yield_percentage(redis: RedisDep) -> YieldPercentageResponse:
             func=get_native_yield,
             redis=redis,
             short_key_exp_seconds=60 * 5,
+            lease=True,
+            stale_while_revalidate=True,
         ),
         get_data_with_cache(
             key="stablecoin_yield_apr",
             func=get_stablecoin_yield,
             redis=redis,
             short_key_exp_seconds=60 * 5,
+            lease=True,
+            stale_while_revalidate=True,
         ),
     )
     return YieldPercentageResponse(native=native_yield, stablecoin=stablecoin_yield)
@@ -264,20 +294,28 @@ async def get_user_projects(
 
 
 @router.get("/supported-tokens")
-async def get_supported_tokens(tokens_crud: SupportedTokensCrudDep):
-    last_updated_at, rows = await asyncio.gather(
-        token_price_cache.get_token_price_cache_updated_at(), tokens_crud.get_supported_tokens()
+async def get_supported_tokens(tokens_crud: SupportedTokensCrudDep, redis: RedisDep):
+    async def get_token_addresses_by_chain_id() -> dict[int, list[str]]:
+        token_addresses_by_chain_id = {}
+        for row in await tokens_crud.get_supported_tokens():
+            token_addresses_by_chain_id.setdefault(row.chain_id, []).append(row.token_address)
+        return token_addresses_by_chain_id
+
+    last_updated_at, token_addresses_by_chain_id = await asyncio.gather(
+        token_price_updated_at_cache.get(),
+        get_data_with_cache("supported_tokens", get_token_addresses_by_chain_id, redis),
     )
-    token_addresses_by_chain_id = {}
-    for row in rows:
-        token_addresses_by_chain_id.setdefault(row.chain_id, []).append(row.token_address)
-
     return {"tokens": token_addresses_by_chain_id, "cache_updated_at": last_updated_at}
 
 
 @router.get("/leaderboard", response_model=LeaderboardResponse | ErrorResponse)
 @limiter.limit("5/minute")
 @limiter.limit("1/second")
-async def leaderboard(request: Request, profile_crud: ProfileCrudDep):
-    results = await profile_crud.get_top_by_points()
+async def leaderboard(
+    request: Request,
+    profile_crud: ProfileCrudDep,
+    page: int = Query(default=1, ge=1),
+    size: int = Query(default=100, ge=1, le=100),
+):
+    results = await get_leaderboard_page(page, size, profile_crud)
     return LeaderboardResponse(data=results)
@@ -2,8 +2,10 @@ from typing import Annotated
 
 from fastapi import APIRouter, Header, HTTPException, Path, Request
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_403_FORBIDDEN
 
+from app.base import engine
 from app.dependencies import (
     AddPointsDep,
     LaunchpadProjectCrudDep,
@@ -38,6 +40,7 @@ async def get_total_points_for_all_profiles(
             key="total_profile_points",
             func=profiles_crud.get_total_points,
             redis=redis,
+            lease=True,
         )
         if total_points is None:
             return GetTotalPointsResponse(error="Can't get total points")
@@ -80,20 +83,25 @@ async def add_points(
 
                 project_id = project.id
 
-            await service.add_points(
-                address=operation.address,
-                amount=operation.amount,
-                operation_type=operation.operation_type,
-                project_id=project_id,
-                operation_reason=operation.operation_reason,
-                create_profile_if_not_exists=True,
-                utm=operation.utm,
-                language=operation.language,
-                first_login=operation.first_login,
-                browser=operation.browser,
-            )
+            # every operation is committed on its own, then its points go to the leaderboard
+            async with AsyncSession(engine) as session, session.begin():
+                await service.add_points(
+                    address=operation.address,
+                    amount=operation.amount,
+                    operation_type=operation.operation_type,
+                    project_id=project_id,
+                    operation_reason=operation.operation_reason,
+                    create_profile_if_not_exists=True,
+                    utm=operation.utm,
+                    language=operation.language,
+                    first_login=operation.first_login,
+                    browser=operation.browser,
+                    session=session,
+                )
+            await service.update_leaderboard()
             operations_results.append(AddPointsOperationData(address=operation.address, ok=True))
         except Exception as e:
+            service.discard_leaderboard_points()
             operations_results.append(
                 AddPointsOperationData(
                     address=operation.address,
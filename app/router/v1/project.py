@@ -26,31 +26,44 @@ async def list_launchpad_projects(
     redis: RedisDep,
     status: Optional[StatusProject] = Query(None, description="Filter projects by status"),
 ):
-    projects_resp: list[LaunchpadProjectList] = []
-    projects = await projects_crud.all(status=status)
-    for project in projects:
-        if project.proxy_link:
+    async def get_projects() -> list[dict]:
+        projects_resp: list[LaunchpadProjectList] = []
+        projects = await projects_crud.all(status=status)
+        for project in projects:
+            if project.proxy_link:
 
-            async def get_proxy_data():
-                async with AsyncClient(timeout=30.0) as client:
-                    response = await client.get(
-                        f"{project.proxy_link.base_url}/crypto/total-balance"  # noqa
-                    )
-                    return response.json()
+                # bound now: a stale value is revalidated after the loop has moved on
+                async def get_proxy_data(base_url: str = project.proxy_link.base_url):
+                    async with AsyncClient(timeout=30.0) as client:
+                        response = await client.get(f"{base_url}/crypto/total-balance")
+                        return response.json()
 
-            total_balance = await get_data_with_cache(
-                f"projects-list-raised-data:{project.slug}", get_proxy_data, redis
-            )
-            if total_balance:
-                project.raised = total_balance.get("data", {}).get("usd", "0")
+                total_balance = await get_data_with_cache(
+                    f"projects-list-raised-data:{project.slug}",
+                    get_proxy_data,
+                    redis,
+                    stale_while_revalidate=True,
+                )
+                if total_balance:
+                    project.raised = total_balance.get("data", {}).get("usd", "0")
 
-        try:
-            projects_resp.append(LaunchpadProjectList.parse_obj(project))
-        except ValidationError as exc:
-            logger.error(f"Can't parse LaunchpadProjectList in /list: {exc}")
-            continue
+            try:
+                projects_resp.append(LaunchpadProjectList.parse_obj(project))
+            except ValidationError as exc:
+                logger.error(f"Can't parse LaunchpadProjectList in /list: {exc}")
+                continue
+        return [project.model_dump(mode="json") for project in projects_resp]
 
-    return {"ok": True, "data": {"projects": projects_resp}}
+    # the list is the same for every request, mostly served from process memory
+    projects = await get_data_with_cache(
+        f"projects-list:{status.value if status else 'all'}",
+        get_projects,
+        redis,
+        short_key_exp_seconds=10,
+    )
+    if projects is None:
+        return InternalServerError("Failed to get projects")
+    return {"ok": True, "data": {"projects": projects}}
 
 
 @router.get("/{id_or_slug}", response_model=LaunchpadProjectResponse | ErrorResponse)
@@ -71,7 +84,10 @@ async def retrieve_launchpad_project(
                     return response.json()
 
             total_balance = await get_data_with_cache(
-                f"projects-list-raised-data:{project.slug}", get_proxy_data, redis
+                f"projects-list-raised-data:{project.slug}",
+                get_proxy_data,
+                redis,
+                stale_while_revalidate=True,
             )
             if total_balance:
                 project.raised = total_balance.get("data", {}).get("usd")
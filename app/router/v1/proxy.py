@@ -58,7 +58,11 @@ async def get_project_data(
             return None
 
     project_data = await get_data_with_cache(
-        f"project-proxy-data:{id_or_slug}", get_proxy_data, redis
+        f"project-proxy-data:{id_or_slug}",
+        get_proxy_data,
+        redis,
+        lease=True,
+        stale_while_revalidate=True,
     )
 
     if not project_data:
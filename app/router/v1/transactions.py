@@ -10,7 +10,7 @@ from app.models import ProjectType
 from app.schema import StoreTransactionRequest, StoreTransactionResponse
 from app.services.launchpad.utils import get_crypto_contracts
 from app.tasks import (
-    monitor_and_save_launchpad_events,
+    index_and_save_contract_events,
     monitor_and_save_multichain_launchpad_events,
 )
 from app.utils import get_data_with_cache
@@ -61,12 +61,11 @@ async def store_transaction(
         if receipt["to"].lower() != settings.launchpad_contract_address.lower():
             return StoreTransactionResponse(ok=False, error="Invalid recipient")
 
-        monitor_and_save_launchpad_events.apply_async(
+        index_and_save_contract_events.apply_async(
             kwargs={
                 "from_block": block_number,
                 "to_block": block_number,
                 "chain_id": payload.chain_id,
-                "project_id": project.id,
             },
             countdown=1,
         )
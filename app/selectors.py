@@ -1,7 +1,12 @@
 from eth_utils import encode_hex, function_abi_to_4byte_selector
-from web3._utils.abi import get_abi_output_types
 
-from app.abi import LAUNCHPAD_PLACE_TOKENS_ABI, TRY_AGGREGATE_ABI, LAUNCHPAD_USERS_ABI
+from app.abi import (
+    LAUNCHPAD_PLACE_TOKENS_ABI,
+    TRY_AGGREGATE_ABI,
+    LAUNCHPAD_USERS_ABI,
+    BLP_BALANCE_ABI,
+)
+from app.services.abi_codec import StaticAbiFunction
 from app.services.blp_staking.abi import BLP_STAKING_USERS_ABI
 from app.services.ido_staking.abi import STAKING_USER_INFO_ABI, STAKING_TOTAL_SUPPLY_ABI
 
@@ -10,10 +15,13 @@ def encode_hex_fn_abi(fn_abi):
     return encode_hex(function_abi_to_4byte_selector(fn_abi))
 
 
-placed_tokens_selector = encode_hex_fn_abi(LAUNCHPAD_PLACE_TOKENS_ABI)
-users_selector = encode_hex_fn_abi(LAUNCHPAD_USERS_ABI)
-staking_user_info_selector = encode_hex_fn_abi(STAKING_USER_INFO_ABI)
-blp_staking_users_selector = encode_hex_fn_abi(BLP_STAKING_USERS_ABI)
-staking_total_supply_selector = encode_hex_fn_abi(STAKING_TOTAL_SUPPLY_ABI)
+# precompiled encoders and decoders of functions called in multicall loops
+placed_tokens_fn = StaticAbiFunction(LAUNCHPAD_PLACE_TOKENS_ABI)
+users_fn = StaticAbiFunction(LAUNCHPAD_USERS_ABI)
+staking_user_info_fn = StaticAbiFunction(STAKING_USER_INFO_ABI)
+blp_staking_users_fn = StaticAbiFunction(BLP_STAKING_USERS_ABI)
+staking_total_supply_fn = StaticAbiFunction(STAKING_TOTAL_SUPPLY_ABI)
+# balanceOf(address) of the blp staking oracle has the same signature
+balance_of_fn = StaticAbiFunction(BLP_BALANCE_ABI[0])
+
 try_aggregate_selector = encode_hex_fn_abi(TRY_AGGREGATE_ABI)
-try_aggregate_output_types = get_abi_output_types(TRY_AGGREGATE_ABI)
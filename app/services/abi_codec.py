@@ -0,0 +1,187 @@
+"""
+Fast path for ABI encoding and decoding in multicall loops.
+Functions with static arguments and return values (address, bool, (u)intN, bytesN)
+have a fixed layout: every value takes one 32-byte word at a known offset, so calls
+are packed and results are unpacked with plain byte operations instead of eth_abi.
+Other functions, e.g. with arrays or nested tuples, are still encoded by eth_abi.
+"""
+
+import re
+from typing import Any, Callable, Iterable
+
+from eth_abi import decode, encode
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils.abi import collapse_if_tuple
+
+_WORD = 32
+_ZERO_PADDING = bytes(12)
+
+
+def _encode_address(value: str) -> bytes:
+    address = bytes.fromhex(value[2:] if value[:2] in ("0x", "0X") else value)
+    if len(address) != 20:
+        raise ValueError(f"Invalid address: {value}")
+    return _ZERO_PADDING + address
+
+
+def _encode_uint(value: int) -> bytes:
+    return value.to_bytes(_WORD, "big")
+
+
+def _encode_int(value: int) -> bytes:
+    return value.to_bytes(_WORD, "big", signed=True)
+
+
+def _encode_bool(value: bool) -> bytes:
+    return _encode_uint(1 if value else 0)
+
+
+def _encode_fixed_bytes(value: bytes) -> bytes:
+    if len(value) > _WORD:
+        raise ValueError(f"Value is too long: {value!r}")
+    return value.ljust(_WORD, b"\0")
+
+
+def _decode_address(word: bytes) -> str:
+    # the same lowercase form eth_abi returns
+    return "0x" + word[12:].hex()
+
+
+def _decode_uint(word: bytes) -> int:
+    return int.from_bytes(word, "big")
+
+
+def _decode_int(word: bytes) -> int:
+    return int.from_bytes(word, "big", signed=True)
+
+
+def _decode_bool(word: bytes) -> bool:
+    return word[-1] == 1
+
+
+def _get_word_codec(abi_type: str) -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    if abi_type == "address":
+        return _encode_address, _decode_address
+    if abi_type == "bool":
+        return _encode_bool, _decode_bool
+    # the whole type has to match: arrays (uint256[], uint256[2]) take more than a word
+    if re.fullmatch(r"uint\d*", abi_type):
+        return _encode_uint, _decode_uint
+    if re.fullmatch(r"int\d*", abi_type):
+        return _encode_int, _decode_int
+    if match := re.fullmatch(r"bytes(\d+)", abi_type):
+        size = int(match[1])
+        return _encode_fixed_bytes, lambda word: word[:size]
+    raise ValueError(f"{abi_type} has no fixed layout")
+
+
+def _get_output_types(fn_abi: dict) -> list[str]:
+    outputs = fn_abi["outputs"]
+    # a single struct is returned as a tuple of its fields
+    if len(outputs) == 1 and outputs[0]["type"] == "tuple":
+        outputs = outputs[0]["components"]
+    return [output["type"] for output in outputs]
+
+
+class StaticAbiFunction:
+    """
+    Encoder of calls and decoder of results for a function with fixed layout.
+    A function without it falls back to eth_abi, its output size is the size of the head only.
+    """
+
+    def __init__(self, fn_abi: dict) -> None:
+        self.selector = function_abi_to_4byte_selector(fn_abi)
+        self._input_types = [collapse_if_tuple(x) for x in fn_abi["inputs"]]
+        self._output_types = [collapse_if_tuple(x) for x in fn_abi["outputs"]]
+        output_types = _get_output_types(fn_abi)
+        self._is_struct_output = self._output_types == [f"({','.join(output_types)})"]
+        self._output_size = _WORD * len(output_types)
+        self._is_static = True
+        try:
+            self._encoders = [_get_word_codec(abi_type)[0] for abi_type in self._input_types]
+            self._decoders = [_get_word_codec(abi_type)[1] for abi_type in output_types]
+        except ValueError:
+            self._is_static = False
+
+    @property
+    def is_static(self) -> bool:
+        return self._is_static
+
+    def encode_call(self, *args: Any) -> bytes:
+        if len(args) != len(self._input_types):
+            raise TypeError(f"Expected {len(self._input_types)} arguments, got {len(args)}")
+        if not self._is_static:
+            return self.selector + encode(self._input_types, args)
+        return self.selector + b"".join(
+            encode_word(arg) for encode_word, arg in zip(self._encoders, args)
+        )
+
+    def decode_output(self, data: bytes) -> tuple:
+        if len(data) < self._output_size:
+            raise ValueError(f"Expected {self._output_size} bytes, got {len(data)}")
+        if not self._is_static:
+            values = decode(self._output_types, data)
+            return values[0] if self._is_struct_output else values
+        return tuple(
+            decode_word(data[i * _WORD : (i + 1) * _WORD])
+            for i, decode_word in enumerate(self._decoders)
+        )
+
+    @property
+    def output_size(self) -> int:
+        return self._output_size
+
+
+def encode_try_aggregate(
+    selector: bytes, require_success: bool, calls: Iterable[tuple[str, bytes]]
+) -> bytes:
+    """Encodes tryAggregate(bool,(address,bytes)[]) call"""
+    heads, tails = [], []
+    offset = 0
+    calls = list(calls)
+    # tuples are dynamic: the array is a list of offsets followed by the tuples
+    tail_start = _WORD * len(calls)
+    for target, call_data in calls:
+        heads.append(_encode_uint(tail_start + offset))
+        padded_len = (len(call_data) + _WORD - 1) // _WORD * _WORD
+        tail = b"".join(
+            (
+                _encode_address(target),
+                _encode_uint(2 * _WORD),  # offset of callData inside the tuple
+                _encode_uint(len(call_data)),
+                call_data.ljust(padded_len, b"\0"),
+            )
+        )
+        tails.append(tail)
+        offset += len(tail)
+    return b"".join(
+        (
+            selector,
+            _encode_bool(require_success),
+            _encode_uint(2 * _WORD),  # offset of the array
+            _encode_uint(len(calls)),
+            *heads,
+            *tails,
+        )
+    )
+
+
+def decode_try_aggregate(data: bytes) -> list[tuple[bool, bytes]]:
+    """Decodes (bool,bytes)[] returned by tryAggregate"""
+    view = memoryview(data)
+    if len(data) < 2 * _WORD:
+        raise ValueError("Malformed tryAggregate result")
+    array_start = _decode_uint(view[:_WORD]) + _WORD
+    length = _decode_uint(view[array_start - _WORD : array_start])
+    results = []
+    for i in range(length):
+        head = array_start + i * _WORD
+        item_start = array_start + _decode_uint(view[head : head + _WORD])
+        success = view[item_start + _WORD - 1] == 1
+        data_offset = _decode_uint(view[item_start + _WORD : item_start + 2 * _WORD])
+        bytes_start = item_start + data_offset
+        size = _decode_uint(view[bytes_start : bytes_start + _WORD])
+        if bytes_start + _WORD + size > len(data):
+            raise ValueError("Malformed tryAggregate result")
+        results.append((success, bytes(view[bytes_start + _WORD : bytes_start + _WORD + size])))
+    return results
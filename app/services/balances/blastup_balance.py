@@ -18,9 +18,7 @@ async def get_blastup_tokens_balance_for_chains(address: str) -> dict[ChainId, i
     }
     _chain_id_to_chain = {_chain_to_chain_id[chain]: chain for chain in _chain_to_chain_id}
 
-    balance_in_cache = await blastup_balance_redis.get(
-        address=address, chain_ids=_chain_to_chain_id.values()
-    )
+    balance_in_cache = await blastup_balance_redis.get(_chain_to_chain_id.values(), address)
     if len(balance_in_cache) == len(_chain_to_chain_id):
         # balances for all chains are in cache
         return balance_in_cache
@@ -37,7 +35,7 @@ async def get_blastup_tokens_balance_for_chains(address: str) -> dict[ChainId, i
     res = dict(zip(chain_ids_via_blockchain, balances))
     res.update(balance_in_cache)
     if res:
-        await blastup_balance_redis.set(address, res)
+        await blastup_balance_redis.set(res, address)
     return res
 
 
@@ -45,6 +43,6 @@ async def get_blp_balance(address: str) -> int:
     if (balance := await blp_balance_redis.get(address)) is None:
         crypto = get_launchpad_crypto()
         balance = await crypto.get_total_blp_balance(address)
-        await blp_balance_redis.set(address, balance)
+        await blp_balance_redis.set(balance, address)
 
     return int(Web3.from_wei(balance, "ether"))
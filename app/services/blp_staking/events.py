@@ -0,0 +1,69 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3.types import EventData
+
+from app.crud.history_blp_staking import HistoryBlpStakingCrud
+from app.crud.profiles import ProfilesCrud
+from app.models import HistoryBlpStakeType
+from app.schema import CreateBlpHistoryStake
+from app.services.indexer import LogBatch
+
+
+async def save_stake_events(batch: LogBatch, events: list[EventData], pool_id: int) -> None:
+    await HistoryBlpStakingCrud(batch.session).add_histories(
+        [
+            CreateBlpHistoryStake(
+                type=HistoryBlpStakeType.STAKE,
+                amount=str(event.args["amount"]),
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+                user_address=event.args["user"],
+                pool_id=pool_id,
+            )
+            for event in events
+        ]
+    )
+    # save new profiles if not exist
+    profile_crud = ProfilesCrud(batch.session)
+    for user_address in dict.fromkeys(event.args["user"] for event in events):
+        await profile_crud.get_or_create_profile(address=user_address)
+
+
+async def save_claim_rewards_events(batch: LogBatch, events: list[EventData], pool_id: int) -> None:
+    await HistoryBlpStakingCrud(batch.session).add_histories(
+        [
+            CreateBlpHistoryStake(
+                type=HistoryBlpStakeType.CLAIM_REWARDS,
+                amount=str(event.args["amount"]),
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+                user_address=event.args["user"],
+                pool_id=pool_id,
+            )
+            for event in events
+        ]
+    )
+
+
+async def save_unstake_events(batch: LogBatch, events: list[EventData], pool_id: int) -> None:
+    await HistoryBlpStakingCrud(batch.session).add_histories(
+        [
+            CreateBlpHistoryStake(
+                type=HistoryBlpStakeType.UNSTAKE,
+                amount=str(event.args["amount"]),
+                user_address=event.args["user"],
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+                pool_id=pool_id,
+            )
+            for event in events
+        ]
+    )
+
+
+async def delete_events_after_block(
+    session: AsyncSession, chain_id: int, block_number: int, pool_id: int
+) -> None:
+    await HistoryBlpStakingCrud(session).delete_after_block(chain_id, pool_id, block_number)
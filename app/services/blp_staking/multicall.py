@@ -1,95 +1,110 @@
-from eth_utils import add_0x_prefix
-from web3._utils.contracts import encode_abi
+from web3.exceptions import ContractLogicError
+from web3.types import BlockIdentifier
 
-from app.abi import TRY_AGGREGATE_ABI
-from app.consts import MULTICALL_ADDRESS
-from app.selectors import (
-    blp_staking_users_selector,
-    try_aggregate_selector,
-    try_aggregate_output_types,
-)
-from app.services.blp_staking.abi import BLP_STAKING_USERS_ABI
+from app.selectors import blp_staking_users_fn, balance_of_fn
+from app.services.dataloader import DataLoader
+from app.services.multicall import try_aggregate
 from app.services.web3_nodes import web3_node
-from eth_abi import decode
-
 from app.types import BlpStakingUser
 
-USERS_TYPES = [x["type"] for x in BLP_STAKING_USERS_ABI["outputs"]]
 
-
-async def get_staked_balance(contract_address: str, user_addresses: list[str]) -> dict[str, int]:
+async def get_staked_balance(
+    contract_address: str,
+    user_addresses: list[str],
+    block_identifier: BlockIdentifier | None = None,
+) -> dict[str, int]:
     web3 = await web3_node.get_web3("blast")
-    encoded = (
-        (
-            contract_address,
-            encode_abi(
-                web3,
-                BLP_STAKING_USERS_ABI,
-                arguments=[web3.to_checksum_address(user_address)],
-                data=blp_staking_users_selector,
-            ),
-        )
+    calls = [
+        (contract_address, blp_staking_users_fn.encode_call(user_address))
         for user_address in user_addresses
+    ]
+    output_data = await try_aggregate(
+        web3,
+        calls,
+        block_identifier=block_identifier,
+        returndata_size=blp_staking_users_fn.output_size,
     )
-    data = add_0x_prefix(
-        encode_abi(
-            web3,
-            TRY_AGGREGATE_ABI,
-            (False, [(launchpad_addr, enc) for launchpad_addr, enc in encoded]),
-            try_aggregate_selector,
-        )
-    )
-    tx_raw_data = await web3.eth.call({"to": MULTICALL_ADDRESS, "data": data})
-    output_data = web3.codec.decode(try_aggregate_output_types, tx_raw_data)[0]
     res = {}
     for (success, data), user_address in zip(output_data, user_addresses):
         if not data or not success:
             continue
-        info = BlpStakingUser(
-            *decode(
-                types=USERS_TYPES,
-                data=data,
-            )
-        )
+        info = BlpStakingUser(*blp_staking_users_fn.decode_output(data))
         res[user_address.lower()] = info.balance
     return res
 
 
-async def get_staked_balance_for_user_by_pool(
-    user_address: str, contract_addresses_by_pool_id: dict[int, str]
-) -> dict[int, int]:
+async def _load_staked_balances_for_users(
+    keys: list[tuple[str, tuple[tuple[int, str], ...]]],
+) -> list[dict[int, int]]:
     web3 = await web3_node.get_web3("blast")
-    encoded = (
-        (
-            web3.to_checksum_address(contract_address),
-            encode_abi(
-                web3,
-                BLP_STAKING_USERS_ABI,
-                arguments=[web3.to_checksum_address(user_address)],
-                data=blp_staking_users_selector,
-            ),
-        )
-        for contract_address in contract_addresses_by_pool_id.values()
+    calls = [
+        (contract_address, blp_staking_users_fn.encode_call(user_address))
+        for user_address, contract_address_by_pool_id in keys
+        for _, contract_address in contract_address_by_pool_id
+    ]
+    output_data = iter(
+        await try_aggregate(web3, calls, returndata_size=blp_staking_users_fn.output_size)
     )
-    data = add_0x_prefix(
-        encode_abi(
-            web3,
-            TRY_AGGREGATE_ABI,
-            (False, [(addr, enc) for addr, enc in encoded]),
-            try_aggregate_selector,
-        )
+    res = []
+    for _, contract_address_by_pool_id in keys:
+        staked_by_pool_id = {}
+        for (pool_id, _), (success, data) in zip(contract_address_by_pool_id, output_data):
+            if not data or not success:
+                continue
+            info = BlpStakingUser(*blp_staking_users_fn.decode_output(data))
+            staked_by_pool_id[pool_id] = info.balance
+        res.append(staked_by_pool_id)
+    return res
+
+
+async def get_blp_staking_values(
+    oracle_address: str,
+    user_addresses: list[str],
+    block_identifier: BlockIdentifier | None = None,
+) -> list[int | Exception]:
+    """Staked blp of every user by the staking oracle, a failed call is returned as an error"""
+    web3 = await web3_node.get_web3("blast")
+    calls = [
+        (oracle_address, balance_of_fn.encode_call(user_address)) for user_address in user_addresses
+    ]
+    output_data = await try_aggregate(
+        web3, calls, block_identifier=block_identifier, returndata_size=balance_of_fn.output_size
     )
-    tx_raw_data = await web3.eth.call({"to": MULTICALL_ADDRESS, "data": data})
-    output_data = web3.codec.decode(try_aggregate_output_types, tx_raw_data)[0]
-    staked_by_pool_id = {}
-    for (success, data), pool_id in zip(output_data, contract_addresses_by_pool_id.keys()):
+    res = []
+    for (success, data), user_address in zip(output_data, user_addresses):
         if not data or not success:
-            continue
-        info = BlpStakingUser(
-            *decode(
-                types=USERS_TYPES,
-                data=data,
-            )
+            res.append(ContractLogicError(f"balanceOf({user_address}) of {oracle_address} failed"))
+        else:
+            res.append(balance_of_fn.decode_output(data)[0])
+    return res
+
+
+async def _load_blp_staking_values(keys: list[tuple[str, str]]) -> list[int | Exception]:
+    res_by_key = {}
+    # keys are grouped by oracle, in fact there is only one
+    for oracle_address in {oracle for oracle, _ in keys}:
+        user_addresses = [user for oracle, user in keys if oracle == oracle_address]
+        values = await get_blp_staking_values(oracle_address, user_addresses)
+        res_by_key.update(
+            ((oracle_address, user), value) for user, value in zip(user_addresses, values)
         )
-        staked_by_pool_id[pool_id] = info.balance
-    return staked_by_pool_id
+    return [res_by_key[key] for key in keys]
+
+
+# concurrent api requests of different users are answered with one multicall
+staked_balance_for_user_loader = DataLoader(
+    _load_staked_balances_for_users, name="staked_balance_for_user"
+)
+blp_staking_value_loader = DataLoader(_load_blp_staking_values, name="blp_staking_value")
+
+
+async def get_staked_balance_for_user_by_pool(
+    user_address: str, contract_addresses_by_pool_id: dict[int, str]
+) -> dict[int, int]:
+    return await staked_balance_for_user_loader.load(
+        (user_address.lower(), tuple(contract_addresses_by_pool_id.items()))
+    )
+
+
+async def get_blp_staking_value(oracle_address: str, user_address: str) -> int:
+    return await blp_staking_value_loader.load((oracle_address, user_address.lower()))
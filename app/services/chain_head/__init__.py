@@ -0,0 +1,5 @@
+from app.services.chain_head.head import (
+    get_block_number,
+    get_confirmation_blocks,
+    get_confirmed_block_number,
+)
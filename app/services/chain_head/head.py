@@ -0,0 +1,37 @@
+from app.base import logger
+from app.env import settings
+from app.schema import ChainId
+from app.services.chain_head.redis_cli import chain_head_redis
+from app.services.web3_nodes import web3_node
+
+
+async def get_block_number(network: str | None = None, chain_id: ChainId | None = None) -> int:
+    """
+    Latest block of the network published by the head tracker.
+    If the tracker isn't running, the block is requested from the node and kept only in
+    process memory: a head written to redis by a reader would outlive the tracker's ones.
+    """
+    network_chain_id = web3_node.get_network_chain_id(network=network, chain_id=chain_id)
+    if (block_number := await chain_head_redis.get_block_number(network_chain_id)) is not None:
+        return block_number
+
+    logger.info(f"Chain head: no published head for {network_chain_id=}, requesting node")
+    web3 = await web3_node.get_web3(network=network, chain_id=chain_id)
+    block_number = await web3.eth.block_number
+    chain_head_redis.set_local_block_number(network_chain_id, block_number)
+    return block_number
+
+
+def get_confirmation_blocks(chain_id: int) -> int:
+    return settings.indexer_confirmation_blocks_by_chain_id.get(
+        chain_id, settings.indexer_confirmation_blocks
+    )
+
+
+async def get_confirmed_block_number(
+    network: str | None = None, chain_id: ChainId | None = None
+) -> int:
+    """Latest block deep enough under the head not to be reorganized"""
+    network_chain_id = web3_node.get_network_chain_id(network=network, chain_id=chain_id)
+    block_number = await get_block_number(network=network, chain_id=chain_id)
+    return block_number - get_confirmation_blocks(network_chain_id)
@@ -0,0 +1,43 @@
+import asyncio
+
+from app.base import logger
+from app.common import Command, CommandResult
+from app.env import settings
+from app.schema import ChainId
+from app.services.chain_head.redis_cli import chain_head_redis
+from app.services.web3_nodes import web3_node
+
+
+class TrackChainHeads(Command):
+    """Polls the latest block of every configured chain and publishes it to redis"""
+
+    async def command(self) -> CommandResult:
+        chain_ids = web3_node.get_chain_ids()
+        await asyncio.gather(*(self._check_chain_id(chain_id) for chain_id in chain_ids))
+
+        while True:
+            results = await asyncio.gather(
+                *(self._get_block_number(chain_id) for chain_id in chain_ids),
+                return_exceptions=True,
+            )
+            block_number_by_chain_id = {}
+            for chain_id, result in zip(chain_ids, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Chain head: can't get block for {chain_id=}: {result}")
+                    continue
+                block_number_by_chain_id[web3_node.get_network_chain_id(chain_id=chain_id)] = result
+            if block_number_by_chain_id:
+                await chain_head_redis.set_block_numbers(block_number_by_chain_id)
+            await asyncio.sleep(settings.chain_head_poll_seconds)
+
+    @staticmethod
+    async def _get_block_number(chain_id: ChainId) -> int:
+        web3 = await web3_node.get_web3(chain_id=chain_id)
+        return await web3.eth.block_number
+
+    @staticmethod
+    async def _check_chain_id(chain_id: ChainId) -> None:
+        # chain ids are resolved statically: endpoints of another chain are disabled,
+        # and the tracker fails if no endpoint is left
+        web3 = await web3_node.get_web3(chain_id=chain_id)
+        await web3.provider.check_chain_ids()
@@ -0,0 +1,53 @@
+import time
+
+from redis.asyncio import Redis
+
+from app.dependencies import get_redis
+from app.env import settings
+from app.schema import ChainId
+
+
+class ChainHeadRedis:
+    """
+    Latest block number of every chain published by TrackChainHeads.
+    Values are mirrored in process memory for CHAIN_HEAD_LOCAL_CACHE_SECONDS.
+    """
+
+    # stale heads are worse than none: readers fall back to the node
+    __HEAD_TTL_SECONDS = 60
+
+    def __init__(self, redis_cli: Redis):
+        self.redis_cli = redis_cli
+        # chain_id -> (block number, monotonic time when the local value expires)
+        self._head_by_chain_id: dict[ChainId, tuple[int, float]] = {}
+
+    @staticmethod
+    def _get_key(chain_id: ChainId) -> str:
+        return f"chain_head_{chain_id}"
+
+    def get_local_block_number(self, chain_id: ChainId) -> int | None:
+        if (cached := self._head_by_chain_id.get(chain_id)) and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    def set_local_block_number(self, chain_id: ChainId, block_number: int) -> None:
+        expires_at = time.monotonic() + settings.chain_head_local_cache_seconds
+        self._head_by_chain_id[chain_id] = (block_number, expires_at)
+
+    async def get_block_number(self, chain_id: ChainId) -> int | None:
+        if (block_number := self.get_local_block_number(chain_id)) is not None:
+            return block_number
+        if (res := await self.redis_cli.get(self._get_key(chain_id))) is None:
+            return None
+        self.set_local_block_number(chain_id, int(res))
+        return int(res)
+
+    async def set_block_numbers(self, block_number_by_chain_id: dict[ChainId, int]) -> None:
+        async with self.redis_cli.pipeline(transaction=False) as pipe:
+            for chain_id, block_number in block_number_by_chain_id.items():
+                pipe.set(self._get_key(chain_id), block_number, ex=self.__HEAD_TTL_SECONDS)
+                self.set_local_block_number(chain_id, block_number)
+            await pipe.execute()
+
+
+chain_head_redis = ChainHeadRedis(redis_cli=get_redis())
@@ -10,10 +10,10 @@ from app.abi import (
     PRESALE_BSC_ABI,
     PRICE_FEED_ABI,
     PRESALE_BLAST_ABI,
-    BLP_STAKING_ORACLE_ABI,
     BLP_BALANCE_ABI,
 )
 from app.base import logger
+from app.services.blp_staking.multicall import get_blp_staking_value
 from app.services.launchpad.abi import AMOUNT_AND_USD_ABI
 from app.services.web3_nodes import web3_node, catch_web3_exceptions
 
@@ -42,6 +42,7 @@ class Crypto:
             chains.bsc_testnet.id: "bsc",
             chains.polygon.id: "polygon",
             chains.polygon_mumbai.id: "polygon",
+            chains.polygon_amoy.id: "polygon",
             chains.blast.id: "blast",
             chains.blast_sepolia.id: "blast",
         }
@@ -145,12 +146,8 @@ class Crypto:
 
     @catch_web3_exceptions
     async def get_blp_staking_value(self, wallet_address: str) -> int:
-        web3 = await web3_node.get_web3(network="blast")  # todo: change to chain_id
-        wallet_address = web3.to_checksum_address(wallet_address)
-        contract_address = web3.to_checksum_address(self.staking_oracle_contract)
-        contract = web3.eth.contract(contract_address, abi=BLP_STAKING_ORACLE_ABI)
-        res = int(await contract.functions.balanceOf(wallet_address).call())
-        return res
+        # batched with concurrent calls for other wallets
+        return await get_blp_staking_value(self.staking_oracle_contract, wallet_address)
 
     async def presale_contract(self, network, contract_address: str | None = None) -> AsyncContract:
         abi = {
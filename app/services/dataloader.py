@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from app.env import settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# every loader of the process, for stats
+dataloaders: list["DataLoader"] = []
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Collects keys loaded by concurrent requests of this process during a short window
+    and loads them with one call of `batch_load`. The same key requested several times
+    in a window is loaded once. Nothing is cached between windows.
+
+    `batch_load` gets a list of unique keys and returns results in the same order,
+    a result which is an exception is raised to the callers of that key only.
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[list[K]], Awaitable[list[V | Exception]]],
+        name: str,
+        max_batch_size: int | None = None,
+        window_ms: float | None = None,
+    ) -> None:
+        self.batch_load = batch_load
+        self.name = name
+        self.max_batch_size = max_batch_size or settings.dataloader_max_batch_size
+        self.window_ms = settings.dataloader_window_ms if window_ms is None else window_ms
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._batch: dict[K, asyncio.Future] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # the loop keeps weak references to tasks only
+        self._dispatch_tasks: set[asyncio.Task] = set()
+
+        self.loads = 0
+        self.batches = 0
+        self.batched_keys = 0
+        dataloaders.append(self)
+
+    async def load(self, key: K) -> V:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # celery workers run every task in a new loop, futures of the old one are dead
+            self._loop = loop
+            self._batch = {}
+            self._flush_handle = None
+            self._dispatch_tasks = set()
+
+        self.loads += 1
+        if (future := self._batch.get(key)) is None:
+            future = self._batch[key] = loop.create_future()
+            if len(self._batch) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window_ms / 1000, self._flush)
+        # a caller may be cancelled, the others waiting for the same key must not be
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: list[K]) -> list[V]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, {}
+        if batch:
+            self.batches += 1
+            self.batched_keys += len(batch)
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, batch: dict[K, asyncio.Future]) -> None:
+        try:
+            results = await self.batch_load(list(batch))
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"DataLoader[{self.name}]: {len(results)} results for {len(batch)} keys"
+                )
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(batch.values(), results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "loads": self.loads,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_keys / self.batches, 2) if self.batches else 0,
+        }
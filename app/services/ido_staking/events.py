@@ -0,0 +1,69 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3.types import EventData
+
+from app.crud.history_staking import HistoryStakingCrud
+from app.crud.profiles import ProfilesCrud
+from app.models import HistoryStakeType
+from app.schema import CreateHistoryStake
+from app.services.indexer import LogBatch
+
+
+async def save_stake_events(batch: LogBatch, events: list[EventData]) -> None:
+    await HistoryStakingCrud(batch.session).add_histories(
+        [
+            CreateHistoryStake(
+                type=HistoryStakeType.STAKE,
+                token_address=event.args["stakingToken"],
+                amount=str(event.args["amount"]),
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+                user_address=event.args["user"],
+            )
+            for event in events
+        ]
+    )
+    # save new profiles if not exist
+    profile_crud = ProfilesCrud(batch.session)
+    for user_address in dict.fromkeys(event.args["user"] for event in events):
+        await profile_crud.get_or_create_profile(address=user_address)
+
+
+async def save_claim_rewards_events(batch: LogBatch, events: list[EventData]) -> None:
+    await HistoryStakingCrud(batch.session).add_histories(
+        [
+            CreateHistoryStake(
+                type=HistoryStakeType.CLAIM_REWARDS,
+                token_address=event.args["stakingToken"],
+                amount=str(event.args["amountInStakingToken"]),
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+                user_address=event.args["user"],
+            )
+            for event in events
+        ]
+    )
+
+
+async def save_unstake_events(batch: LogBatch, events: list[EventData]) -> None:
+    await HistoryStakingCrud(batch.session).add_histories(
+        [
+            CreateHistoryStake(
+                type=HistoryStakeType.UNSTAKE,
+                token_address=event.args["stakingToken"],
+                amount=str(event.args["amount"]),
+                user_address=event.args["user"],
+                txn_hash=event.transactionHash.hex(),
+                block_number=event.blockNumber,
+                chain_id=str(batch.chain_id),
+            )
+            for event in events
+        ]
+    )
+
+
+async def delete_events_after_block(
+    session: AsyncSession, chain_id: int, block_number: int
+) -> None:
+    await HistoryStakingCrud(session).delete_after_block(chain_id, block_number)
@@ -1,4 +1,3 @@
-import asyncio
 import traceback
 from collections import defaultdict
 
@@ -18,173 +17,13 @@ from app.dependencies import (
     get_add_points,
 )
 from app.env import settings
-from app.models import HistoryStakeType, OperationType, OperationReason
-from app.schema import CreateHistoryStake
+from app.models import OperationType, OperationReason
 from app.services import Lock
-from app.services.ido_staking.abi import staking_abi
+from app.services.chain_head import get_block_number
 from app.services.ido_staking.multicall import get_locked_balance
-from app.services.ido_staking.redis_cli import stake_history_redis
 from app.services.ido_staking.tvl import get_ido_staking_daily_reward
 from app.services.points.add_points import AddPoints
 from app.services.prices import get_tokens_price_for_chain
-from app.services.web3_nodes import web3_node
-
-
-class ProcessHistoryStakingEvent(Command):
-
-    async def command(
-        self,
-        crud: HistoryStakingCrud = Depends(get_staking_history_crud),
-        profile_crud: ProfilesCrud = Depends(get_profile_crud),
-    ) -> CommandResult:
-        if not settings.yield_staking_contract_addr:
-            logger.error("Staking events: yield staking contract address is not set")
-            return CommandResult(success=False, need_retry=False)
-
-        web3 = await web3_node.get_web3(network="blast")
-        chain_id = await web3.eth.chain_id
-        current_block = await web3.eth.block_number
-        if (
-            last_checked_block := await stake_history_redis.get_last_checked_block(chain_id)
-        ) is None:
-            last_checked_block = current_block - 100_000
-
-        if last_checked_block >= current_block:
-            return CommandResult(success=True, need_retry=False)
-
-        try:
-            while True:
-                from_block = last_checked_block + 1
-                # 3000 is limit, can't set larger than that
-                to_block = min(current_block, from_block + 3000)
-                logger.info(f"Staking events: monitoring {from_block=} {to_block=}")
-
-                if from_block > to_block:
-                    logger.info(f"Staking events: No events {from_block=} {to_block=}")
-                    break
-
-                from app.tasks import monitor_and_save_ido_staking_events
-
-                monitor_and_save_ido_staking_events.apply_async(
-                    kwargs={
-                        "from_block": from_block,
-                        "to_block": to_block,
-                        "chain_id": chain_id,
-                    },
-                    countdown=1,
-                )
-
-                last_checked_block = to_block
-                await stake_history_redis.set_last_checked_block(chain_id, to_block)
-                await asyncio.sleep(0.5)
-
-        except Exception as e:
-            logger.error(f"Staking events: error with processing:\n{e} {traceback.format_exc()}")
-            return CommandResult(success=False, need_retry=True)
-        return CommandResult(success=True, need_retry=False)
-
-
-class MonitorIdoStakingLogsAndSave(Command):
-    def __init__(self, from_block: int, to_block: int, chain_id: int) -> None:
-        self.from_block = from_block
-        self.to_block = to_block
-        self.chain_id = chain_id
-
-    async def command(
-        self,
-        crud: HistoryStakingCrud = Depends(get_staking_history_crud),
-        profile_crud: ProfilesCrud = Depends(get_profile_crud),
-    ) -> CommandResult:
-        web3 = await web3_node.get_web3(network="blast")
-
-        staking_contract = web3.eth.contract(
-            address=web3.to_checksum_address(settings.yield_staking_contract_addr),
-            abi=staking_abi,
-        )
-        try:
-            stake_events = await staking_contract.events.Staked().get_logs(
-                fromBlock=self.from_block, toBlock=self.to_block
-            )
-            n_stakes = len(stake_events)
-            await self._save_stake_events(crud, profile_crud, stake_events)
-
-            claim_reward_events = await staking_contract.events.RewardClaimed().get_logs(
-                fromBlock=self.from_block, toBlock=self.to_block
-            )
-            n_claim_rewards = len(claim_reward_events)
-            await self._save_claim_rewards_events(crud, claim_reward_events)
-
-            unstake_events = await staking_contract.events.Withdrawn().get_logs(
-                fromBlock=self.from_block, toBlock=self.to_block
-            )
-            n_unstake = len(unstake_events)
-            await self._save_unstake_events(crud, unstake_events)
-
-            if any((n_stakes, n_claim_rewards, n_unstake)):
-                logger.info(
-                    f"Staking events: saving {n_stakes=}, {n_claim_rewards=}, {n_unstake=}",  # noqa
-                    extra={
-                        "from_block": self.from_block,
-                        "to_block": self.to_block,
-                    },
-                )
-                await crud.session.commit()
-        except Exception as e:
-            logger.error(
-                f"Staking events: saving error:\n{e}  {traceback.format_exc()}",
-                extra={
-                    "from_block": self.from_block,
-                    "to_block": self.to_block,
-                },
-            )
-            return CommandResult(success=False, need_retry=True)
-        return CommandResult(success=True, need_retry=False)
-
-    async def _save_stake_events(
-        self, crud: HistoryStakingCrud, profile_crud: ProfilesCrud, events
-    ) -> None:
-        for event in events:
-            await crud.add_history(
-                params=CreateHistoryStake(
-                    type=HistoryStakeType.STAKE,
-                    token_address=event.args["stakingToken"],
-                    amount=str(event.args["amount"]),
-                    txn_hash=event.transactionHash.hex(),
-                    block_number=event.blockNumber,
-                    chain_id=str(self.chain_id),
-                    user_address=event.args["user"],
-                )
-            )
-            # save new profile if not exists
-            await profile_crud.get_or_create_profile(address=event.args["user"])
-
-    async def _save_claim_rewards_events(self, crud: HistoryStakingCrud, events) -> None:
-        for event in events:
-            await crud.add_history(
-                params=CreateHistoryStake(
-                    type=HistoryStakeType.CLAIM_REWARDS,
-                    token_address=event.args["stakingToken"],
-                    amount=str(event.args["amountInStakingToken"]),
-                    txn_hash=event.transactionHash.hex(),
-                    block_number=event.blockNumber,
-                    chain_id=str(self.chain_id),
-                    user_address=event.args["user"],
-                )
-            )
-
-    async def _save_unstake_events(self, crud: HistoryStakingCrud, events) -> None:
-        for event in events:
-            await crud.add_history(
-                params=CreateHistoryStake(
-                    type=HistoryStakeType.UNSTAKE,
-                    token_address=event.args["stakingToken"],
-                    amount=str(event.args["amount"]),
-                    user_address=event.args["user"],
-                    txn_hash=event.transactionHash.hex(),
-                    block_number=event.blockNumber,
-                    chain_id=str(self.chain_id),
-                )
-            )
 
 
 class AddIdoStakingPoints(Command):
@@ -198,10 +37,11 @@ class AddIdoStakingPoints(Command):
             # get all users that staked some tokens
             user_addresses_by_token_address = await crud.get_user_addresses_by_token_address()
 
-            # get locked balance from contract
+            # get locked balance from contract, all tokens at the same block
+            block_number = await get_block_number(network="blast")
             balance_by_token_address_and_user_address: dict[str, dict[str, float]] = {}
             for token_address, user_addresses in user_addresses_by_token_address.items():
-                res = await get_locked_balance(token_address, user_addresses)
+                res = await get_locked_balance(token_address, user_addresses, block_number)
                 balance_by_token_address_and_user_address.update(res)
 
             # get price for staked tokens
@@ -238,10 +78,11 @@ class AddIdoStakingPoints(Command):
             return CommandResult(success=False, need_retry=True)
 
         # add points to profile if it has more than 100 USD staked
-        try:
-            while not await lock.acquire("add-ido-points"):
-                await asyncio.sleep(0.001)
+        async with lock.hold("add-ido-points") as lease:
+            logger.info(f"IDO points: adding points, {lease.fencing_token=}")
             for user_address, usd_balance in usd_balance_by_user_address.items():
+                # a run which has lost the lock must not enqueue points twice
+                lease.check()
                 if (points_amount := get_ido_staking_daily_reward(usd_balance)) is None:
                     continue
                 profile, _ = await profile_crud.get_or_create_profile(user_address)
@@ -266,8 +107,6 @@ class AddIdoStakingPoints(Command):
                         },
                         countdown=1,
                     )
-        finally:
-            await lock.release("add-ido-points")
         return CommandResult(success=True, need_retry=False)
 
 
@@ -306,6 +145,7 @@ class AddIdoStakingPointsForProfile(Command):
                         referring_profile_id=self.referring_profile_id,
                         session=session,
                     )
+            await add_points.update_leaderboard()
         except Exception as e:
             logger.error(
                 f"IDO points: error with adding to {self.address}:\n{e} {traceback.format_exc()}"
@@ -1,152 +1,99 @@
 from collections import defaultdict
 
-from eth_utils import add_0x_prefix
-from web3._utils.contracts import encode_abi
-from eth_abi import decode
+from web3.types import BlockIdentifier
 
-from app.abi import TRY_AGGREGATE_ABI
-from app.services.ido_staking.abi import STAKING_USER_INFO_ABI, STAKING_TOTAL_SUPPLY_ABI
-from app.consts import MULTICALL_ADDRESS
 from app.env import settings
-from app.selectors import (
-    try_aggregate_selector,
-    try_aggregate_output_types,
-    staking_user_info_selector,
-    staking_total_supply_selector,
-)
+from app.selectors import staking_user_info_fn, staking_total_supply_fn
 from app.services.ido_staking.types import UserLockedAmount, LockedAmount
+from app.services.dataloader import DataLoader
+from app.services.multicall import try_aggregate
 from app.services.web3_nodes import web3_node
 from app.types import StakingUserInfo
 
-USER_INFO_TYPES = [x["type"] for x in STAKING_USER_INFO_ABI["outputs"][0]["components"]]
-
 
 async def get_locked_balance(
     token_address: str,
     user_addresses: list[str],
+    block_identifier: BlockIdentifier | None = None,
 ) -> dict[str, dict[str, int]]:
     web3 = await web3_node.get_web3("blast")
-    yield_staking_addr = web3.to_checksum_address(settings.yield_staking_contract_addr)
-    token_address = web3.to_checksum_address(token_address)
-    encoded = (
-        (
-            yield_staking_addr,
-            encode_abi(
-                web3,
-                STAKING_USER_INFO_ABI,
-                arguments=[token_address, web3.to_checksum_address(user_address)],
-                data=staking_user_info_selector,
-            ),
-        )
+    yield_staking_addr = settings.yield_staking_contract_addr
+    calls = [
+        (yield_staking_addr, staking_user_info_fn.encode_call(token_address, user_address))
         for user_address in user_addresses
+    ]
+    output_data = await try_aggregate(
+        web3,
+        calls,
+        block_identifier=block_identifier,
+        returndata_size=staking_user_info_fn.output_size,
     )
-    data = add_0x_prefix(
-        encode_abi(
-            web3,
-            TRY_AGGREGATE_ABI,
-            (False, [(launchpad_addr, enc) for launchpad_addr, enc in encoded]),
-            try_aggregate_selector,
-        )
-    )
-    tx_raw_data = await web3.eth.call({"to": MULTICALL_ADDRESS, "data": data})
-    output_data = web3.codec.decode(try_aggregate_output_types, tx_raw_data)[0]
     res = defaultdict(dict)
     for (success, data), user_address in zip(output_data, user_addresses):
         if not data or not success:
             continue
-        info = StakingUserInfo(
-            *decode(
-                types=USER_INFO_TYPES,
-                data=data,
-            )
-        )
+        info = StakingUserInfo(*staking_user_info_fn.decode_output(data))
         res[token_address.lower()][user_address.lower()] = info.locked_balance
     return res
 
 
-async def get_locked_amount_for_user(
-    user_address: str, native_token_address: str, stablecoin_token_address: str
-) -> UserLockedAmount:
+async def _load_locked_amounts_for_users(
+    keys: list[tuple[str, str, str]],
+) -> list[UserLockedAmount]:
     web3 = await web3_node.get_web3("blast")
-    yield_staking_addr = web3.to_checksum_address(settings.yield_staking_contract_addr)
+    yield_staking_addr = settings.yield_staking_contract_addr
 
-    token_addresses = (native_token_address, stablecoin_token_address)
-    encoded = (
-        (
-            yield_staking_addr,
-            encode_abi(
-                web3,
-                STAKING_USER_INFO_ABI,
-                arguments=[token_address, web3.to_checksum_address(user_address)],
-                data=staking_user_info_selector,
-            ),
-        )
-        for token_address in token_addresses
-    )
-    data = add_0x_prefix(
-        encode_abi(
-            web3,
-            TRY_AGGREGATE_ABI,
-            (False, [(launchpad_addr, enc) for launchpad_addr, enc in encoded]),
-            try_aggregate_selector,
-        )
-    )
-    tx_raw_data = await web3.eth.call({"to": MULTICALL_ADDRESS, "data": data})
-    output_data = web3.codec.decode(try_aggregate_output_types, tx_raw_data)[0]
-    locked_amount = UserLockedAmount()
-    for (success, data), token_address in zip(output_data, token_addresses):
-        if not data or not success:
-            continue
-        info = StakingUserInfo(
-            *decode(
-                types=USER_INFO_TYPES,
-                data=data,
-            )
-        )
-        if token_address == native_token_address:
+    calls = [
+        (yield_staking_addr, staking_user_info_fn.encode_call(token_address, user_address))
+        for user_address, native_token_address, stablecoin_token_address in keys
+        for token_address in (native_token_address, stablecoin_token_address)
+    ]
+    output_data = await try_aggregate(web3, calls, returndata_size=staking_user_info_fn.output_size)
+    res = []
+    # two calls per key: native and stablecoin token
+    for native_result, stablecoin_result in zip(output_data[::2], output_data[1::2]):
+        locked_amount = UserLockedAmount()
+        if native_result[0] and native_result[1]:
+            info = StakingUserInfo(*staking_user_info_fn.decode_output(native_result[1]))
             locked_amount.native = float(web3.from_wei(info.locked_balance, "ether"))
-        elif token_address == stablecoin_token_address:
+        if stablecoin_result[0] and stablecoin_result[1]:
+            info = StakingUserInfo(*staking_user_info_fn.decode_output(stablecoin_result[1]))
             locked_amount.stablecoin = float(web3.from_wei(info.locked_balance, "ether"))
-    return locked_amount
+        res.append(locked_amount)
+    return res
+
+
+# concurrent api requests of different users are answered with one multicall
+locked_amount_for_user_loader = DataLoader(
+    _load_locked_amounts_for_users, name="locked_amount_for_user"
+)
+
+
+async def get_locked_amount_for_user(
+    user_address: str, native_token_address: str, stablecoin_token_address: str
+) -> UserLockedAmount:
+    return await locked_amount_for_user_loader.load(
+        (user_address.lower(), native_token_address, stablecoin_token_address)
+    )
 
 
 async def get_locked_amount(
     native_token_address: str, stablecoin_token_address: str
 ) -> LockedAmount:
     web3 = await web3_node.get_web3("blast")
-    yield_staking_addr = web3.to_checksum_address(settings.yield_staking_contract_addr)
+    yield_staking_addr = settings.yield_staking_contract_addr
 
     token_addresses = (native_token_address, stablecoin_token_address)
-    encoded = (
-        (
-            yield_staking_addr,
-            encode_abi(
-                web3,
-                STAKING_TOTAL_SUPPLY_ABI,
-                arguments=(token_address,),
-                data=staking_total_supply_selector,
-            ),
-        )
+    calls = [
+        (yield_staking_addr, staking_total_supply_fn.encode_call(token_address))
         for token_address in token_addresses
-    )
-    data = add_0x_prefix(
-        encode_abi(
-            web3,
-            TRY_AGGREGATE_ABI,
-            (False, [(launchpad_addr, enc) for launchpad_addr, enc in encoded]),
-            try_aggregate_selector,
-        )
-    )
-    tx_raw_data = await web3.eth.call({"to": MULTICALL_ADDRESS, "data": data})
-    output_data = web3.codec.decode(try_aggregate_output_types, tx_raw_data)[0]
+    ]
+    output_data = await try_aggregate(web3, calls)
     locked_amount = LockedAmount()
     for (success, data), token_address in zip(output_data, token_addresses):
         if not data or not success:
             continue
-        tvl = decode(
-            types=[x["type"] for x in STAKING_TOTAL_SUPPLY_ABI["outputs"]],
-            data=data,
-        )[0]
+        tvl = staking_total_supply_fn.decode_output(data)[0]
         if token_address == native_token_address:
             locked_amount.native = float(web3.from_wei(tvl, "ether"))
         elif token_address == stablecoin_token_address:
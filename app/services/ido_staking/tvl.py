@@ -7,22 +7,27 @@ from app.schema import UserTvlIdoFarming, TotalTvlIdoFarming
 from app.services.ido_staking.cache import tvl_cache, user_tvl_cache
 
 from app.services.ido_staking.multicall import get_locked_amount_for_user, get_locked_amount
+from app.services.ido_staking.types import UserLockedAmount
 from app.services.prices import get_tokens_price_for_chain
 
 
-async def get_user_usd_tvl(user_address: str) -> UserTvlIdoFarming | None:
+async def get_user_usd_tvl(
+    user_address: str, locked_amount: UserLockedAmount | None = None
+) -> UserTvlIdoFarming | None:
     chain_id = chains.blast_sepolia.id if settings.app_env == "dev" else chains.blast.id
     native_token_address = settings.blast_weth_address
     stablecoin_token_address = settings.blast_usdb_address
     token_addresses = [native_token_address, stablecoin_token_address]
 
-    locked_amount = await user_tvl_cache.get_locked_amount(user_address)
+    # the caller may have read the cached one already, with other values of the user
+    if locked_amount is None:
+        locked_amount = await user_tvl_cache.get(user_address)
     if locked_amount is None:
         try:
             locked_amount = await get_locked_amount_for_user(
                 user_address, native_token_address, stablecoin_token_address
             )
-            await user_tvl_cache.set_locked_amount(user_address, locked_amount)
+            await user_tvl_cache.set(locked_amount, user_address)
         except Exception as e:
             logger.error(f"user tvl[{user_address}]: can't get locked amount: {e}")
             return None
@@ -62,11 +67,14 @@ async def get_total_usd_tvl() -> TotalTvlIdoFarming | None:
     stablecoin_token_address = settings.blast_usdb_address
     token_addresses = [native_token_address, stablecoin_token_address]
 
-    locked_amount = await tvl_cache.get_locked_amount()
+    locked_amount = await tvl_cache.get()
     if locked_amount is None:
         try:
             locked_amount = await get_locked_amount(native_token_address, stablecoin_token_address)
-            await tvl_cache.set_locked_amount(locked_amount)
+            if locked_amount.native and locked_amount.stablecoin:
+                await tvl_cache.set(locked_amount)
+            else:
+                logger.warning(f"total tvl: locked_amount is empty: {locked_amount}")
         except Exception as e:
             logger.error(f"total tvl: can't get locked amount: {e}")
             return None
@@ -99,7 +107,9 @@ def get_ido_staking_daily_reward(total_usd_staked: float) -> int | None:
     return points_amount
 
 
-async def get_ido_staking_daily_reward_for_user(user_address: str) -> int:
-    user_tvl = await get_user_usd_tvl(user_address)
+async def get_ido_staking_daily_reward_for_user(
+    user_address: str, locked_amount: UserLockedAmount | None = None
+) -> int:
+    user_tvl = await get_user_usd_tvl(user_address, locked_amount)
     points = get_ido_staking_daily_reward(user_tvl.total) if user_tvl is not None else 0
     return points or 0
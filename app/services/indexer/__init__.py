@@ -0,0 +1 @@
+from app.services.indexer.indexer import LogIndexer, LogBatch, Subscription
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import Counter
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3 import AsyncWeb3
+
+from app.base import logger, engine
+from app.env import settings
+from app.services.indexer.indexer import LogBatch, LogIndexer
+from app.services.indexer.ranges import AdaptiveBlockRange
+from app.services.indexer.redis_cli import backfill_progress_cache
+from app.services.web3_nodes import web3_node
+
+
+def get_remaining_ranges(
+    from_block: int, to_block: int, done: dict[int, int], range_size: int
+) -> list[tuple[int, int]]:
+    """Ranges of at most range_size blocks of the span, without the done ranges"""
+    ranges = []
+    block = from_block
+    for done_from_block, done_to_block in sorted(done.items()) + [(to_block + 1, to_block)]:
+        while block < min(done_from_block, to_block + 1):
+            range_to_block = min(done_from_block - 1, to_block, block + range_size - 1)
+            ranges.append((block, range_to_block))
+            block = range_to_block + 1
+        block = max(block, done_to_block + 1)
+    return ranges
+
+
+def merge_ranges(ranges: dict[int, int]) -> dict[int, int]:
+    """Adjacent ranges of {from_block: to_block} merged into one"""
+    merged = {}
+    last_from_block = None
+    for from_block, to_block in sorted(ranges.items()):
+        if last_from_block is not None and merged[last_from_block] + 1 >= from_block:
+            merged[last_from_block] = max(merged[last_from_block], to_block)
+        else:
+            merged[from_block] = to_block
+            last_from_block = from_block
+    return merged
+
+
+class Backfill:
+    """
+    Indexes the logs of a span of blocks, e.g. of a new contract or after an outage, with
+    `n_workers` workers. The span is split into ranges in one queue, and a worker takes the
+    next range as soon as it is done with its own: a worker on a range with many logs
+    doesn't hold back the others. Every range is saved in one transaction; the events are
+    written by the same handlers as the indexer, which ignore events saved before and
+    enqueue no tasks for them.
+    Done blocks are kept in redis, a restarted backfill only indexes the rest of the span.
+    The checkpoint of the indexer isn't changed. Rows and redis keys are of the chain id
+    reported by the nodes of `network`.
+    """
+
+    __MAX_ATTEMPTS = 5
+    __RETRY_SECONDS = 5
+
+    def __init__(
+        self,
+        indexer: LogIndexer,
+        network: str,
+        from_block: int,
+        to_block: int,
+        n_workers: int,
+        range_size: int,
+    ) -> None:
+        self.indexer = indexer
+        self.network = network
+        self.chain_id = web3_node.get_network_chain_id(network=network)
+        self.from_block = from_block
+        self.to_block = to_block
+        self.n_workers = n_workers
+        self.range_size = range_size
+
+        self.done: dict[int, int] = {}
+        self.n_ranges = 0
+        self.n_done_ranges = 0
+        self.failed: list[tuple[int, int]] = []
+        self._block_range: AdaptiveBlockRange | None = None
+
+        self.started_at = time.monotonic()
+        self.n_blocks = 0
+        self.n_events: Counter[str] = Counter()
+        self.n_errors = 0
+
+    async def run(self) -> bool:
+        """Returns False if some ranges weren't saved: they are indexed by the next run"""
+        progress = await backfill_progress_cache.get(*self._get_progress_key()) or {}
+        self.done = {int(from_block): to_block for from_block, to_block in progress.items()}
+        ranges = get_remaining_ranges(self.from_block, self.to_block, self.done, self.range_size)
+        self.n_ranges = len(ranges)
+        logger.info(
+            f"Backfill[{self.indexer.name}]: {len(ranges)} ranges to index, "
+            f"{sum(t - f + 1 for f, t in self.done.items())} blocks done before",
+            extra={"from_block": self.from_block, "to_block": self.to_block},
+        )
+        if not ranges:
+            return True
+
+        queue: asyncio.Queue[tuple[int, int, int]] = asyncio.Queue()
+        for from_block, to_block in ranges:
+            queue.put_nowait((from_block, to_block, 0))
+
+        web3 = await web3_node.get_web3(network=self.network)
+        self._block_range = await AdaptiveBlockRange.load(self.chain_id, self.indexer.name)
+        self.started_at = time.monotonic()
+        reporting = asyncio.create_task(self._report_forever())
+        workers = [asyncio.create_task(self._work(web3, queue)) for _ in range(self.n_workers)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            reporting.cancel()
+            for worker in workers:
+                worker.cancel()
+            await self._block_range.save()
+
+        logger.info(f"Backfill[{self.indexer.name}]: finished, {self.stats()}")
+        return not self.failed
+
+    async def _work(self, web3: AsyncWeb3, queue: asyncio.Queue[tuple[int, int, int]]) -> None:
+        while True:
+            try:
+                from_block, to_block, n_attempts = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                fetched_logs = [
+                    x
+                    async for x in self.indexer.iter_logs(
+                        web3, from_block, to_block, self._block_range
+                    )
+                ]
+                await self._save(from_block, to_block, fetched_logs)
+            except Exception as e:
+                self.n_errors += 1
+                if n_attempts + 1 >= self.__MAX_ATTEMPTS:
+                    logger.error(
+                        f"Backfill[{self.indexer.name}]: {from_block=} {to_block=} failed: {e}"
+                    )
+                    self.failed.append((from_block, to_block))
+                    continue
+                logger.warning(
+                    f"Backfill[{self.indexer.name}]: {from_block=} {to_block=} failed: {e}, "
+                    f"retrying"
+                )
+                await asyncio.sleep(self.__RETRY_SECONDS)
+                queue.put_nowait((from_block, to_block, n_attempts + 1))
+
+    async def _save(self, from_block: int, to_block: int, fetched_logs: list) -> None:
+        async with AsyncSession(engine) as session:
+            batch = LogBatch(session, self.chain_id, from_block, to_block)
+            n_events = Counter()
+            async with session.begin():
+                for _, _, events_by_subscription in fetched_logs:
+                    n_events.update(await self.indexer.dispatch(batch, events_by_subscription))
+
+        self.done = merge_ranges({**self.done, from_block: to_block})
+        self.n_done_ranges += 1
+        self.n_blocks += to_block - from_block + 1
+        self.n_events.update(n_events)
+        await backfill_progress_cache.set(self.done, *self._get_progress_key())
+        for callback in batch.on_commit:
+            callback()
+
+    def _get_progress_key(self) -> tuple[int, str, int, int]:
+        return self.chain_id, self.indexer.name, self.from_block, self.to_block
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "ranges": self.n_ranges,
+            "done_ranges": self.n_done_ranges,
+            "failed_ranges": len(self.failed),
+            "range_size": self._block_range.size if self._block_range else None,
+            "blocks_per_second": round(self.n_blocks / elapsed, 2),
+            "events_per_second": round(sum(self.n_events.values()) / elapsed, 2),
+            "events": dict(self.n_events),
+            "errors": self.n_errors,
+        }
+
+    async def _report_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.indexer_stats_seconds)
+            logger.info(f"Backfill[{self.indexer.name}]: {self.stats()}")
@@ -0,0 +1,99 @@
+from functools import partial
+
+from app.abi import PRESALE_ABI
+from app.env import settings
+from app.services.blp_staking import events as blp_staking_events
+from app.services.blp_staking.abi import STAKING_CONTRACT_ABI
+from app.services.blp_staking.consts import pool_by_id
+from app.services.ido_staking import events as ido_staking_events
+from app.services.ido_staking.abi import staking_abi
+from app.services.indexer.indexer import LogIndexer
+from app.services.launchpad import events as launchpad_events
+from app.services.launchpad.abi import AMOUNT_AND_USD_ABI, LAUNCHPAD_CONTRACT_ADDRESS_ABI
+
+
+def _create_blast_indexer() -> LogIndexer:
+    indexer = LogIndexer("blast_contracts")
+
+    if settings.yield_staking_contract_addr:
+        for event_name, handler in (
+            ("Staked", ido_staking_events.save_stake_events),
+            ("RewardClaimed", ido_staking_events.save_claim_rewards_events),
+            ("Withdrawn", ido_staking_events.save_unstake_events),
+        ):
+            indexer.subscribe(
+                name=f"ido_staking.{event_name}",
+                address=settings.yield_staking_contract_addr,
+                abi=staking_abi,
+                event_name=event_name,
+                handler=handler,
+            )
+        indexer.on_rollback(ido_staking_events.delete_events_after_block)
+
+    for pool_id, pool in pool_by_id.items():
+        for event_name, handler in (
+            ("Staked", blp_staking_events.save_stake_events),
+            ("Claimed", blp_staking_events.save_claim_rewards_events),
+            ("Withdrawn", blp_staking_events.save_unstake_events),
+        ):
+            indexer.subscribe(
+                name=f"blp_staking[{pool_id}].{event_name}",
+                address=pool.staking_contract_address,
+                abi=STAKING_CONTRACT_ABI,
+                event_name=event_name,
+                handler=partial(handler, pool_id=pool_id),
+            )
+        indexer.on_rollback(partial(blp_staking_events.delete_events_after_block, pool_id=pool_id))
+
+    if settings.launchpad_contract_address:
+        for event_name, handler in (
+            ("UserRegistered", launchpad_events.save_user_registered_events),
+            ("TokensBought", launchpad_events.save_tokens_bought_events),
+        ):
+            indexer.subscribe(
+                name=f"launchpad.{event_name}",
+                address=settings.launchpad_contract_address,
+                abi=LAUNCHPAD_CONTRACT_ADDRESS_ABI,
+                event_name=event_name,
+                handler=handler,
+            )
+        indexer.on_rollback(launchpad_events.delete_events_after_block)
+
+    return indexer
+
+
+# ido staking, blp staking pools and launchpad contracts on blast
+blast_log_indexer = _create_blast_indexer()
+
+log_indexer_by_network = {"blast": blast_log_indexer}
+
+
+def create_multichain_presale_indexer(contract_address: str, project_id: str) -> LogIndexer:
+    """
+    Presale contract of a multichain project, on any network: the contracts come and go
+    with the projects, so every one of them is indexed as a stream of its own
+    """
+    indexer = LogIndexer(f"multichain_launchpad_{contract_address.lower()}")
+    # AmountAndUSD of a transaction is dispatched first, its TokensBought is saved with it
+    indexer.subscribe(
+        name="multichain_presale.AmountAndUSD",
+        address=contract_address,
+        abi=AMOUNT_AND_USD_ABI,
+        event_name="AmountAndUSD",
+        handler=launchpad_events.collect_amount_and_usd_events,
+    )
+    indexer.subscribe(
+        name="multichain_presale.TokensBought",
+        address=contract_address,
+        abi=PRESALE_ABI,
+        event_name="TokensBought",
+        handler=partial(
+            launchpad_events.save_multichain_tokens_bought_events,
+            project_id=project_id,
+            contract_address=contract_address,
+        ),
+    )
+    indexer.on_rollback(
+        partial(launchpad_events.delete_multichain_events_after_block, project_id=project_id)
+    )
+    return indexer
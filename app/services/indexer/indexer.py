@@ -0,0 +1,180 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from eth_typing import ChecksumAddress
+from eth_utils import event_abi_to_log_topic
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3 import AsyncWeb3, Web3
+from web3.types import EventData, LogReceipt
+
+from app.base import logger
+from app.services.indexer.ranges import AdaptiveBlockRange, is_range_error, is_block_limit_error
+
+
+@dataclass
+class LogBatch:
+    """Logs of one block range, saved by the handlers in one session"""
+
+    session: AsyncSession
+    chain_id: int
+    from_block: int
+    to_block: int
+    # called once the session is committed, e.g. to enqueue celery tasks
+    on_commit: list[Callable[[], None]] = field(default_factory=list)
+    # shared by the handlers, e.g. for events of one transaction dispatched to two of them
+    context: dict[str, Any] = field(default_factory=dict)
+
+
+LogHandler = Callable[[LogBatch, list[EventData]], Awaitable[None]]
+# deletes what the handlers saved after the block: (session, chain_id, block_number)
+RollbackHandler = Callable[[AsyncSession, int, int], Awaitable[None]]
+
+
+@dataclass
+class Subscription:
+    name: str
+    address: ChecksumAddress
+    event_abi: dict
+    handler: LogHandler
+
+    @property
+    def topic(self) -> str:
+        return Web3.to_hex(event_abi_to_log_topic(self.event_abi))
+
+
+def _get_event_abi(abi: list[dict], event_name: str) -> dict:
+    for item in abi:
+        if item.get("type") == "event" and item.get("name") == event_name:
+            return item
+    raise ValueError(f"Event {event_name} is not in the abi")
+
+
+class LogIndexer:
+    """
+    Logs of all watched contracts are requested with one eth_getLogs per block range:
+    the filter has every watched address and every topic0, and the logs are decoded
+    and dispatched to the handler subscribed to their (address, topic0).
+    A topic0 of one contract can match a log of another one, such logs are skipped.
+    On a reorg, the rollback handlers delete what was saved from the orphaned blocks.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._subscriptions: dict[tuple[str, str], Subscription] = {}
+        self._rollback_handlers: list[RollbackHandler] = []
+
+    def subscribe(
+        self, name: str, address: str, abi: list[dict], event_name: str, handler: LogHandler
+    ) -> None:
+        subscription = Subscription(
+            name=name,
+            address=Web3.to_checksum_address(address),
+            event_abi=_get_event_abi(abi, event_name),
+            handler=handler,
+        )
+        key = (subscription.address.lower(), subscription.topic)
+        if (subscribed := self._subscriptions.get(key)) is not None:
+            # e.g. contracts with the same address in settings, a log is dispatched only once
+            logger.error(
+                f"Log indexer[{self.name}]: {name} is skipped, {subscribed.name} has the same event"
+            )
+            return
+        if name in {x.name for x in self._subscriptions.values()}:
+            raise ValueError(f"Subscription {name} already exists")
+        self._subscriptions[key] = subscription
+
+    def on_rollback(self, handler: RollbackHandler) -> None:
+        self._rollback_handlers.append(handler)
+
+    def select(self, contract: str) -> "LogIndexer":
+        """
+        Indexer of the subscriptions of one contract: by address or by the name before
+        the event, e.g. `launchpad`, `blp_staking` for all pools or `blp_staking[1]`
+        """
+        indexer = LogIndexer(f"{self.name}.{contract}")
+        for key, subscription in self._subscriptions.items():
+            contract_name = subscription.name.rsplit(".", 1)[0]
+            if contract in (contract_name, contract_name.split("[")[0]) or (
+                subscription.address.lower() == contract.lower()
+            ):
+                indexer._subscriptions[key] = subscription
+        return indexer
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        return list(self._subscriptions.values())
+
+    def get_filter_params(self, from_block: int, to_block: int) -> dict:
+        return {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": sorted({x.address for x in self._subscriptions.values()}),
+            "topics": [sorted({x.topic for x in self._subscriptions.values()})],
+        }
+
+    async def get_logs(
+        self, web3: AsyncWeb3, from_block: int, to_block: int
+    ) -> dict[str, list[EventData]]:
+        """Decoded logs of the range by subscription name, in the order of the chain"""
+        logs: list[LogReceipt] = await web3.eth.get_logs(
+            self.get_filter_params(from_block, to_block)
+        )
+        events_by_subscription: dict[str, list[EventData]] = defaultdict(list)
+        decoders = {}
+        for log in sorted(logs, key=lambda x: (x["blockNumber"], x["logIndex"])):
+            if not log["topics"]:
+                continue
+            key = (log["address"].lower(), Web3.to_hex(log["topics"][0]))
+            if (subscription := self._subscriptions.get(key)) is None:
+                continue
+            if (decoder := decoders.get(key)) is None:
+                contract = web3.eth.contract(
+                    address=subscription.address, abi=[subscription.event_abi]
+                )
+                decoder = decoders[key] = contract.events[subscription.event_abi["name"]]()
+            events_by_subscription[subscription.name].append(decoder.process_log(log))
+        return events_by_subscription
+
+    async def iter_logs(
+        self, web3: AsyncWeb3, from_block: int, to_block: int, block_range: AdaptiveBlockRange
+    ) -> AsyncIterator[tuple[int, int, dict[str, list[EventData]]]]:
+        """
+        Decoded logs of the blocks, requested in ranges of adaptive size:
+        yields every range with its logs once they are fetched.
+        """
+        while from_block <= to_block:
+            range_to_block = block_range.get_to_block(from_block, to_block)
+            try:
+                events_by_subscription = await self.get_logs(web3, from_block, range_to_block)
+            except Exception as e:
+                if not is_range_error(e) or not block_range.shrink(
+                    range_to_block - from_block + 1, is_block_limit=is_block_limit_error(e)
+                ):
+                    raise
+                logger.info(
+                    f"Log indexer[{self.name}]: {from_block=} {range_to_block=} failed: {e}, "
+                    f"range is shrunk to {block_range.size}"
+                )
+                continue
+
+            if not events_by_subscription:
+                block_range.grow()
+            yield from_block, range_to_block, events_by_subscription
+            from_block = range_to_block + 1
+
+    async def dispatch(
+        self, batch: LogBatch, events_by_subscription: dict[str, list[EventData]]
+    ) -> dict[str, int]:
+        """Runs the handlers in the order of subscription, returns the number of events"""
+        n_events = {}
+        for subscription in self._subscriptions.values():
+            if events := events_by_subscription.get(subscription.name):
+                await subscription.handler(batch, events)
+                n_events[subscription.name] = len(events)
+        return n_events
+
+    async def roll_back(self, session: AsyncSession, chain_id: int, block_number: int) -> None:
+        """Deletes events of the blocks after block_number, in the session"""
+        for handler in self._rollback_handlers:
+            await handler(session, chain_id, block_number)
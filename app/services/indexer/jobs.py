@@ -0,0 +1,191 @@
+import traceback
+from collections import Counter
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base import logger
+from app.common import Command, CommandResult
+from app.crud.indexer_checkpoints import IndexerCheckpointsCrud
+from app.dependencies import get_session, get_indexer_checkpoints_crud, get_lock
+from app.env import settings
+from app.services import Lock
+from app.services.lock import LockTimeoutError
+from app.services.blp_staking.cache import stake_blp_history_cache
+from app.services.blp_staking.consts import pool_by_id
+from app.services.chain_head import get_block_number, get_confirmed_block_number
+from app.services.ido_staking.redis_cli import stake_history_redis
+from app.services.indexer.backfill import Backfill
+from app.services.indexer.contracts import blast_log_indexer, log_indexer_by_network
+from app.services.indexer.indexer import LogBatch
+from app.services.indexer.pipeline import IngestionPipeline
+from app.services.indexer.ranges import AdaptiveBlockRange
+from app.services.indexer.redis_cli import indexed_block_cache
+from app.services.launchpad.redis_cli import launchpad_events_cache
+from app.services.web3_nodes import web3_node
+
+
+async def _get_legacy_checked_block(chain_id: int) -> int | None:
+    """
+    The last block scheduled by the indexer before its checkpoint was moved to postgres,
+    or the oldest block checked by the separate monitors of the contracts, which the indexer
+    has replaced: the indexer starts from there, events saved twice are ignored by crud.
+    """
+    if (last_indexed_block := await indexed_block_cache.get(chain_id)) is not None:
+        return last_indexed_block
+    checked_blocks = [
+        await stake_history_redis.get(chain_id),
+        await launchpad_events_cache.get(chain_id),
+        *[await stake_blp_history_cache.get(chain_id, pool_id) for pool_id in pool_by_id],
+    ]
+    checked_blocks = [x for x in checked_blocks if x is not None]
+    return min(checked_blocks) if checked_blocks else None
+
+
+class RunIndexer(Command):
+    """
+    Indexes all watched contracts on blast and follows the head of the chain, until stopped.
+    Only one indexer of a stream runs at a time, the others wait for its lock.
+    """
+
+    async def command(
+        self,
+        crud: IndexerCheckpointsCrud = Depends(get_indexer_checkpoints_crud),
+        lock: Lock = Depends(get_lock),
+    ) -> CommandResult:
+        if not blast_log_indexer.subscriptions:
+            logger.error("Contract events: no contracts to index")
+            return CommandResult(success=False, need_retry=False)
+
+        chain_id = web3_node.get_network_chain_id(network="blast")
+        stream = blast_log_indexer.name
+        async with lock.hold(f"indexer:{stream}", timeout=None):
+            if await crud.get_block_number(chain_id, stream) is None:
+                if (start_block := await _get_legacy_checked_block(chain_id)) is None:
+                    start_block = await get_block_number(network="blast") - 100_000
+                await crud.add(chain_id, stream, start_block)
+                await crud.session.commit()
+                logger.info(f"Contract events: indexing {stream} from {start_block=}")
+
+            pipeline = IngestionPipeline(
+                blast_log_indexer,
+                "blast",
+                fetch_concurrency=settings.indexer_fetch_concurrency,
+                max_ranges_in_flight=settings.indexer_max_ranges_in_flight,
+            )
+            await pipeline.run()
+        return CommandResult(success=True, need_retry=False)
+
+
+class IndexContractLogsAndSave(Command):
+    """
+    Saves events of all watched contracts of the blocks right away, e.g. of a stored
+    transaction, without waiting for the indexer. The checkpoint isn't changed.
+    `chain_id` is the one reported by the nodes, e.g. of blast sepolia on testnet.
+    """
+
+    def __init__(self, from_block: int, to_block: int, chain_id: int) -> None:
+        self.from_block = from_block
+        self.to_block = to_block
+        self.chain_id = chain_id
+
+    async def command(self, session: AsyncSession = Depends(get_session)) -> CommandResult:
+        if self.chain_id != web3_node.get_network_chain_id(network="blast"):
+            logger.error(f"Contract events: no contracts are indexed on {self.chain_id=}")
+            return CommandResult(success=False, need_retry=False)
+
+        web3 = await web3_node.get_web3(network="blast")
+        batch = LogBatch(session, self.chain_id, self.from_block, self.to_block)
+        block_range = await AdaptiveBlockRange.load(self.chain_id, blast_log_indexer.name)
+        n_events, n_ranges = Counter(), 0
+        try:
+            try:
+                async for _, _, events_by_subscription in blast_log_indexer.iter_logs(
+                    web3, self.from_block, self.to_block, block_range
+                ):
+                    n_events.update(await blast_log_indexer.dispatch(batch, events_by_subscription))
+                    n_ranges += 1
+            finally:
+                await block_range.save()
+
+            logger.info(
+                f"Contract events: saving {dict(n_events)}, "
+                f"{n_ranges} ranges, range size {block_range.size}",
+                extra={
+                    "from_block": self.from_block,
+                    "to_block": self.to_block,
+                },
+            )
+            if n_events:
+                await session.commit()
+        except Exception as e:
+            logger.error(
+                f"Contract events: saving error:\n{e}  {traceback.format_exc()}",
+                extra={
+                    "from_block": self.from_block,
+                    "to_block": self.to_block,
+                },
+            )
+            return CommandResult(success=False, need_retry=True)
+
+        for callback in batch.on_commit:
+            callback()
+        return CommandResult(success=True, need_retry=False)
+
+
+class BackfillContractLogs(Command):
+    """
+    Indexes past blocks of one contract, e.g. a new pool, or of all contracts of the network
+    after an outage, next to the running indexer. Up to the confirmed head if to_block isn't set.
+    """
+
+    def __init__(
+        self,
+        network: str,
+        contract: str | None,
+        from_block: int,
+        to_block: int | None,
+        n_workers: int,
+        range_size: int,
+    ) -> None:
+        self.network = network
+        self.contract = contract
+        self.from_block = from_block
+        self.to_block = to_block
+        self.n_workers = n_workers
+        self.range_size = range_size
+
+    async def command(self, lock: Lock = Depends(get_lock)) -> CommandResult:
+        if (indexer := log_indexer_by_network.get(self.network)) is None:
+            logger.error(f"Backfill: no contracts are indexed on {self.network}")
+            return CommandResult(success=False, need_retry=False)
+        if self.contract is not None:
+            indexer = indexer.select(self.contract)
+        if not indexer.subscriptions:
+            logger.error(f"Backfill: no events of {self.contract} are indexed on {self.network}")
+            return CommandResult(success=False, need_retry=False)
+
+        chain_id = web3_node.get_network_chain_id(network=self.network)
+        to_block = self.to_block
+        if to_block is None:
+            to_block = await get_confirmed_block_number(network=self.network)
+        logger.info(
+            f"Backfill[{indexer.name}]: {[x.name for x in indexer.subscriptions]}, "
+            f"{self.n_workers} workers",
+            extra={"from_block": self.from_block, "to_block": to_block},
+        )
+        backfill = Backfill(
+            indexer,
+            self.network,
+            self.from_block,
+            to_block,
+            n_workers=self.n_workers,
+            range_size=self.range_size,
+        )
+        try:
+            async with lock.hold(f"indexer_backfill:{chain_id}:{indexer.name}", timeout=0):
+                success = await backfill.run()
+        except LockTimeoutError:
+            logger.error(f"Backfill[{indexer.name}]: another backfill of {indexer.name} is running")
+            return CommandResult(success=False, need_retry=False)
+        return CommandResult(success=success, need_retry=False)
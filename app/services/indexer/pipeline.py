@@ -0,0 +1,289 @@
+import asyncio
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3 import AsyncWeb3, Web3
+from web3.types import EventData
+
+from app.base import logger, engine
+from app.crud.indexer_checkpoints import IndexerCheckpointsCrud
+from app.env import settings
+from app.services.chain_head import get_confirmed_block_number
+from app.services.indexer.indexer import LogBatch, LogIndexer
+from app.services.indexer.ranges import AdaptiveBlockRange
+from app.services.indexer.redis_cli import indexer_stats_cache
+from app.services.web3_nodes import web3_node
+
+FetchedLogs = list[tuple[int, int, dict[str, list[EventData]]]]
+
+
+class ChainReorgError(Exception):
+    pass
+
+
+@dataclass
+class _FetchedRange:
+    # parent of the first block, the hash of the checkpoint before the range
+    parent_hash: str
+    block_hash: str
+    logs: FetchedLogs
+
+
+@dataclass
+class _RangeInFlight:
+    from_block: int
+    to_block: int
+    fetching: asyncio.Task[_FetchedRange]
+
+
+class IngestionPipeline:
+    """
+    Indexes the logs of a chain up to its head and then follows the head.
+    Ranges are fetched concurrently, at most `max_ranges_in_flight` ahead of the writer,
+    which waits for them in order: the fetcher waits while the queue is full. Every range
+    is saved in one transaction with the checkpoint of the stream, so after an error or
+    a restart indexing continues right after the last saved range.
+    Only blocks `confirmation blocks` under the head are indexed. Checkpoints keep the hash
+    of their block: if the parent of the next range isn't it, the chain was reorganized,
+    and the events after the last checkpoint still on the chain are deleted and indexed again.
+    Rows and redis keys are of the chain id reported by the nodes of `network`, see
+    Web3Node.get_network_chain_id.
+    With `run_to_head` it stops at the head instead, e.g. when run by a periodic command.
+    """
+
+    __RESTART_SECONDS = 5
+
+    def __init__(
+        self,
+        indexer: LogIndexer,
+        network: str,
+        fetch_concurrency: int,
+        max_ranges_in_flight: int,
+    ) -> None:
+        self.indexer = indexer
+        self.network = network
+        self.chain_id = web3_node.get_network_chain_id(network=network)
+        self.fetch_concurrency = fetch_concurrency
+        self.max_ranges_in_flight = max_ranges_in_flight
+
+        self.head: int | None = None
+        self.checkpoint: int | None = None
+        self.checkpoint_hash: str | None = None
+        self._block_range: AdaptiveBlockRange | None = None
+        # None after the last range when the head isn't followed
+        self._queue: asyncio.Queue[_RangeInFlight | None] | None = None
+        self._follow_head = True
+
+        self.started_at = time.monotonic()
+        self.n_blocks = 0
+        self.n_events: Counter[str] = Counter()
+        self.n_errors = 0
+        self.n_reorgs = 0
+
+    async def run(self) -> None:
+        stats_publishing = asyncio.create_task(self._publish_stats_forever())
+        try:
+            while True:
+                try:
+                    await self._run_from_checkpoint()
+                except ChainReorgError as e:
+                    self.n_reorgs += 1
+                    logger.warning(f"Indexer[{self.indexer.name}]: {e}")
+                    await self._roll_back()
+                except Exception as e:
+                    self.n_errors += 1
+                    logger.error(
+                        f"Indexer[{self.indexer.name}]: restarting from {self.checkpoint=}:"
+                        f"\n{e} {traceback.format_exc()}"
+                    )
+                    await asyncio.sleep(self.__RESTART_SECONDS)
+        finally:
+            stats_publishing.cancel()
+
+    async def run_to_head(self) -> bool:
+        """
+        Indexes up to the confirmed head at the start and returns. Returns False after an error:
+        the next run continues from the checkpoint.
+        """
+        self._follow_head = False
+        while True:
+            try:
+                await self._run_from_checkpoint()
+                return True
+            except ChainReorgError as e:
+                self.n_reorgs += 1
+                logger.warning(f"Indexer[{self.indexer.name}]: {e}")
+                await self._roll_back()
+            except Exception as e:
+                self.n_errors += 1
+                logger.error(
+                    f"Indexer[{self.indexer.name}]: stopped at {self.checkpoint=}:"
+                    f"\n{e} {traceback.format_exc()}"
+                )
+                return False
+
+    async def _run_from_checkpoint(self) -> None:
+        async with AsyncSession(engine) as session:
+            checkpoint = await IndexerCheckpointsCrud(session).get_last(
+                self.chain_id, self.indexer.name
+            )
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint of {self.indexer.name} for {self.chain_id=}")
+        self.checkpoint, self.checkpoint_hash = checkpoint.block_number, checkpoint.block_hash
+
+        web3 = await web3_node.get_web3(network=self.network)
+        self.head = await get_confirmed_block_number(network=self.network)
+        self._block_range = await AdaptiveBlockRange.load(self.chain_id, self.indexer.name)
+        self._queue = asyncio.Queue(maxsize=self.max_ranges_in_flight)
+        fetch_semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        scheduling = asyncio.create_task(
+            self._schedule_ranges(web3, self.checkpoint + 1, fetch_semaphore)
+        )
+        try:
+            while (in_flight := await self._queue.get()) is not None:
+                fetched = await in_flight.fetching
+                if self.checkpoint_hash is not None and fetched.parent_hash != self.checkpoint_hash:
+                    raise ChainReorgError(
+                        f"parent of {in_flight.from_block} is {fetched.parent_hash}, "
+                        f"not {self.checkpoint_hash} of the checkpoint"
+                    )
+                await self._save(in_flight, fetched)
+        finally:
+            scheduling.cancel()
+            while not self._queue.empty():
+                if (in_flight := self._queue.get_nowait()) is None:
+                    continue
+                fetching = in_flight.fetching
+                if fetching.done() and not fetching.cancelled():
+                    # the range is fetched again after the restart
+                    fetching.exception()
+                fetching.cancel()
+            await self._block_range.save()
+
+    async def _schedule_ranges(
+        self, web3: AsyncWeb3, from_block: int, fetch_semaphore: asyncio.Semaphore
+    ) -> None:
+        while True:
+            if from_block > self.head:
+                if not self._follow_head:
+                    await self._queue.put(None)
+                    return
+                await asyncio.sleep(settings.chain_head_poll_seconds)
+                try:
+                    self.head = await get_confirmed_block_number(network=self.network)
+                except Exception as e:
+                    logger.warning(f"Indexer[{self.indexer.name}]: can't get head: {e}")
+                continue
+
+            to_block = self._block_range.get_to_block(from_block, self.head)
+            fetching = asyncio.create_task(self._fetch(web3, from_block, to_block, fetch_semaphore))
+            # waits while the writer is max_ranges_in_flight ranges behind
+            await self._queue.put(_RangeInFlight(from_block, to_block, fetching))
+            from_block = to_block + 1
+
+    async def _fetch(
+        self, web3: AsyncWeb3, from_block: int, to_block: int, semaphore: asyncio.Semaphore
+    ) -> _FetchedRange:
+        async with semaphore:
+            from_header, to_header = await asyncio.gather(
+                web3.eth.get_block(from_block), web3.eth.get_block(to_block)
+            )
+            logs = [
+                x
+                async for x in self.indexer.iter_logs(web3, from_block, to_block, self._block_range)
+            ]
+            # the logs are requested by block numbers, they must be of the same blocks
+            if (await web3.eth.get_block(to_block))["hash"] != to_header["hash"]:
+                raise ChainReorgError(f"{to_block=} was reorganized while its logs were fetched")
+        return _FetchedRange(
+            parent_hash=Web3.to_hex(from_header["parentHash"]),
+            block_hash=Web3.to_hex(to_header["hash"]),
+            logs=logs,
+        )
+
+    async def _save(self, in_flight: _RangeInFlight, fetched: _FetchedRange) -> None:
+        async with AsyncSession(engine) as session:
+            batch = LogBatch(session, self.chain_id, in_flight.from_block, in_flight.to_block)
+            n_events = Counter()
+            async with session.begin():
+                for _, _, events_by_subscription in fetched.logs:
+                    n_events.update(await self.indexer.dispatch(batch, events_by_subscription))
+                await IndexerCheckpointsCrud(session).add(
+                    self.chain_id, self.indexer.name, in_flight.to_block, fetched.block_hash
+                )
+
+        self.checkpoint, self.checkpoint_hash = in_flight.to_block, fetched.block_hash
+        self.n_blocks += in_flight.to_block - in_flight.from_block + 1
+        self.n_events.update(n_events)
+        if n_events:
+            logger.info(
+                f"Indexer[{self.indexer.name}]: saved {dict(n_events)}",
+                extra={"from_block": in_flight.from_block, "to_block": in_flight.to_block},
+            )
+        for callback in batch.on_commit:
+            callback()
+
+    async def _roll_back(self) -> None:
+        """
+        Deletes the events after the newest checkpoint whose block is still on the chain,
+        with the checkpoints after it: indexing continues from there.
+        """
+        web3 = await web3_node.get_web3(network=self.network)
+        async with AsyncSession(engine) as session:
+            crud = IndexerCheckpointsCrud(session)
+            async with session.begin():
+                checkpoints = await crud.get_recent(
+                    self.chain_id, self.indexer.name, limit=crud.KEEP_CHECKPOINTS
+                )
+                for checkpoint in checkpoints:
+                    # checkpoints without a hash were seeded, they can't be verified
+                    if checkpoint.block_hash is None:
+                        break
+                    block = await web3.eth.get_block(checkpoint.block_number)
+                    if Web3.to_hex(block["hash"]) == checkpoint.block_hash:
+                        break
+                else:
+                    checkpoint = checkpoints[-1]
+                    logger.error(
+                        f"Indexer[{self.indexer.name}]: no checkpoint is on the chain, "
+                        f"rolling back to the oldest one {checkpoint.block_number}"
+                    )
+                await self.indexer.roll_back(session, self.chain_id, checkpoint.block_number)
+                await crud.delete_after_block(
+                    self.chain_id, self.indexer.name, checkpoint.block_number
+                )
+
+        logger.warning(
+            f"Indexer[{self.indexer.name}]: rolled back from {self.checkpoint} "
+            f"to {checkpoint.block_number}"
+        )
+        self.checkpoint, self.checkpoint_hash = checkpoint.block_number, checkpoint.block_hash
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "stream": self.indexer.name,
+            "chain_id": self.chain_id,
+            "head": self.head,
+            "checkpoint": self.checkpoint,
+            "lag_blocks": self.head - self.checkpoint if self.head and self.checkpoint else None,
+            "ranges_in_flight": self._queue.qsize() if self._queue else 0,
+            "range_size": self._block_range.size if self._block_range else None,
+            "blocks_per_second": round(self.n_blocks / elapsed, 2),
+            "events": dict(self.n_events),
+            "errors": self.n_errors,
+            "reorgs": self.n_reorgs,
+        }
+
+    async def _publish_stats_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.indexer_stats_seconds)
+            stats = self.stats()
+            logger.info(f"Indexer[{self.indexer.name}]: {stats}")
+            try:
+                await indexer_stats_cache.set(stats, self.chain_id, self.indexer.name)
+            except Exception as e:
+                logger.warning(f"Indexer[{self.indexer.name}]: can't publish stats: {e}")
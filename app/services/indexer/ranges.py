@@ -0,0 +1,93 @@
+import asyncio
+from datetime import timedelta
+
+from app.cache import CachedValue, IntCodec
+
+# json-rpc errors of eth_getLogs for a range of more blocks than the node allows,
+# e.g. "exceed maximum block range: 5000"
+BLOCK_LIMIT_MESSAGES = ("block range", "range too large", "range is too large")
+# for a range with too many logs, e.g. "query returned more than 10000 results",
+# "Log response size exceeded", "query timeout exceeded"
+RESULT_LIMIT_MESSAGES = ("more than", "too many results", "response size", "timeout", "timed out")
+
+
+def _get_error_message(error: Exception) -> str:
+    # web3 raises json-rpc errors as ValueError with the error dict
+    if error.args and isinstance(error.args[0], dict):
+        return str(error.args[0].get("message", "")).lower()
+    return str(error).lower()
+
+
+def is_block_limit_error(error: Exception) -> bool:
+    if not isinstance(error, ValueError):
+        return False
+    return any(x in _get_error_message(error) for x in BLOCK_LIMIT_MESSAGES)
+
+
+def is_range_error(error: Exception) -> bool:
+    """The range has to be made smaller: the request itself is fine"""
+    if isinstance(error, asyncio.TimeoutError) or is_block_limit_error(error):
+        return True
+    if not isinstance(error, ValueError):
+        return False
+    return any(x in _get_error_message(error) for x in RESULT_LIMIT_MESSAGES)
+
+
+def _get_block_range_key(chain_id: int, stream: str) -> str:
+    return f"indexer_block_range_{chain_id}_{stream}"
+
+
+block_range_cache = CachedValue(
+    "indexer_block_range",
+    key=_get_block_range_key,
+    codec=IntCodec(),
+    ttl=timedelta(days=7),
+)
+
+
+class AdaptiveBlockRange:
+    """
+    Number of blocks requested with one eth_getLogs. It grows geometrically while
+    ranges have no logs and is halved when the node can't return a range, which is
+    then requested again in two halves. A range over the block limit of the node
+    also caps the growth. The size is remembered per stream of logs.
+    """
+
+    MIN_SIZE = 1
+    MAX_SIZE = 100_000
+    DEFAULT_SIZE = 3000
+    GROWTH = 2
+
+    def __init__(self, chain_id: int, stream: str, size: int = DEFAULT_SIZE) -> None:
+        self.chain_id = chain_id
+        self.stream = stream
+        self.size = size
+        self.max_size = self.MAX_SIZE
+        self.n_grown = 0
+        self.n_shrunk = 0
+
+    @classmethod
+    async def load(cls, chain_id: int, stream: str) -> "AdaptiveBlockRange":
+        size = await block_range_cache.get(chain_id, stream)
+        return cls(chain_id, stream, size or cls.DEFAULT_SIZE)
+
+    async def save(self) -> None:
+        await block_range_cache.set(self.size, self.chain_id, self.stream)
+
+    def get_to_block(self, from_block: int, last_block: int) -> int:
+        return min(last_block, from_block + self.size - 1)
+
+    def grow(self) -> None:
+        if self.size < self.max_size:
+            self.size = min(self.max_size, self.size * self.GROWTH)
+            self.n_grown += 1
+
+    def shrink(self, failed_size: int, is_block_limit: bool = False) -> bool:
+        """Returns False if a range can't be smaller"""
+        if failed_size <= self.MIN_SIZE:
+            return False
+        self.size = max(self.MIN_SIZE, failed_size // 2)
+        if is_block_limit:
+            self.max_size = min(self.max_size, self.size)
+        self.n_shrunk += 1
+        return True
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from app.cache import CachedValue, IntCodec, JsonCodec
+
+
+def _get_last_indexed_block_key(chain_id: int) -> str:
+    return f"last_indexed_contracts_block_{chain_id}"
+
+
+indexed_block_cache = CachedValue(
+    "last_indexed_contracts_block",
+    key=_get_last_indexed_block_key,
+    codec=IntCodec(),
+    ttl=timedelta(hours=25),
+)
+
+
+def _get_indexer_stats_key(chain_id: int, stream: str) -> str:
+    return f"indexer_stats_{chain_id}_{stream}"
+
+
+# published by the running pipeline of the stream
+indexer_stats_cache = CachedValue(
+    "indexer_stats",
+    key=_get_indexer_stats_key,
+    codec=JsonCodec(),
+    ttl=timedelta(minutes=10),
+)
+
+
+def _get_backfill_progress_key(chain_id: int, stream: str, from_block: int, to_block: int) -> str:
+    return f"indexer_backfill_{chain_id}_{stream}_{from_block}_{to_block}"
+
+
+# done ranges of a backfill: {from_block: to_block}
+backfill_progress_cache = CachedValue(
+    "indexer_backfill_progress",
+    key=_get_backfill_progress_key,
+    codec=JsonCodec(),
+    ttl=timedelta(days=30),
+)
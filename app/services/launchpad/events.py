@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3.types import EventData
+
+from app.base import logger
+from app.crud.launchpad_events import LaunchpadContractEventsCrud
+from app.models import LaunchpadContractEventType, LaunchpadEventProjectType
+from app.schema import CreateLaunchpadEvent
+from app.services.indexer import LogBatch
+from app.services.launchpad.types import LaunchpadTransaction, MultichainLaunchpadTransaction
+
+# AmountAndUSD events of the batch by transaction hash, for TokensBought of the transactions
+_AMOUNT_AND_USD = "multichain_amount_and_usd"
+
+
+async def save_user_registered_events(batch: LogBatch, events: list[EventData]) -> None:
+    await LaunchpadContractEventsCrud(batch.session).add_events(
+        [
+            CreateLaunchpadEvent(
+                event_type=LaunchpadContractEventType.USER_REGISTERED,
+                token_address=event.args["token"],
+                user_address=event.args["user"],
+                txn_hash=event.transactionHash.hex(),
+                chain_id=batch.chain_id,
+                contract_project_id=event.args["id"],
+                extra={"tier": event.args["tier"]},
+                block_number=event.blockNumber,
+            )
+            for event in events
+        ]
+    )
+
+
+async def save_tokens_bought_events(batch: LogBatch, events: list[EventData]) -> None:
+    params, txns = [], []
+    for event in events:
+        txn_hash = event.transactionHash.hex()
+        user_address = event.args["buyer"]
+        contract_project_id = event.args["id"]
+        token_amount = str(event.args["amount"])
+        params.append(
+            CreateLaunchpadEvent(
+                event_type=LaunchpadContractEventType.TOKENS_BOUGHT,
+                token_address=event.args["token"],
+                user_address=user_address,
+                txn_hash=txn_hash,
+                chain_id=batch.chain_id,
+                contract_project_id=contract_project_id,
+                extra={"amount": token_amount},
+                block_number=event.blockNumber,
+            )
+        )
+        txns.append(
+            LaunchpadTransaction(
+                user_address, txn_hash, contract_project_id, int(token_amount), batch.chain_id
+            )
+        )
+    saved_txn_hashes = await LaunchpadContractEventsCrud(batch.session).add_events(params)
+    # tasks of events saved before, e.g. by the indexer before a backfill, were enqueued then
+    txns = [x for x in txns if x.txn_hash in saved_txn_hashes]
+    if not txns:
+        return
+
+    def add_points() -> None:
+        from app.tasks import save_launchpad_txn_and_add_points
+
+        for i, txn in enumerate(txns, start=1):
+            save_launchpad_txn_and_add_points.apply_async(
+                kwargs={
+                    "user_address": txn.user_address,
+                    "txn_hash": txn.txn_hash,
+                    "contract_project_id": txn.contract_project_id,
+                    "token_amount": txn.token_amount,
+                    "chain_id": txn.chain_id,
+                },
+                countdown=i,
+            )
+
+    batch.on_commit.append(add_points)
+
+
+async def delete_events_after_block(
+    session: AsyncSession, chain_id: int, block_number: int
+) -> None:
+    await LaunchpadContractEventsCrud(session).delete_after_block(
+        chain_id, block_number, LaunchpadEventProjectType.DEFAULT
+    )
+
+
+async def delete_multichain_events_after_block(
+    session: AsyncSession, chain_id: int, block_number: int, project_id: str
+) -> None:
+    """Only of the project: presale contracts of other projects on the chain are other streams"""
+    await LaunchpadContractEventsCrud(session).delete_after_block(
+        chain_id, block_number, LaunchpadEventProjectType.MULTICHAIN, project_id=project_id
+    )
+
+
+async def collect_amount_and_usd_events(batch: LogBatch, events: list[EventData]) -> None:
+    """Subscribed before TokensBought: its events are saved with these ones"""
+    amount_and_usd_by_txn = batch.context.setdefault(_AMOUNT_AND_USD, defaultdict(list))
+    for event in events:
+        amount_and_usd_by_txn[event.transactionHash.hex()].append(event.args)
+
+
+async def save_multichain_tokens_bought_events(
+    batch: LogBatch, events: list[EventData], project_id: str, contract_address: str
+) -> None:
+    amount_and_usd_by_txn = batch.context.get(_AMOUNT_AND_USD, {})
+    params, txns = [], []
+    for event in events:
+        txn_hash = event.transactionHash.hex()
+        # the presale contract emits AmountAndUSD with every TokensBought
+        if not (amount_and_usd := amount_and_usd_by_txn.get(txn_hash)):
+            logger.error(f"Multichain launchpad: no AmountAndUSD event in {txn_hash}")
+            continue
+        amount_and_usd_args = amount_and_usd.pop(0)
+        token_amount = amount_and_usd_args["amount"]
+        user_address = event.args["user"]
+        params.append(
+            CreateLaunchpadEvent(
+                event_type=LaunchpadContractEventType.TOKENS_BOUGHT,
+                user_address=user_address,
+                project_id=project_id,
+                project_type=LaunchpadEventProjectType.MULTICHAIN,
+                txn_hash=txn_hash,
+                chain_id=batch.chain_id,
+                extra={"amount": str(token_amount)},
+                block_number=event.blockNumber,
+            )
+        )
+        txns.append(
+            MultichainLaunchpadTransaction(
+                user_address=user_address,
+                txn_hash=txn_hash,
+                project_id=project_id,
+                token_amount=token_amount,
+                chain_id=batch.chain_id,
+                usd_rate=amount_and_usd_args["usd"] / 1e8,
+                presale_contract_address=contract_address,
+            )
+        )
+    if not params:
+        return
+    saved_txn_hashes = await LaunchpadContractEventsCrud(batch.session).add_events(params)
+    txns = [x for x in txns if x.txn_hash in saved_txn_hashes]
+    if not txns:
+        return
+
+    def add_points() -> None:
+        from app.tasks import save_multichain_launchpad_txn_and_add_points
+
+        for i, txn in enumerate(txns, start=1):
+            save_multichain_launchpad_txn_and_add_points.apply_async(
+                kwargs=txn._asdict(), countdown=i
+            )
+
+    batch.on_commit.append(add_points)
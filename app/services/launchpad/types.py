@@ -9,6 +9,16 @@ class LaunchpadTransaction(NamedTuple):
     chain_id: int
 
 
+class MultichainLaunchpadTransaction(NamedTuple):
+    user_address: str
+    txn_hash: str
+    project_id: str
+    token_amount: int
+    chain_id: int
+    usd_rate: float
+    presale_contract_address: str
+
+
 class BuyTokensInput(TypedDict):
     id: int  # noqa
     paymentContract: str
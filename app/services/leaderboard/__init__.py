@@ -0,0 +1 @@
+from app.services.leaderboard.redis_cli import leaderboard_redis
@@ -0,0 +1,44 @@
+from fastapi import Depends
+
+from app.base import logger
+from app.common import Command, CommandResult
+from app.crud.profiles import ProfilesCrud
+from app.dependencies import get_profile_crud, get_lock
+from app.services import Lock
+from app.services.leaderboard.redis_cli import leaderboard_redis
+from app.services.lock import LockTimeoutError
+
+
+class RebuildLeaderboard(Command):
+    """Rebuilds points and referrals of the leaderboard in redis from postgres"""
+
+    __PAGE_SIZE = 5000
+
+    async def command(
+        self,
+        profile_crud: ProfilesCrud = Depends(get_profile_crud),
+        lock: Lock = Depends(get_lock),
+    ) -> CommandResult:
+        try:
+            async with lock.hold("rebuild-leaderboard", timeout=0):
+                await self._rebuild(profile_crud)
+        except LockTimeoutError:
+            logger.info("Leaderboard: another rebuild is in progress")
+        return CommandResult(success=True, need_retry=False)
+
+    async def _rebuild(self, profile_crud: ProfilesCrud) -> None:
+        await leaderboard_redis.start_rebuild()
+        last_id, n_profiles = 0, 0
+        while rows := await profile_crud.get_points_after_id(last_id, self.__PAGE_SIZE):
+            await leaderboard_redis.add_rebuilt_points(
+                {address: points for _, address, points in rows}
+            )
+            last_id = rows[-1][0]
+            n_profiles += len(rows)
+
+        referrals_by_address = await profile_crud.count_referrals_by_referrer()
+        await leaderboard_redis.finish_rebuild(referrals_by_address)
+        logger.info(
+            f"Leaderboard: rebuilt with {n_profiles} profiles, "
+            f"{len(referrals_by_address)} referrers"
+        )
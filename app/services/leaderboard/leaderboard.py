@@ -0,0 +1,21 @@
+from typing import Sequence
+
+from app.dependencies import ProfileCrudDep
+from app.schema import LeaderboardData
+from app.services.leaderboard.redis_cli import leaderboard_redis
+
+
+async def get_leaderboard_rank(address: str, profile_crud: ProfileCrudDep) -> int:
+    if (rank := await leaderboard_redis.get_rank(address)) is not None:
+        return rank
+    # the leaderboard hasn't been built yet
+    return await profile_crud.get_leaderboard_rank(address)
+
+
+async def get_leaderboard_page(
+    page: int, size: int, profile_crud: ProfileCrudDep
+) -> Sequence[LeaderboardData]:
+    offset = (page - 1) * size
+    if (rows := await leaderboard_redis.get_page(offset, size)) is not None:
+        return rows
+    return await profile_crud.get_top_by_points(limit=size, offset=offset)
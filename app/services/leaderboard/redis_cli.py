@@ -0,0 +1,208 @@
+from decimal import Decimal
+
+from redis.asyncio import Redis
+
+from app.redis import redis_cli, hash_tag, atomic_pipeline
+from app.schema import LeaderboardData
+
+# KEYS: points, distinct points, counts of distinct points, versions of points (live and
+# rebuilt ones), rebuilding flag; ARGV: address, points, version
+_SET_POINTS_SCRIPT = """
+local function set_points(
+    points_key, distinct_key, counts_key, versions_key, address, points, version
+)
+    local last_version = redis.call("HGET", versions_key, address)
+    if last_version and tonumber(last_version) >= tonumber(version) then
+        return
+    end
+    redis.call("HSET", versions_key, address, version)
+    local old = redis.call("ZSCORE", points_key, address)
+    if old and tonumber(old) == tonumber(points) then
+        return
+    end
+    if old and redis.call("HINCRBY", counts_key, old, -1) <= 0 then
+        redis.call("HDEL", counts_key, old)
+        redis.call("ZREM", distinct_key, old)
+    end
+    redis.call("ZADD", points_key, points, address)
+    -- members of distinct points are formatted by redis, the same way as ZSCORE
+    local new = redis.call("ZSCORE", points_key, address)
+    if redis.call("HINCRBY", counts_key, new, 1) == 1 then
+        redis.call("ZADD", distinct_key, new, new)
+    end
+end
+
+set_points(KEYS[1], KEYS[2], KEYS[3], KEYS[4], ARGV[1], ARGV[2], ARGV[3])
+if redis.call("EXISTS", KEYS[9]) == 1 then
+    set_points(KEYS[5], KEYS[6], KEYS[7], KEYS[8], ARGV[1], ARGV[2], ARGV[3])
+end
+"""
+# KEYS: referrals (live and rebuilt ones), rebuilding flag; ARGV: referrer
+_ADD_REFERRAL_SCRIPT = """
+redis.call("HINCRBY", KEYS[1], ARGV[1], 1)
+if redis.call("EXISTS", KEYS[3]) == 1 then
+    redis.call("HINCRBY", KEYS[2], ARGV[1], 1)
+end
+"""
+# KEYS: points, distinct points, built flag; ARGV: address
+_GET_RANK_SCRIPT = """
+if redis.call("EXISTS", KEYS[3]) == 0 then
+    return false
+end
+local points = redis.call("ZSCORE", KEYS[1], ARGV[1])
+if not points then
+    return 0
+end
+return redis.call("ZREVRANK", KEYS[2], points) + 1
+"""
+# KEYS: points, distinct points, referrals, built flag; ARGV: start, stop
+_GET_PAGE_SCRIPT = """
+if redis.call("EXISTS", KEYS[4]) == 0 then
+    return false
+end
+local rows = redis.call("ZREVRANGE", KEYS[1], ARGV[1], ARGV[2], "WITHSCORES")
+if #rows == 0 then
+    return {0, {}, {}}
+end
+local addresses = {}
+for i = 1, #rows, 2 do
+    addresses[#addresses + 1] = rows[i]
+end
+local first_rank = redis.call("ZREVRANK", KEYS[2], rows[2]) + 1
+return {first_rank, rows, redis.call("HMGET", KEYS[3], unpack(addresses))}
+"""
+
+
+class LeaderboardRedis:
+    """
+    Points of all profiles in a sorted set, updated by AddPoints and rebuilt from postgres
+    by RebuildLeaderboard, with the number of referrals of every referrer.
+    Ranks are dense as in ProfilesCrud: profiles with equal points share a rank.
+    Distinct points are kept in a second sorted set, so any rank is one ZREVRANK.
+    Points of an address are set with a version, the id of its last points history row:
+    updates may come in any order, also while the leaderboard is being rebuilt, and an
+    older one is ignored. Rebuilt points have version 0, so a committed update wins.
+    Until the first rebuild, reads return None.
+    """
+
+    __REBUILDING_TTL_SECONDS = 600
+
+    def __init__(self, redis_cli: Redis):
+        self.redis_cli = redis_cli
+        self._set_points_script = redis_cli.register_script(_SET_POINTS_SCRIPT)
+        self._add_referral_script = redis_cli.register_script(_ADD_REFERRAL_SCRIPT)
+        self._get_rank_script = redis_cli.register_script(_GET_RANK_SCRIPT)
+        self._get_page_script = redis_cli.register_script(_GET_PAGE_SCRIPT)
+
+    @staticmethod
+    def _get_keys(prefix: str = "") -> tuple[str, str, str, str, str]:
+        """
+        Points, distinct points, counts of distinct points, versions of points and referrals,
+        in one slot
+        """
+        key = f"{hash_tag('leaderboard')}:{prefix}"
+        return (
+            f"{key}points",
+            f"{key}distinct",
+            f"{key}distinct_counts",
+            f"{key}versions",
+            f"{key}referrals",
+        )
+
+    @staticmethod
+    def _get_flag_key(name: str) -> str:
+        return f"{hash_tag('leaderboard')}:{name}"
+
+    def _get_set_points_keys(self) -> list[str]:
+        return [
+            *self._get_keys()[:4],
+            *self._get_keys("rebuilt:")[:4],
+            self._get_flag_key("rebuilding"),
+        ]
+
+    async def set_points(self, address: str, points: float | Decimal, version: int) -> None:
+        await self._set_points_script(
+            keys=self._get_set_points_keys(), args=[address.lower(), float(points), version]
+        )
+
+    async def add_referral(self, referrer: str) -> None:
+        # mirrored into the rebuilt counts as points are, or the swap would lose the referral
+        await self._add_referral_script(
+            keys=[
+                self._get_keys()[4],
+                self._get_keys("rebuilt:")[4],
+                self._get_flag_key("rebuilding"),
+            ],
+            args=[referrer.lower()],
+        )
+
+    async def get_rank(self, address: str) -> int | None:
+        points_key, distinct_key, *_ = self._get_keys()
+        return await self._get_rank_script(
+            keys=[points_key, distinct_key, self._get_flag_key("built")], args=[address.lower()]
+        )
+
+    async def get_page(self, offset: int, limit: int) -> list[LeaderboardData] | None:
+        points_key, distinct_key, _, _, referrals_key = self._get_keys()
+        res = await self._get_page_script(
+            keys=[points_key, distinct_key, referrals_key, self._get_flag_key("built")],
+            args=[offset, offset + limit - 1],
+        )
+        if res is None:
+            return None
+        rank, rows, users_invited = res
+        page = []
+        for i, users_invited_by_address in enumerate(users_invited):
+            address, points = rows[2 * i], rows[2 * i + 1]
+            if i > 0 and points != rows[2 * i - 1]:
+                rank += 1
+            page.append(
+                LeaderboardData(
+                    rank=rank,
+                    address=address.decode(),
+                    users_invited=int(users_invited_by_address or 0),
+                    points=float(points),
+                )
+            )
+        return page
+
+    async def start_rebuild(self) -> None:
+        """From now on, updates go to the rebuilt leaderboard too"""
+        await (
+            self.redis_cli.pipeline(transaction=False)
+            .delete(*self._get_keys("rebuilt:"))
+            .set(self._get_flag_key("rebuilding"), 1, ex=self.__REBUILDING_TTL_SECONDS)
+            .execute()
+        )
+
+    async def add_rebuilt_points(self, points_by_address: dict[str, float | Decimal]) -> None:
+        keys = self._get_set_points_keys()
+        async with self.redis_cli.pipeline(transaction=False) as pipe:
+            for address, points in points_by_address.items():
+                await self._set_points_script(
+                    keys=keys, args=[address.lower(), float(points), 0], client=pipe
+                )
+            await pipe.execute()
+
+    async def finish_rebuild(self, referrals_by_address: dict[str, int]) -> None:
+        """Replaces the leaderboard with the rebuilt one"""
+        live_keys, rebuilt_keys = self._get_keys(), self._get_keys("rebuilt:")
+        if referrals_by_address:
+            await self.redis_cli.hset(rebuilt_keys[4], mapping=referrals_by_address)
+        # RENAME fails on a missing key, e.g. when there are no profiles
+        exists_pipe = self.redis_cli.pipeline(transaction=False)
+        for rebuilt_key in rebuilt_keys:
+            exists_pipe.exists(rebuilt_key)
+        exists = await exists_pipe.execute()
+
+        async with atomic_pipeline(self.redis_cli) as pipe:
+            pipe.delete(*live_keys)
+            for rebuilt_key, live_key, rebuilt_key_exists in zip(rebuilt_keys, live_keys, exists):
+                if rebuilt_key_exists:
+                    pipe.rename(rebuilt_key, live_key)
+            pipe.set(self._get_flag_key("built"), 1)
+            pipe.delete(self._get_flag_key("rebuilding"))
+            await pipe.execute()
+
+
+leaderboard_redis = LeaderboardRedis(redis_cli=redis_cli)
@@ -1,22 +1,172 @@
+"""
+Distributed lock in redis.
+
+A lock is taken with SET NX PX by a random owner token, only the owner can extend
+or release it. Every acquisition gets a fencing token, a number which grows with every
+new holder of the lock: a holder which was paused past its TTL and lost the lock
+can be told apart from the current one. Waiters block on BLPOP of a list which
+is pushed to on release, instead of polling, and wake up when the lock expires.
+
+    async with lock.hold("add-ido-points") as lease:
+        ...
+        lease.check()  # raises LockLostError if the lock has been lost
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import timedelta
+from typing import AsyncIterator
 
 from redis.asyncio import Redis
 
+from app.base import logger
+from app.redis import hash_tag
+
+DEFAULT_TTL = timedelta(minutes=5)
+# a waiter retries at least this often, e.g. when the release message is taken by another one
+_MAX_WAIT_SECONDS = 5
+_MIN_WAIT_SECONDS = 0.01
+
+# KEYS: lock, fencing counter; ARGV: owner token, ttl ms
+_ACQUIRE_SCRIPT = """
+if redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+    return redis.call("INCR", KEYS[2])
+end
+return false
+"""
+# KEYS: lock; ARGV: owner token, ttl ms
+_EXTEND_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+# KEYS: lock, released list; ARGV: owner token, ttl ms of the release message
+_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    redis.call("RPUSH", KEYS[2], 1)
+    redis.call("PEXPIRE", KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class LockTimeoutError(Exception):
+    pass
+
+
+class LockLostError(Exception):
+    pass
+
+
+@dataclass
+class LockLease:
+    name: str
+    token: str
+    fencing_token: int
+    ttl: timedelta
+    lost: bool = False
+
+    def check(self) -> None:
+        if self.lost:
+            raise LockLostError(f"Lock {self.name} (fencing token {self.fencing_token}) is lost")
+
+
+def _to_ms(ttl: timedelta) -> int:
+    return int(ttl.total_seconds() * 1000)
+
 
 class Lock:
     def __init__(self, redis: Redis):
         self.redis = redis
+        self._acquire_script = redis.register_script(_ACQUIRE_SCRIPT)
+        self._extend_script = redis.register_script(_EXTEND_SCRIPT)
+        self._release_script = redis.register_script(_RELEASE_SCRIPT)
+
+    @staticmethod
+    def _get_keys(name: str) -> tuple[str, str, str]:
+        """
+        The lock, its fencing counter and released list, in one cluster slot.
+        The lock keeps the key of the INCR lock it replaces, so that workers of both kinds
+        exclude each other during a rolling deploy. A key without a tag is hashed whole,
+        so the tag of the name puts the other keys into the slot of the lock.
+        """
+        return name, f"{hash_tag(name)}:fencing", f"{hash_tag(name)}:released"
+
+    async def acquire(
+        self, name: str, ttl: timedelta = DEFAULT_TTL, timeout: float | None = 0
+    ) -> LockLease | None:
+        """
+        Takes the lock, waiting for `timeout` seconds (forever if None) while it is held.
+        Returns None if the lock hasn't been taken.
+        """
+        key, fencing_key, released_key = self._get_keys(name)
+        token = uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fencing_token = await self._acquire_script(
+                keys=[key, fencing_key], args=[token, _to_ms(ttl)]
+            )
+            if fencing_token is not None:
+                return LockLease(name, token, int(fencing_token), ttl)
+
+            # the holder may die without releasing, then the lock expires without a message
+            lock_ttl_ms = await self.redis.pttl(key)
+            wait_seconds = min(max(lock_ttl_ms / 1000, _MIN_WAIT_SECONDS), _MAX_WAIT_SECONDS)
+            if deadline is not None:
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    return None
+                wait_seconds = min(wait_seconds, remaining)
+            await self.redis.blpop([released_key], timeout=wait_seconds)
 
-    async def acquire(self, key: str) -> bool:
-        acquired = await self.redis.incr(key) == 1
-        if acquired:
-            await self.redis.expire(key, time=timedelta(minutes=5))
+    async def extend(self, lease: LockLease, ttl: timedelta | None = None) -> bool:
+        """Resets TTL of the lock if it is still held by the lease"""
+        key, _, _ = self._get_keys(lease.name)
+        extended = await self._extend_script(
+            keys=[key], args=[lease.token, _to_ms(ttl or lease.ttl)]
+        )
+        if not extended:
+            lease.lost = True
+        return bool(extended)
 
-        return acquired
+    async def release(self, lease: LockLease) -> bool:
+        """Releases the lock if it is still held by the lease and wakes up a waiter"""
+        key, _, released_key = self._get_keys(lease.name)
+        return bool(
+            await self._release_script(
+                keys=[key, released_key], args=[lease.token, _to_ms(lease.ttl)]
+            )
+        )
 
-    async def expire(self, key: str, time: int | timedelta):
-        if await self.redis.exists(key):
-            await self.redis.expire(key, time=time)
+    async def _keep_extended(self, lease: LockLease) -> None:
+        while True:
+            await asyncio.sleep(lease.ttl.total_seconds() / 3)
+            try:
+                if not await self.extend(lease):
+                    logger.error(f"Lock {lease.name}: lost by {lease.fencing_token=}")
+                    return
+            except Exception as e:
+                # the lock expires after ttl, until then extending is retried
+                logger.warning(f"Lock {lease.name}: can't extend: {e}")
 
-    async def release(self, key: str):
-        return await self.redis.delete(key)
+    @asynccontextmanager
+    async def hold(
+        self, name: str, ttl: timedelta = DEFAULT_TTL, timeout: float | None = None
+    ) -> AsyncIterator[LockLease]:
+        """
+        Holds the lock for a block of any duration: the lock is extended every ttl / 3,
+        so `ttl` only limits how long the lock outlives a dead holder.
+        """
+        if (lease := await self.acquire(name, ttl, timeout)) is None:
+            raise LockTimeoutError(f"Lock {name} is not acquired in {timeout}s")
+        extending = asyncio.create_task(self._keep_extended(lease))
+        try:
+            yield lease
+        finally:
+            extending.cancel()
+            await self.release(lease)
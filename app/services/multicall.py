@@ -0,0 +1,105 @@
+import asyncio
+
+from eth_utils import to_bytes
+from web3 import AsyncWeb3
+from web3.exceptions import ContractLogicError
+from web3.types import BlockIdentifier
+
+from app.base import logger
+from app.consts import MULTICALL_ADDRESS
+from app.env import settings
+from app.selectors import try_aggregate_selector
+from app.services.abi_codec import encode_try_aggregate, decode_try_aggregate
+
+# (target contract address, encoded call data)
+Call = tuple[str, bytes]
+# (success, return data)
+CallResult = tuple[bool, bytes]
+
+# every (bool, bytes) item of tryAggregate result takes an offset, bool, length and data words
+_RESULT_OVERHEAD_BYTES = 4 * 32
+
+_TRY_AGGREGATE_SELECTOR = to_bytes(hexstr=try_aggregate_selector)
+
+# json-rpc errors of eth_call for a chunk over the limits of the node, e.g. "out of gas",
+# "gas required exceeds allowance", "returndata too large", "response size exceeded"
+CHUNK_LIMIT_MESSAGES = ("gas", "returndata", "return data", "response size", "too large")
+
+
+def is_chunk_error(error: Exception) -> bool:
+    """The chunk itself has failed: smaller chunks may pass, unlike on a node failure"""
+    if isinstance(error, ContractLogicError):
+        # e.g. a call which reverts without tryAggregate's allowFailure
+        return True
+    if not isinstance(error, ValueError):
+        return False
+    # web3 raises json-rpc errors as ValueError with the error dict
+    if error.args and isinstance(error.args[0], dict):
+        message = str(error.args[0].get("message", "")).lower()
+    else:
+        message = str(error).lower()
+    return "revert" in message or any(x in message for x in CHUNK_LIMIT_MESSAGES)
+
+
+def _split_calls(calls: list[Call], returndata_size: int) -> list[list[Call]]:
+    per_call_bytes = _RESULT_OVERHEAD_BYTES + (returndata_size + 31) // 32 * 32
+    chunk_size = max(
+        1,
+        min(
+            settings.multicall_max_calls,
+            settings.multicall_max_returndata_bytes // per_call_bytes,
+        ),
+    )
+    return [calls[i : i + chunk_size] for i in range(0, len(calls), chunk_size)]
+
+
+async def try_aggregate(
+    web3: AsyncWeb3,
+    calls: list[Call],
+    block_identifier: BlockIdentifier | None = None,
+    returndata_size: int = 32,
+) -> list[CallResult]:
+    """
+    Calls every call through Multicall3.tryAggregate and returns results in the same order.
+    Calls are split into chunks by count and estimated return data size (in bytes per call),
+    chunks are sent concurrently. A chunk over the gas or return data limit of the node is
+    retried by bisection, node and transport errors are raised.
+    Without block_identifier, all chunks are pinned to the current block.
+    """
+    if not calls:
+        return []
+    chunks = _split_calls(calls, returndata_size)
+    if block_identifier is None:
+        # a single chunk is consistent by itself
+        block_identifier = "latest" if len(chunks) == 1 else await web3.eth.block_number
+
+    semaphore = asyncio.Semaphore(settings.multicall_concurrency)
+    results = await asyncio.gather(
+        *(_call_chunk(web3, chunk, block_identifier, semaphore) for chunk in chunks)
+    )
+    return [result for chunk_results in results for result in chunk_results]
+
+
+async def _call_chunk(
+    web3: AsyncWeb3,
+    calls: list[Call],
+    block_identifier: BlockIdentifier,
+    semaphore: asyncio.Semaphore,
+) -> list[CallResult]:
+    data = "0x" + encode_try_aggregate(_TRY_AGGREGATE_SELECTOR, False, calls).hex()
+    try:
+        async with semaphore:
+            tx_raw_data = await web3.eth.call(
+                {"to": MULTICALL_ADDRESS, "data": data}, block_identifier=block_identifier
+            )
+    except Exception as e:
+        if len(calls) == 1 or not is_chunk_error(e):
+            raise
+        logger.warning(f"Multicall: chunk of {len(calls)} calls failed, bisecting: {e}")
+        middle = len(calls) // 2
+        left, right = await asyncio.gather(
+            _call_chunk(web3, calls[:middle], block_identifier, semaphore),
+            _call_chunk(web3, calls[middle:], block_identifier, semaphore),
+        )
+        return left + right
+    return decode_try_aggregate(bytes(tx_raw_data))
@@ -2,13 +2,21 @@ from decimal import Decimal, getcontext
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.base import logger
 from app.crud.points import PointsHistoryCrud, ExtraPointsCrud
 from app.crud.profiles import ProfilesCrud
 from app.models import Profile, PointsHistory, OperationType, OperationReason
 from app.schema import Language
+from app.services.leaderboard.redis_cli import leaderboard_redis
 
 
 class AddPoints:
+    """
+    Adds points in the transaction of the caller. The leaderboard is updated by the caller
+    after the commit with `update_leaderboard`, or the points are forgotten on a rollback
+    with `discard_leaderboard_points`.
+    """
+
     def __init__(
         self,
         profile_crud: ProfilesCrud,
@@ -18,6 +26,8 @@ class AddPoints:
         self.profile_crud = profile_crud
         self.points_history_crud = points_history_crud
         self.extra_points_crud = extra_points_crud
+        # points and versions of addresses changed in the transaction
+        self._leaderboard_points: dict[str, tuple[Decimal, int]] = {}
 
     async def add_points(
         self,
@@ -91,4 +101,19 @@ class AddPoints:
             extra_points.points += extra_amount
             await self.extra_points_crud.persist(extra_points, session)
 
+        # the profile row is locked until commit: ids of its history rows grow in commit order
+        self._leaderboard_points[address.lower()] = (profile.points, history.id)
         return profile
+
+    async def update_leaderboard(self) -> None:
+        """Sets the points added in a committed transaction on the leaderboard"""
+        leaderboard_points, self._leaderboard_points = self._leaderboard_points, {}
+        for address, (points, version) in leaderboard_points.items():
+            try:
+                await leaderboard_redis.set_points(address, points, version)
+            except Exception as e:
+                # the points are saved, the leaderboard is fixed by the next rebuild
+                logger.error(f"Leaderboard: can't set points of {address}: {e}")
+
+    def discard_leaderboard_points(self) -> None:
+        self._leaderboard_points.clear()
@@ -1,63 +1,58 @@
-import asyncio
-from datetime import timedelta, datetime
+from datetime import datetime
 
-from redis.asyncio import Redis
-
-from app.dependencies import get_redis
+from app.cache import CachedValue, FloatCodec, TextCodec, NO_EXPIRATION
+from app.redis import hash_tag
 from app.schema import ChainId, Address
 
 
-class TokenPriceCache:
-    def __init__(self, redis_cli: Redis) -> None:
-        self._redis_cli = redis_cli
-
-    @property
-    def redis(self):
-        return self._redis_cli
-
-    def __get_cache_key(self, chain_id: ChainId, address: Address) -> str:
-        return f"tkn-price-{chain_id}-{address.lower()}"
-
-    def __get_chain_id_with_address_from_cache_key(self, cache_key: str) -> tuple[ChainId, Address]:
-        chain_id, address = cache_key.split("-")[2:]
-        return ChainId(int(chain_id)), Address(address)
-
-    async def set_token_price_cache_updated_at(self):
-        key = "tkn-price-updated_at"
-        await self.redis.set(key, datetime.utcnow().isoformat())
-
-    async def get_token_price_cache_updated_at(self) -> str | None:
-        key = "tkn-price-updated_at"
-        return await self.redis.get(key)
-
-    async def set(  # noqa
-        self, prices: dict[ChainId, dict[Address, float | None]], ex: timedelta | None = None
-    ) -> None:  # noqa
-        tasks = []
-        for chain_id, addr_to_price in prices.items():
-            for address, price in addr_to_price.items():
-                cache_key = self.__get_cache_key(chain_id, address)
-                if price and isinstance(price, float):
-                    tasks.append(self.redis.set(cache_key, price, ex=ex))
-        await asyncio.gather(*tasks)
-
-    async def get(
-        self, addresses_by_chain_id: dict[ChainId, list[str]]
-    ) -> dict[ChainId, dict[Address, float]]:
-        keys = [
-            self.__get_cache_key(chain_id, Address(address))
-            for chain_id, addr_list in addresses_by_chain_id.items()
-            for address in addr_list
-        ]
-        if not (data := await self.redis.mget(keys)):
-            return {}
-
-        res: dict[ChainId, dict[Address, float]] = {}
-        for key, value in zip(keys, data):
-            chain_id, address = self.__get_chain_id_with_address_from_cache_key(key)
-            if value:
-                res.setdefault(chain_id, {})[address] = float(value)
-        return res
-
-
-token_price_cache = TokenPriceCache(redis_cli=get_redis())
+def _get_token_price_key(chain_id: ChainId, address: Address) -> str:
+    # prices of a chain are read together, with one MGET in a cluster too
+    return f"tkn-price-{hash_tag(chain_id)}-{address.lower()}"
+
+
+def _get_token_price_updated_at_key() -> str:
+    return "tkn-price-updated_at"
+
+
+token_price_cache = CachedValue(
+    "token_price", key=_get_token_price_key, codec=FloatCodec(), ttl=NO_EXPIRATION
+)
+token_price_updated_at_cache = CachedValue(
+    "token_price_updated_at",
+    key=_get_token_price_updated_at_key,
+    codec=TextCodec(),
+    ttl=NO_EXPIRATION,
+)
+
+
+async def set_token_price_cache_updated_at() -> None:
+    await token_price_updated_at_cache.set(datetime.utcnow().isoformat())
+
+
+async def set_token_prices(prices: dict[ChainId, dict[Address, float | None]]) -> None:
+    await token_price_cache.set_many(
+        {
+            token_price_cache.key(chain_id, address): price
+            for chain_id, addr_to_price in prices.items()
+            for address, price in addr_to_price.items()
+            if price and isinstance(price, float)
+        }
+    )
+
+
+async def get_token_prices(
+    addresses_by_chain_id: dict[ChainId, list[str]],
+) -> dict[ChainId, dict[Address, float]]:
+    chain_ids_with_addresses = [
+        (chain_id, Address(address))
+        for chain_id, addr_list in addresses_by_chain_id.items()
+        for address in addr_list
+    ]
+    prices = await token_price_cache.get_many(
+        token_price_cache.key(chain_id, address) for chain_id, address in chain_ids_with_addresses
+    )
+    res: dict[ChainId, dict[Address, float]] = {}
+    for (chain_id, address), price in zip(chain_ids_with_addresses, prices):
+        if price:
+            res.setdefault(chain_id, {})[Address(address.lower())] = price
+    return res
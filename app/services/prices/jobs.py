@@ -9,7 +9,7 @@ from app.crud.supported_tokens import SupportedTokensCrud
 from app.dependencies import get_supported_tokens_crud
 from app.schema import ChainId, Address
 from app.services.coingecko.client import coingecko_cli
-from app.services.prices.cache import token_price_cache
+from app.services.prices.cache import set_token_prices
 
 
 class UpdateSupportedTokensCache(Command):
@@ -40,5 +40,5 @@ class UpdateSupportedTokensCache(Command):
                 prices_agg[chain_id] = prices
 
         if prices_agg:
-            await token_price_cache.set(prices_agg)
+            await set_token_prices(prices_agg)
         return CommandResult(success=True)
@@ -6,7 +6,7 @@ from typing import Any
 from app.base import logger
 from app.schema import ChainId, Address, TokenInChain, RatesForChainAndToken
 from app.services.coingecko.client import coingecko_cli
-from app.services.prices.cache import token_price_cache
+from app.services.prices.cache import get_token_prices
 
 
 async def get_tokens_price_for_chain(
@@ -19,7 +19,7 @@ async def get_tokens_price_for_chain(
         return {}
 
     # try to get from cache
-    cached_prices_for_chain_id = await token_price_cache.get({chain_id: token_addresses})
+    cached_prices_for_chain_id = await get_token_prices({chain_id: token_addresses})
     cached_prices = cached_prices_for_chain_id.get(chain_id, {})
 
     if len(token_addresses) == len(cached_prices):
@@ -1,12 +1,16 @@
 from app.dependencies import ProfileCrudDep
-from app.services.referral_system.cache import referral_redis
+from app.services.referral_system.cache import n_referrals_cache
 
 
 async def get_n_referrals(address: str, profile_crud: ProfileCrudDep):
-    cached_n_referrals = await referral_redis.get_n_referrals(address)
+    cached_n_referrals = await n_referrals_cache.get(address)
     if cached_n_referrals is not None:
         return cached_n_referrals
+    return await count_n_referrals(address, profile_crud)
 
+
+async def count_n_referrals(address: str, profile_crud: ProfileCrudDep) -> int:
+    """Counts referrals in the db, e.g. after a cache miss, and caches the number"""
     n_referrals = await profile_crud.count_referrals(referrer=address)
-    await referral_redis.set_n_referrals(address, n_referrals)
+    await n_referrals_cache.set(n_referrals, address)
     return n_referrals
@@ -0,0 +1,131 @@
+import time
+from collections import deque
+from enum import Enum
+from typing import Any
+
+from app.env import settings
+
+# the open period is capped by the settings long before, the power just mustn't overflow
+_MAX_DOUBLINGS = 32
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Health of one rpc endpoint.
+    closed: requests pass, their outcomes are kept in a sliding window. The breaker opens
+        when the error rate in the window is too high or too many requests failed in a row.
+    open: no requests are sent until the open period is over. Every time the breaker opens
+        again without recovering in between, the period is doubled up to the max.
+    half_open: a single probe request is let through: success closes the breaker,
+        failure opens it again. Outcomes of other requests still in flight don't count
+        as the probe's.
+    """
+
+    def __init__(self) -> None:
+        # (monotonic time, failed) of the requests in the window
+        self._window: deque[tuple[float, bool]] = deque()
+        self._window_errors = 0
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+    def state(self, now: float) -> BreakerState:
+        if self.open_until > now:
+            return BreakerState.OPEN
+        if self.times_opened > 0:
+            return BreakerState.HALF_OPEN
+        return BreakerState.CLOSED
+
+    def allows_request(self, now: float) -> bool:
+        state = self.state(now)
+        if state == BreakerState.OPEN:
+            return False
+        return state == BreakerState.CLOSED or not self.probe_in_flight
+
+    def acquire_probe(self, now: float) -> bool:
+        if self.state(now) != BreakerState.HALF_OPEN or self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        self.probe_in_flight = False
+
+    def _add_to_window(self, now: float, failed: bool) -> None:
+        self._window.append((now, failed))
+        self._window_errors += failed
+        expired_at = now - settings.rpc_breaker_window_seconds
+        while self._window and self._window[0][0] < expired_at:
+            _, expired_failed = self._window.popleft()
+            self._window_errors -= expired_failed
+
+    def error_rate(self) -> float:
+        return self._window_errors / len(self._window) if self._window else 0.0
+
+    def record_success(self, is_probe: bool = False) -> bool:
+        """Returns True if the breaker has been closed by this request"""
+        self._add_to_window(time.monotonic(), failed=False)
+        self.consecutive_failures = 0
+        if not (is_probe and self.probe_in_flight):
+            return False
+        self.close()
+        return True
+
+    def record_failure(self, is_probe: bool = False) -> float | None:
+        """Returns the open period if the breaker has been opened by this request"""
+        now = time.monotonic()
+        self._add_to_window(now, failed=True)
+        self.consecutive_failures += 1
+
+        was_probe = is_probe and self.probe_in_flight
+        if was_probe:
+            self.probe_in_flight = False
+        if not (
+            was_probe
+            or self.consecutive_failures >= settings.rpc_breaker_consecutive_failures
+            or (
+                len(self._window) >= settings.rpc_breaker_min_requests
+                and self.error_rate() >= settings.rpc_breaker_error_rate
+            )
+        ):
+            return None
+        seconds = min(
+            settings.rpc_breaker_open_seconds * 2 ** min(self.times_opened, _MAX_DOUBLINGS),
+            settings.rpc_breaker_max_open_seconds,
+        )
+        return seconds if self.trip(seconds) else None
+
+    def trip(self, seconds: float) -> bool:
+        """Opens the breaker, returns False if it's open for longer already"""
+        open_until = time.monotonic() + seconds
+        if open_until <= self.open_until:
+            return False
+        self.open_until = open_until
+        self.times_opened += 1
+        self.consecutive_failures = 0
+        # requests made before the breaker has opened shouldn't open it again after the probe
+        self._window.clear()
+        self._window_errors = 0
+        return True
+
+    def close(self) -> None:
+        self.open_until = 0.0
+        self.times_opened = 0
+        self.probe_in_flight = False
+
+    def stats(self, now: float) -> dict[str, Any]:
+        return {
+            "state": self.state(now).value,
+            "error_rate": round(self.error_rate(), 4),
+            "window_requests": len(self._window),
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "open_for_seconds": round(max(self.open_until - now, 0), 2),
+        }
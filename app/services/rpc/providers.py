@@ -0,0 +1,287 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass, asdict
+from typing import Any
+from urllib.parse import urlsplit
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from eth_utils import to_bytes
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3.types import RPCEndpoint, RPCResponse
+
+from app.base import logger
+from app.env import settings
+from app.schema import ChainId
+
+# responses of these methods are too large to be put together with other requests
+NOT_BATCHED_METHODS = {"eth_getLogs"}
+# json-rpc errors of nodes without batches: "invalid request", "method not found" or
+# a server error, e.g. "Batch requests are not supported", "batch requests are disabled",
+# "Batch requests are not available on your current plan"
+BATCH_NOT_SUPPORTED_CODES = {-32600, -32601, -32000}
+BATCH_NOT_SUPPORTED_MESSAGE = re.compile(
+    r"\bbatch(es| requests?)? (are |is )?"
+    r"(not supported|unsupported|disabled|not allowed|not available|not enabled)"
+)
+
+
+class MalformedResponseError(Exception):
+    pass
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    batched_requests: int = 0
+
+
+class ChainConnectionPool:
+    """
+    One keep-alive aiohttp session per chain, shared by all endpoints of this chain.
+    Total connections are capped per chain and per endpoint host.
+    """
+
+    def __init__(self, chain_id: ChainId, limit: int, limit_per_host: int) -> None:
+        self.chain_id = chain_id
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.sessions_created = 0
+        self.stats_by_host: dict[str, EndpointStats] = {}
+        self._session: ClientSession | None = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+
+    async def _get_session(self) -> ClientSession:
+        # sessions are bound to the loop they were created in: celery tasks and
+        # console commands may run several loops during the process lifetime
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            await self.close()
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=settings.rpc_keepalive_timeout_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(
+                    total=settings.rpc_request_timeout_seconds,
+                    connect=settings.rpc_connect_timeout_seconds,
+                ),
+                raise_for_status=True,
+            )
+            self._session_loop = loop
+            self.sessions_created += 1
+        return self._session
+
+    async def post(self, endpoint_uri: str, data: bytes, **kwargs: Any) -> bytes:
+        stats = self.stats_by_host.setdefault(_get_host(endpoint_uri), EndpointStats())
+        stats.requests += 1
+        stats.in_flight += 1
+        try:
+            session = await self._get_session()
+            async with session.post(endpoint_uri, data=data, **kwargs) as response:
+                return await response.read()
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+
+    async def close(self) -> None:
+        # also a session of a closed loop: closing the connector awaits nothing of the loop,
+        # its transports are closed right away
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "chain_id": self.chain_id,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "sessions_created": self.sessions_created,
+            "in_flight": sum(x.in_flight for x in self.stats_by_host.values()),
+            "endpoints": {host: asdict(stats) for host, stats in self.stats_by_host.items()},
+        }
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider which sends requests through a long-lived ChainConnectionPool.
+    Requests made while other requests to the node are in flight are sent together within
+    RPC_BATCH_WINDOW_MS as one JSON-RPC batch, a request made alone is sent right away.
+    """
+
+    __BATCHING_RETRY_SECONDS = 600
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        pool: ChainConnectionPool,
+        request_kwargs: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.pool = pool
+        self.batching_disabled_until = 0.0
+        self._batch: list[tuple[int, bytes, asyncio.Future]] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._batch_loop: asyncio.AbstractEventLoop | None = None
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if (
+            settings.rpc_batch_max_size < 2
+            or time.monotonic() < self.batching_disabled_until
+            or method in NOT_BATCHED_METHODS
+        ):
+            return await self._post(self.encode_rpc_request(method, params))
+
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            # state of a previous loop, e.g. of the last celery task: its handle never runs
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._batch, self._flush_handle, self._flush_tasks = [], None, set()
+            self._batch_loop = loop
+
+        request_id = next(self.request_counter)
+        rpc_dict = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id}
+        request_data = to_bytes(text=FriendlyJsonSerde().json_encode(rpc_dict, Web3JsonEncoder))
+        future = loop.create_future()
+        self._batch.append((request_id, request_data, future))
+        if len(self._batch) >= settings.rpc_batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self._flush_tasks:
+                self._flush_handle = loop.call_later(
+                    settings.rpc_batch_window_ms / 1000, self._flush
+                )
+            else:
+                # nothing to wait for: requests made in the same iteration of the loop are
+                # still sent together
+                self._flush_handle = loop.call_soon(self._flush)
+        return await future
+
+    async def _post(self, request_data: bytes) -> Any:
+        raw_response = await self.pool.post(
+            self.endpoint_uri, request_data, **self.get_request_kwargs()
+        )
+        return self.decode_rpc_response(raw_response)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        # callers cancelled while waiting for the window (e.g. lost a hedge) are dropped
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _send_batch(self, batch: list[tuple[int, bytes, asyncio.Future]]) -> None:
+        try:
+            if len(batch) == 1:
+                _, request_data, future = batch[0]
+                response = await self._post(request_data)
+                if not future.done():
+                    future.set_result(response)
+                return
+
+            host = _get_host(self.endpoint_uri)
+            stats = self.pool.stats_by_host.setdefault(host, EndpointStats())
+            stats.batched_requests += len(batch)
+            responses = await self._post(b"[" + b",".join(data for _, data, _ in batch) + b"]")
+            if isinstance(responses, dict) and _is_batch_not_supported_error(responses):
+                # requests are sent one by one for a while, the node may be upgraded
+                logger.warning(f"RPC batches aren't supported by {host}: {responses['error']}")
+                self.batching_disabled_until = time.monotonic() + self.__BATCHING_RETRY_SECONDS
+                await asyncio.gather(*(self._send_batch([item]) for item in batch))
+                return
+            if isinstance(responses, dict) and "error" in responses:
+                # an error of the whole batch, e.g. rate limit: it's the error of every request
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_result(responses)
+                return
+            if not isinstance(responses, list):
+                raise MalformedResponseError(f"Unexpected response to a batch: {responses}")
+
+            response_by_id = {response.get("id"): response for response in responses}
+            for request_id, _, future in batch:
+                if future.done():
+                    continue
+                if (response := response_by_id.get(request_id)) is not None:
+                    future.set_result(response)
+                else:
+                    future.set_exception(
+                        MalformedResponseError(f"No response for request {request_id}")
+                    )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class ProviderRegistry:
+    """
+    Keeps one AsyncWeb3 instance per (chain_id, endpoint url, headers),
+    so switching between nodes never creates new sessions or TLS handshakes.
+    """
+
+    def __init__(self) -> None:
+        self._pool_by_chain_id: dict[ChainId, ChainConnectionPool] = {}
+        self._web3_by_key: dict[tuple, AsyncWeb3] = {}
+
+    def get_pool(self, chain_id: ChainId) -> ChainConnectionPool:
+        if (pool := self._pool_by_chain_id.get(chain_id)) is None:
+            pool = ChainConnectionPool(
+                chain_id,
+                limit=settings.rpc_pool_limit_by_chain_id.get(chain_id, settings.rpc_pool_limit),
+                limit_per_host=settings.rpc_pool_limit_per_host,
+            )
+            self._pool_by_chain_id[chain_id] = pool
+        return pool
+
+    def get_web3(
+        self, chain_id: ChainId, endpoint_uri: str, headers: dict[str, str] | None = None
+    ) -> AsyncWeb3:
+        key = (chain_id, endpoint_uri, tuple(sorted((headers or {}).items())))
+        if (web3 := self._web3_by_key.get(key)) is None:
+            request_kwargs = {"headers": headers} if headers else None
+            provider = PooledHTTPProvider(endpoint_uri, self.get_pool(chain_id), request_kwargs)
+            web3 = AsyncWeb3(provider)
+            self._web3_by_key[key] = web3
+        return web3
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [pool.stats() for pool in self._pool_by_chain_id.values()]
+
+    async def close(self) -> None:
+        for pool in self._pool_by_chain_id.values():
+            await pool.close()
+
+
+def _is_batch_not_supported_error(response: dict) -> bool:
+    if not isinstance(error := response.get("error"), dict):
+        return BATCH_NOT_SUPPORTED_MESSAGE.search(str(error).lower()) is not None
+    if (code := error.get("code")) is not None and code not in BATCH_NOT_SUPPORTED_CODES:
+        return False
+    return BATCH_NOT_SUPPORTED_MESSAGE.search(str(error.get("message", "")).lower()) is not None
+
+
+def _get_host(endpoint_uri: str) -> str:
+    # never expose full urls: most of them contain api keys
+    url = urlsplit(endpoint_uri)
+    host = url.hostname or "unknown"
+    return f"{host}:{url.port}" if url.port else host
+
+
+provider_registry = ProviderRegistry()
@@ -0,0 +1,385 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from aiohttp import ClientError
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from app.base import logger
+from app.env import settings
+from app.schema import ChainId
+from app.services.rpc.breaker import BreakerState, CircuitBreaker
+from app.services.rpc.providers import MalformedResponseError, PooledHTTPProvider
+
+# don't send the same transaction to several nodes
+NOT_RETRYABLE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+
+# read-only methods which may be sent to a second endpoint when the first one is slow
+HEDGED_METHODS = {"eth_call", "eth_getLogs", "eth_getTransactionByHash", "eth_blockNumber"}
+
+# json-rpc errors returned by overloaded or rate limited nodes, for any request
+NODE_ERROR_MESSAGES = ("rate limit", "too many requests", "capacity", "overloaded")
+
+
+class WrongChainError(Exception):
+    """The node is of another chain than its router"""
+
+
+class NoEndpointsError(Exception):
+    pass
+
+
+class NodeResponseError(Exception):
+    """The node has answered with an error which isn't caused by the request itself"""
+
+    def __init__(self, response: RPCResponse) -> None:
+        super().__init__(response["error"])
+        self.response = response
+
+
+# errors which mean that the node itself is unhealthy (not the request):
+# reverts and invalid params are returned as json-rpc errors and don't get here
+ENDPOINT_ERRORS = (
+    ClientError,
+    asyncio.TimeoutError,
+    OSError,
+    json.JSONDecodeError,
+    MalformedResponseError,
+    NodeResponseError,
+    WrongChainError,
+)
+
+_EWMA_ALPHA = 0.2
+_ERROR_PENALTY = 10
+_DEFAULT_LATENCY_SECONDS = 0.3
+_LATENCY_WINDOW = 200
+_LATENCY_MIN_SAMPLES = 20
+_P95_RECALC_EVERY = 10
+
+
+class MethodLatencies:
+    """Sliding window of the latest successful request latencies for every rpc method"""
+
+    def __init__(self) -> None:
+        self._latencies_by_method: dict[str, deque[float]] = {}
+        self._samples_by_method: dict[str, int] = {}
+        self._p95_by_method: dict[str, float] = {}
+
+    def add(self, method: str, latency: float) -> None:
+        if (latencies := self._latencies_by_method.get(method)) is None:
+            latencies = self._latencies_by_method[method] = deque(maxlen=_LATENCY_WINDOW)
+        latencies.append(latency)
+        samples = self._samples_by_method[method] = self._samples_by_method.get(method, 0) + 1
+        # sorting the window on every request is a waste, p95 moves slowly anyway
+        if len(latencies) >= _LATENCY_MIN_SAMPLES and samples % _P95_RECALC_EVERY == 0:
+            ordered = sorted(latencies)
+            self._p95_by_method[method] = ordered[int(len(ordered) * 0.95)]
+
+    def p95(self, method: str) -> float | None:
+        return self._p95_by_method.get(method)
+
+    def hedge_delay(self, method: str) -> float:
+        delay = self.p95(method) or settings.rpc_hedge_default_delay_seconds
+        return max(delay, settings.rpc_hedge_min_delay_seconds)
+
+    def stats(self) -> dict[str, float]:
+        return {method: round(p95 * 1000, 2) for method, p95 in self._p95_by_method.items()}
+
+
+class RpcEndpoint:
+    def __init__(self, name: str, provider: PooledHTTPProvider, priority: int) -> None:
+        self.name = name
+        self.provider = provider
+        self.priority = priority
+        self.breaker = CircuitBreaker()
+        self.chain_id_checked = False
+        # endpoints of another chain are never used again
+        self.disabled_reason: str | None = None
+
+        self.ewma_latency: float | None = None
+        self.ewma_error_rate = 0.0
+
+    def weight(self, default_latency: float) -> float:
+        latency = self.ewma_latency or default_latency
+        # earlier endpoints in the pool are preferred when latencies are close
+        priority_coef = 0.5**self.priority
+        return priority_coef / (latency * (1 + _ERROR_PENALTY * self.ewma_error_rate))
+
+    def stats(self, now: float) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "priority": self.priority,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 2) if self.ewma_latency else None,
+            "ewma_error_rate": round(self.ewma_error_rate, 4),
+            "breaker": self.breaker.stats(now),
+            "disabled": self.disabled_reason,
+        }
+
+
+class EndpointRouter:
+    """
+    Ordered pool of node endpoints for one chain.
+    Every request goes to an endpoint picked at random with weight inversely proportional
+    to its EWMA latency and error rate. Endpoints with an open circuit breaker are skipped,
+    half-open ones get a single probe request before anything else.
+    """
+
+    def __init__(
+        self,
+        chain_id: ChainId,
+        endpoints: list[RpcEndpoint],
+        on_breaker_change: (
+            Callable[[ChainId, str, BreakerState, float], Awaitable[None]] | None
+        ) = None,
+    ) -> None:
+        assert endpoints, f"No rpc endpoints for {chain_id=}"
+        self.chain_id = chain_id
+        self.endpoints = endpoints
+        self.latencies = MethodLatencies()
+        self.hedged_requests = 0
+        self._on_breaker_change = on_breaker_change
+
+    def get_enabled_endpoints(self) -> list[RpcEndpoint]:
+        if not (enabled := [e for e in self.endpoints if e.disabled_reason is None]):
+            raise NoEndpointsError(f"All rpc endpoints of {self.chain_id} are disabled")
+        return enabled
+
+    def select_available(self, exclude: set[str] | None = None) -> tuple[RpcEndpoint, bool] | None:
+        """
+        Endpoint whose breaker lets a request through, and whether the request is the probe
+        of its half-open breaker: the probe has to be recorded or released by the caller.
+        None if every breaker is open.
+        """
+        now = time.monotonic()
+        candidates = [
+            endpoint
+            for endpoint in self.get_enabled_endpoints()
+            if (not exclude or endpoint.name not in exclude)
+            and endpoint.breaker.allows_request(now)
+        ]
+        if not candidates:
+            return None
+
+        for endpoint in candidates:
+            if endpoint.breaker.acquire_probe(now):
+                return endpoint, True
+
+        latencies = [e.ewma_latency for e in candidates if e.ewma_latency]
+        default_latency = min(latencies) if latencies else _DEFAULT_LATENCY_SECONDS
+        weights = [endpoint.weight(default_latency) for endpoint in candidates]
+        return random.choices(candidates, weights=weights)[0], False
+
+    def select(self, exclude: set[str] | None = None) -> tuple[RpcEndpoint, bool]:
+        if (selected := self.select_available(exclude)) is not None:
+            return selected
+        # every breaker is open: the endpoint which will be back first is the best bet
+        enabled = self.get_enabled_endpoints()
+        pool = [e for e in enabled if not exclude or e.name not in exclude]
+        return min(pool or enabled, key=lambda e: e.breaker.open_until), False
+
+    async def record_success(
+        self, endpoint: RpcEndpoint, latency: float, is_probe: bool = False
+    ) -> None:
+        if endpoint.ewma_latency is None:
+            endpoint.ewma_latency = latency
+        else:
+            endpoint.ewma_latency += _EWMA_ALPHA * (latency - endpoint.ewma_latency)
+        endpoint.ewma_error_rate *= 1 - _EWMA_ALPHA
+        if endpoint.breaker.record_success(is_probe):
+            logger.info(f"RPC router[{self.chain_id}]: {endpoint.name} breaker is closed")
+            if self._on_breaker_change is not None:
+                await self._on_breaker_change(self.chain_id, endpoint.name, BreakerState.CLOSED, 0)
+
+    def record_cancel(self, endpoint: RpcEndpoint, elapsed: float, is_probe: bool = False) -> None:
+        # the request lost a hedge race: its latency is unknown, but it's at least `elapsed`
+        if is_probe:
+            endpoint.breaker.release_probe()
+        if endpoint.ewma_latency is not None and elapsed > endpoint.ewma_latency:
+            endpoint.ewma_latency += _EWMA_ALPHA * (elapsed - endpoint.ewma_latency)
+
+    async def record_failure(self, endpoint: RpcEndpoint, is_probe: bool = False) -> None:
+        endpoint.ewma_error_rate += _EWMA_ALPHA * (1 - endpoint.ewma_error_rate)
+        if (seconds := endpoint.breaker.record_failure(is_probe)) is None:
+            return
+        logger.warning(f"RPC router[{self.chain_id}]: {endpoint.name} breaker open for {seconds}s")
+        if self._on_breaker_change is not None:
+            await self._on_breaker_change(self.chain_id, endpoint.name, BreakerState.OPEN, seconds)
+
+    def disable(self, endpoint: RpcEndpoint, reason: str) -> None:
+        endpoint.disabled_reason = reason
+        logger.error(f"RPC router[{self.chain_id}]: {endpoint.name} is disabled: {reason}")
+
+    def apply_breaker_change(self, name: str, state: BreakerState, seconds: float) -> None:
+        """Applies a breaker change made by another worker"""
+        for endpoint in self.endpoints:
+            if endpoint.name != name:
+                continue
+            if state == BreakerState.OPEN and endpoint.breaker.trip(seconds):
+                logger.warning(f"RPC router[{self.chain_id}]: {name} breaker open for {seconds}s")
+            elif state == BreakerState.CLOSED:
+                endpoint.breaker.close()
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "chain_id": self.chain_id,
+            "hedged_requests": self.hedged_requests,
+            "p95_latency_ms": self.latencies.stats(),
+            "endpoints": [endpoint.stats(now) for endpoint in self.endpoints],
+        }
+
+
+class RoutedProvider(AsyncJSONBaseProvider):
+    """
+    Provider which sends every request to the best endpoint of the router with failover.
+    With hedging enabled, read-only requests which take longer than p95 of the method
+    are sent to a second endpoint as well, and the first answer wins.
+    eth_chainId is answered locally: web3 asks for it before every eth_call. Instead,
+    the chain id of every endpoint is checked once before its first request, and endpoints
+    of another chain, e.g. with a wrong url in the config, are disabled.
+    """
+
+    def __init__(self, router: EndpointRouter, chain_id: ChainId) -> None:
+        super().__init__()
+        self.router = router
+        self.chain_id = chain_id
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method == "eth_chainId":
+            request_id = next(self.request_counter)
+            return {"jsonrpc": "2.0", "id": request_id, "result": hex(self.chain_id)}
+        if (
+            settings.rpc_hedging_enabled
+            and method in HEDGED_METHODS
+            and len(self.router.get_enabled_endpoints()) > 1
+        ):
+            return await self._make_hedged_request(method, params)
+        return await self._make_request(method, params, tried=set())
+
+    def _has_attempts_left(self, method: RPCEndpoint, tried: set[str]) -> bool:
+        # an endpoint disabled by the request itself, e.g. of a wrong chain, isn't an attempt
+        enabled = self.router.get_enabled_endpoints()
+        attempts = sum(endpoint.name in tried for endpoint in enabled)
+        max_attempts = 1 if method in NOT_RETRYABLE_METHODS else settings.rpc_max_attempts
+        return attempts < min(max_attempts, len(enabled))
+
+    async def _make_request(
+        self,
+        method: RPCEndpoint,
+        params: Any,
+        tried: set[str],
+        error: BaseException | None = None,
+    ) -> RPCResponse:
+        while error is None or self._has_attempts_left(method, tried):
+            endpoint, is_probe = self.router.select(exclude=tried)
+            if endpoint.name in tried:
+                # every enabled endpoint has been tried: select falls back to a tried one
+                break
+            tried.add(endpoint.name)
+            try:
+                return await self._send(endpoint, method, params, is_probe)
+            except WrongChainError as e:
+                # the error of an endpoint of the chain tells more
+                error = error or e
+            except ENDPOINT_ERRORS as e:
+                error = e
+
+        if isinstance(error, NodeResponseError):
+            # let web3 raise the error as usual
+            return error.response
+        raise error
+
+    async def _make_hedged_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        primary, is_probe = self.router.select()
+        tried = {primary.name}
+        tasks = {asyncio.create_task(self._send(primary, method, params, is_probe))}
+        error: BaseException | None = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.router.latencies.hedge_delay(method))
+            # a hedge is only sent to an endpoint which takes requests now
+            if not done and (selected := self.router.select_available(exclude=tried)):
+                secondary, is_probe = selected
+                tried.add(secondary.name)
+                tasks.add(asyncio.create_task(self._send(secondary, method, params, is_probe)))
+                self.router.hedged_requests += 1
+
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if (error := task.exception()) is None:
+                        return task.result()
+                    if not isinstance(error, ENDPOINT_ERRORS):
+                        raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # every hedged endpoint has failed: fail over to the rest of them
+        return await self._make_request(method, params, tried, error)
+
+    async def _send(
+        self, endpoint: RpcEndpoint, method: RPCEndpoint, params: Any, is_probe: bool = False
+    ) -> RPCResponse:
+        started_at = time.perf_counter()
+        try:
+            if not endpoint.chain_id_checked:
+                await self._check_chain_id(endpoint)
+            response = await endpoint.provider.make_request(method, params)
+            if not isinstance(response, dict):
+                raise MalformedResponseError(f"Unexpected response: {response!r:.100}")
+            if _is_node_error(response):
+                raise NodeResponseError(response)
+        except asyncio.CancelledError:
+            self.router.record_cancel(endpoint, time.perf_counter() - started_at, is_probe)
+            raise
+        except ENDPOINT_ERRORS as e:
+            logger.warning(f"RPC router[{self.router.chain_id}]: {endpoint.name} {method}: {e}")
+            await self.router.record_failure(endpoint, is_probe)
+            raise
+
+        latency = time.perf_counter() - started_at
+        await self.router.record_success(endpoint, latency, is_probe)
+        self.router.latencies.add(method, latency)
+        return response
+
+    async def _check_chain_id(self, endpoint: RpcEndpoint) -> None:
+        response = await endpoint.provider.make_request("eth_chainId", [])
+        if not isinstance(response, dict) or "result" not in response:
+            raise MalformedResponseError(f"Unexpected eth_chainId response: {response!r:.100}")
+        endpoint.chain_id_checked = True
+        if (chain_id := int(response["result"], 16)) != self.chain_id:
+            self.router.disable(endpoint, f"chain id is {chain_id}, expected {self.chain_id}")
+            raise WrongChainError(f"{endpoint.name} is of chain {chain_id}")
+
+    async def check_chain_ids(self) -> None:
+        """Checks all endpoints at once, raises if none of them is of the chain"""
+        for endpoint in self.router.endpoints:
+            if endpoint.chain_id_checked:
+                continue
+            try:
+                await self._check_chain_id(endpoint)
+            except WrongChainError:
+                pass
+            except ENDPOINT_ERRORS as e:
+                # checked again before the first request
+                logger.warning(f"RPC router[{self.chain_id}]: can't check {endpoint.name}: {e}")
+        self.router.get_enabled_endpoints()
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        endpoint, is_probe = self.router.select()
+        try:
+            return await endpoint.provider.is_connected(show_traceback)
+        finally:
+            if is_probe:
+                endpoint.breaker.release_probe()
+
+
+def _is_node_error(response: RPCResponse) -> bool:
+    if not isinstance(error := response.get("error"), dict):
+        return False
+    message = str(error.get("message", "")).lower()
+    return any(part in message for part in NODE_ERROR_MESSAGES)
@@ -1,10 +1,8 @@
 import asyncio
 
-from eth_abi import decode
 from fastapi import Depends
 from web3 import Web3
 
-from app.abi import LAUNCHPAD_PLACE_TOKENS_ABI
 from app.base import logger
 from app.common import Command, CommandResult
 from app.crud import LaunchpadProjectCrud
@@ -12,6 +10,7 @@ from app.dependencies import get_launchpad_projects_crud
 from app.env import settings
 from app.models import ProjectType
 from app.router.v1.proxy import fetch_data
+from app.selectors import placed_tokens_fn
 from app.services.total_raised.multicall import get_multicall_token_placed
 from app.services.web3_nodes import web3_node
 from app.types import PlacedToken, ProjectIdWithRaised
@@ -54,9 +53,7 @@ class RecalculateProjectsTotalRaised(Command):
             logger.info(f"Recalculating project {project_id}, {success=}")
             if not data:
                 continue
-            info = PlacedToken(
-                *decode(types=[x["type"] for x in LAUNCHPAD_PLACE_TOKENS_ABI["outputs"]], data=data)
-            )
+            info = PlacedToken(*placed_tokens_fn.decode_output(data))
             token_price = Web3.from_wei(info.price, "ether")
             volume = Web3.from_wei(info.volume, "ether")  # tokens left
             if volume < 1:
@@ -1,28 +1,34 @@
+import asyncio
 import contextvars
 import functools
 import json
+import time
 import traceback
-from datetime import timedelta
+import uuid
+from typing import Any, Callable
 
 from redis.asyncio import Redis, from_url
-from web3 import AsyncWeb3, AsyncHTTPProvider
+from redis.exceptions import RedisError
+from web3 import AsyncWeb3
 from web3.exceptions import Web3Exception, TransactionNotFound
 
 from app.env import settings
 from app.schema import ChainId
 from app.base import logger
 from app import chains
+from app.services.rpc.providers import provider_registry
+from app.services.rpc.breaker import BreakerState
+from app.services.rpc.routing import EndpointRouter, RoutedProvider, RpcEndpoint
 
 
 chain_id_ctx = contextvars.ContextVar("chain_id")
 
-ERROR_COUNTS_TO_SWITCH_TO_FALLBACK = 5
-
 
 def catch_web3_exceptions(func):
     """
-    If a Web3 exception is caught, the error is logged and the error count is incremented.
-    If the error count exceeds a certain threshold, the fallback node URL is set.
+    Web3 errors are logged with the chain they happened on and re-raised.
+    Node failures are counted per endpoint by circuit breakers of the rpc router, so
+    reverts and invalid input caught here never switch traffic away from a node.
     """
 
     @functools.wraps(func)
@@ -30,30 +36,31 @@ def catch_web3_exceptions(func):
         try:
             return await func(self, *args, **kwargs)
         except (Web3Exception, ValueError) as e:
-            if (chain_id := chain_id_ctx.get()) and not isinstance(e, TransactionNotFound):
-                logger.error(f"Caught web3 error: {e}\n\n{traceback.format_exc()}")
-                # Increment the error count for this chain_id
-                err_counts = await web3_node_redis.increment_web3_errors_count(chain_id)
-                logger.info(f"Error count for {chain_id=}: {err_counts}")
-                if (
-                    err_counts > ERROR_COUNTS_TO_SWITCH_TO_FALLBACK
-                    and not await web3_node_redis.fallback_url_exists(chain_id)
-                ):
-                    # Exceed number of error and no fallback => set the fallback node URL
-                    fallback_url = web3_node.get_fallback_node_url(chain_id)
-                    logger.info(f"Setting fallback URL for {chain_id=}")
-                    await web3_node_redis.set_fallback_node_url(chain_id=chain_id, url=fallback_url)
+            if (chain_id := chain_id_ctx.get(None)) and not isinstance(e, TransactionNotFound):
+                logger.error(f"Caught web3 error for {chain_id=}: {e}\n\n{traceback.format_exc()}")
             raise e
 
     return wrapper
 
 
 class Web3NodeRedis:
-    __FALLBACK_NODE_MINUTES = 5
-    __WEB3_ERRORS_INTERVAL_MINUTES = 1
+    """
+    Circuit breaker changes are published to BREAKERS_CHANNEL, so once one api or celery
+    worker opens a breaker of a broken node, all the others stop sending requests to it too,
+    and once the node has recovered they start using it again without their own probes.
+    Nothing is read from redis on the hot path of get_web3.
+    """
+
+    BREAKERS_CHANNEL = "web3_node_breakers"
+    __LISTENER_RESTART_SECONDS = 5
 
     def __init__(self):
         self._redis: Redis | None = None
+        self._instance_id = uuid.uuid4().hex
+        self._on_breaker_change: Callable[[ChainId, str, BreakerState, float], None] | None = None
+        self._listener: asyncio.Task | None = None
+        self._listener_loop: asyncio.AbstractEventLoop | None = None
+        self._listener_failed_at: float = 0.0
 
     @property
     def redis(self) -> Redis:
@@ -61,34 +68,58 @@ class Web3NodeRedis:
             self._redis = from_url(str(settings.redis_url))
         return self._redis
 
-    async def get_fallback_node_url(self, chain_id: ChainId) -> str | None:
-        key = f"fallback_node_url_{chain_id}"
-        _url = await self.redis.get(key)
-        url = json.loads(_url) if _url else None
-        return url
-
-    async def set_fallback_node_url(self, chain_id: ChainId, url: str) -> None:
-        key = f"fallback_node_url_{chain_id}"
-        await self.redis.setex(
-            key,
-            value=json.dumps(url),
-            time=timedelta(minutes=self.__FALLBACK_NODE_MINUTES),
-        )
-
-    async def fallback_url_exists(self, chain_id: ChainId) -> bool:
-        key = f"fallback_node_url_{chain_id}"
-        return await self.redis.exists(key)
+    def subscribe(
+        self, on_breaker_change: Callable[[ChainId, str, BreakerState, float], None]
+    ) -> None:
+        self._on_breaker_change = on_breaker_change
+        loop = asyncio.get_running_loop()
+        if self._listener is not None and not self._listener.done():
+            if self._listener_loop is loop:
+                return
+        elif time.monotonic() - self._listener_failed_at < self.__LISTENER_RESTART_SECONDS:
+            return
+        self._listener = loop.create_task(self._listen())
+        self._listener_loop = loop
 
-    async def get_web3_errors_count(self, chain_id: ChainId) -> int:
-        key = f"web3_errors_count_{chain_id}"
-        count = await self.redis.get(key)
-        return int(count) if count else 0
+    async def _listen(self) -> None:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.BREAKERS_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = json.loads(message["data"])
+                if data["sender"] == self._instance_id or self._on_breaker_change is None:
+                    continue
+                self._on_breaker_change(
+                    ChainId(data["chain_id"]),
+                    data["endpoint"],
+                    BreakerState(data["state"]),
+                    data["seconds"],
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Web3NodeRedis: breakers listener stopped: {e}")
+            self._listener_failed_at = time.monotonic()
+        finally:
+            await pubsub.aclose()
 
-    async def increment_web3_errors_count(self, chain_id: ChainId) -> int:
-        key = f"web3_errors_count_{chain_id}"
-        if (count := await self.redis.incr(key)) == 1:
-            await self.redis.expire(key, timedelta(minutes=self.__WEB3_ERRORS_INTERVAL_MINUTES))
-        return count
+    async def publish_breaker_change(
+        self, chain_id: ChainId, endpoint: str, state: BreakerState, seconds: float
+    ) -> None:
+        message = {
+            "sender": self._instance_id,
+            "chain_id": chain_id,
+            "endpoint": endpoint,
+            "state": state.value,
+            "seconds": seconds,
+        }
+        try:
+            await self.redis.publish(self.BREAKERS_CHANNEL, json.dumps(message))
+        except RedisError as e:
+            # the breaker is changed locally anyway
+            logger.warning(f"Web3NodeRedis: can't publish {state} breaker of {endpoint}: {e}")
 
 
 class Web3Node:
@@ -102,12 +133,12 @@ class Web3Node:
 
     def __init__(self, redis: Web3NodeRedis):
         self.node_redis = redis
-        self._web3_by_chain_id = {
-            chains.polygon.id: AsyncWeb3(AsyncHTTPProvider(settings.crypto_api_key_polygon)),
-            chains.ethereum.id: AsyncWeb3(AsyncHTTPProvider(settings.crypto_api_key_eth)),
-            chains.bsc.id: AsyncWeb3(AsyncHTTPProvider(settings.crypto_api_key_bsc)),
-            chains.blast.id: AsyncWeb3(AsyncHTTPProvider(settings.crypto_api_key_blast)),
-            chains.base.id: AsyncWeb3(AsyncHTTPProvider(settings.crypto_api_key_base)),
+        self._main_node_urls_by_chain_id = {
+            chains.polygon.id: settings.crypto_api_key_polygon,
+            chains.ethereum.id: settings.crypto_api_key_eth,
+            chains.bsc.id: settings.crypto_api_key_bsc,
+            chains.blast.id: settings.crypto_api_key_blast,
+            chains.base.id: settings.crypto_api_key_base,
         }
         self._fallback_node_urls_by_chain_id = {
             chains.polygon.id: settings.fallback_api_url_polygon,
@@ -123,42 +154,92 @@ class Web3Node:
             chains.blast.id: settings.fallback_api_key_blast,
         }
         assert (
-            self._web3_by_chain_id.keys() == self._fallback_node_urls_by_chain_id.keys()
+            self._main_node_urls_by_chain_id.keys() == self._fallback_node_urls_by_chain_id.keys()
         ), "Not all networks have fallback nodes"
+        self._router_by_chain_id: dict[ChainId, EndpointRouter] = {}
+        self._web3_by_chain_id: dict[ChainId, AsyncWeb3] = {}
 
     def _get_chain_id(self, network: str) -> ChainId:
         return self._network_to_chain_id[network]
 
+    def get_chain_ids(self) -> list[ChainId]:
+        """Chains which have at least one node configured"""
+        return [chain_id for chain_id, url in self._main_node_urls_by_chain_id.items() if url]
+
+    def get_network_chain_id(
+        self, network: str | None = None, chain_id: ChainId | None = None
+    ) -> ChainId:
+        """
+        Chain id reported by the nodes of the network, resolved without a request:
+        testnet nodes are used for all networks when CRYPTO_ENVIRONMENT is testnet
+        """
+        if network:
+            chain_id = self._get_chain_id(network)
+        if settings.crypto_environment == "testnet":
+            return chains.testnet_by_mainnet_chain_id[chain_id].id
+        return chain_id
+
     def get_fallback_node_url(self, chain_id: ChainId) -> str:
         return self._fallback_node_urls_by_chain_id[chain_id]
 
     def get_fallback_api_key(self, chain_id: ChainId) -> str | None:
         return self._fallback_api_key_by_chain_id.get(chain_id)
 
+    def get_fallback_headers(self, chain_id: ChainId) -> dict[str, str] | None:
+        if not (api_key := self.get_fallback_api_key(chain_id)):
+            return None
+        return {
+            "x-api-key": api_key,
+            "Content-Type": "application/json",
+        }
+
     def get_main_web3_by_chain_id(self, chain_id: ChainId) -> AsyncWeb3:
-        return self._web3_by_chain_id[chain_id]
+        return provider_registry.get_web3(chain_id, self._main_node_urls_by_chain_id[chain_id])
 
     def get_fallback_web3_by_chain_id(self, chain_id: ChainId) -> AsyncWeb3:
-        options = {}
-        if api_key := self.get_fallback_api_key(chain_id):
-            options = {
-                "headers": {
-                    "x-api-key": api_key,
-                    "Content-Type": "application/json",
-                }
-            }
-        return AsyncWeb3(
-            AsyncHTTPProvider(
-                endpoint_uri=self.get_fallback_node_url(chain_id), request_kwargs=options
-            )
+        return provider_registry.get_web3(
+            chain_id, self.get_fallback_node_url(chain_id), self.get_fallback_headers(chain_id)
         )
 
+    def _get_endpoints(self, chain_id: ChainId) -> list[RpcEndpoint]:
+        """Endpoints in order of preference: main node, fallback node, extra nodes"""
+        endpoints = []
+        if self._main_node_urls_by_chain_id[chain_id]:
+            web3 = self.get_main_web3_by_chain_id(chain_id)
+            endpoints.append(RpcEndpoint("main", web3.provider, priority=len(endpoints)))
+        if self.get_fallback_node_url(chain_id):
+            web3 = self.get_fallback_web3_by_chain_id(chain_id)
+            endpoints.append(RpcEndpoint("fallback", web3.provider, priority=len(endpoints)))
+        for i, url in enumerate(settings.rpc_extra_urls_by_chain_id.get(chain_id, []), start=1):
+            web3 = provider_registry.get_web3(chain_id, url)
+            endpoints.append(RpcEndpoint(f"extra-{i}", web3.provider, priority=len(endpoints)))
+        return endpoints
+
+    def get_router(self, chain_id: ChainId) -> EndpointRouter:
+        if (router := self._router_by_chain_id.get(chain_id)) is None:
+            router = EndpointRouter(
+                chain_id,
+                self._get_endpoints(chain_id),
+                on_breaker_change=self.node_redis.publish_breaker_change,
+            )
+            self._router_by_chain_id[chain_id] = router
+        return router
+
+    def _on_breaker_change(
+        self, chain_id: ChainId, endpoint: str, state: BreakerState, seconds: float
+    ) -> None:
+        if router := self._router_by_chain_id.get(chain_id):
+            router.apply_breaker_change(endpoint, state, seconds)
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [router.stats() for router in self._router_by_chain_id.values()]
+
     async def get_web3(
         self, network: str | None = None, chain_id: ChainId | None = None
     ) -> AsyncWeb3:
         """
-        If there is fallback node in redis, use it.
-        Otherwise, use the default node
+        Returns web3 which routes every request to the best node of the chain:
+        see EndpointRouter for details
         """
         # todo: use chain_id instead of network
         assert not all((network, chain_id)), "network and chain_id are mutually exclusive"
@@ -166,20 +247,15 @@ class Web3Node:
         if network:
             chain_id = self._get_chain_id(network)
         chain_id_ctx.set(chain_id)
+        self.node_redis.subscribe(self._on_breaker_change)
 
-        if url := (await self.node_redis.get_fallback_node_url(chain_id)):
-            options = {}
-            if fallback_api_key := self.get_fallback_api_key(chain_id):
-                options = {
-                    "headers": {
-                        "x-api-key": fallback_api_key,
-                        "Content-Type": "application/json",
-                    }
-                }
-
-            logger.info(f"Using fallback node for {chain_id=}, {url=}")
-            return AsyncWeb3(AsyncHTTPProvider(url, request_kwargs=options))
-        return self.get_main_web3_by_chain_id(chain_id)
+        if (web3 := self._web3_by_chain_id.get(chain_id)) is None:
+            provider = RoutedProvider(
+                self.get_router(chain_id), chain_id=self.get_network_chain_id(chain_id=chain_id)
+            )
+            web3 = AsyncWeb3(provider)
+            self._web3_by_chain_id[chain_id] = web3
+        return web3
 
 
 web3_node_redis = Web3NodeRedis()
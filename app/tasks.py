@@ -10,16 +10,13 @@ from app.models import OperationType, OperationReason
 from app.services.blp_staking.jobs import (
     AddBlpStakingPointsForProfile,
     AddBlpStakingPoints,
-    MonitorBlpStakingLogsAndSave,
 )
 from app.services.ido_staking.jobs import (
-    ProcessHistoryStakingEvent,
     AddIdoStakingPoints,
     AddIdoStakingPointsForProfile,
-    MonitorIdoStakingLogsAndSave,
 )
+from app.services.indexer.jobs import IndexContractLogsAndSave
 from app.services.launchpad.jobs import (
-    MonitorLaunchpadLogsAndSave,
     SaveLaunchpadTransactionAndAddPoints,
     SaveLaunchpadMultichainTransactionAndAddPoints,
     MonitorMultichainLaunchpadLogAndSave,
@@ -64,71 +61,10 @@ def process_munzen_order(entity_id: str):
     max_retries=5,
     default_retry_delay=15,
 )
-def process_history_staking_event():
-    try:
-        result = run_command_and_get_result(ProcessHistoryStakingEvent())
-
-        if result.need_retry:
-            retry_after = (
-                result.retry_after
-                if result.retry_after is not None
-                else settings.celery_retry_after
-            )
-            process_history_staking_event.apply_async(countdown=retry_after)
-            return
-    except Exception as e:
-        if isinstance(e, Retry):
-            raise e
-
-        logger.error(
-            f"process_history_staking_event. Unhandled exception: {e}, {traceback.format_exc()}"
-        )
-        raise Retry("", exc=e)
-
-
-@app.task(
-    max_retries=5,
-    default_retry_delay=15,
-)
-def monitor_and_save_blp_staking_events(
-    from_block: int, to_block: int, chain_id: int, pool_id: int
-):
-    try:
-        result = run_command_and_get_result(
-            MonitorBlpStakingLogsAndSave(from_block, to_block, chain_id, pool_id)
-        )
-
-        if result.need_retry:
-            retry_after = (
-                result.retry_after
-                if result.retry_after is not None
-                else settings.celery_retry_after
-            )
-            monitor_and_save_blp_staking_events.apply_async(
-                args=[from_block, to_block, chain_id, pool_id], countdown=retry_after
-            )
-            return
-    except Exception as e:
-        if isinstance(e, Retry):
-            raise e
-        logger.error(
-            f"monitor_and_save_blp_staking_events. Unhandled exception: {e}, {traceback.format_exc()}"  # noqa
-        )
-        raise Retry("", exc=e)
-
-
-@app.task(
-    max_retries=5,
-    default_retry_delay=15,
-)
-def monitor_and_save_ido_staking_events(
-    from_block: int,
-    to_block: int,
-    chain_id: int,
-):
+def index_and_save_contract_events(from_block: int, to_block: int, chain_id: int):
     try:
         result = run_command_and_get_result(
-            MonitorIdoStakingLogsAndSave(from_block, to_block, chain_id)
+            IndexContractLogsAndSave(from_block, to_block, chain_id)
         )
 
         if result.need_retry:
@@ -137,7 +73,7 @@ def monitor_and_save_ido_staking_events(
                 if result.retry_after is not None
                 else settings.celery_retry_after
             )
-            monitor_and_save_ido_staking_events.apply_async(
+            index_and_save_contract_events.apply_async(
                 args=[from_block, to_block, chain_id], countdown=retry_after
             )
             return
@@ -145,7 +81,7 @@ def monitor_and_save_ido_staking_events(
         if isinstance(e, Retry):
             raise e
         logger.error(
-            f"monitor_and_save_ido_staking_events. Unhandled exception: {e}, {traceback.format_exc()}"  # noqa
+            f"index_and_save_contract_events. Unhandled exception: {e}, {traceback.format_exc()}"
         )
         raise Retry("", exc=e)
 
@@ -430,35 +366,6 @@ def add_referral_blp_staking_points_for_profile(
         raise Retry("", exc=e)
 
 
-@app.task(
-    max_retries=5,
-    default_retry_delay=15,
-)
-def monitor_and_save_launchpad_events(from_block: int, to_block: int, chain_id: int):
-    try:
-        result = run_command_and_get_result(
-            MonitorLaunchpadLogsAndSave(from_block, to_block, chain_id)
-        )
-
-        if result.need_retry:
-            retry_after = (
-                result.retry_after
-                if result.retry_after is not None
-                else settings.celery_retry_after
-            )
-            monitor_and_save_launchpad_events.apply_async(
-                args=[from_block, to_block, chain_id], countdown=retry_after
-            )
-            return
-    except Exception as e:
-        if isinstance(e, Retry):
-            raise e
-        logger.error(
-            f"monitor_and_save_launchpad_events. Unhandled exception: {e}, {traceback.format_exc()}"  # noqa
-        )
-        raise Retry("", exc=e)
-
-
 @app.task(
     max_retries=5,
     default_retry_delay=15,
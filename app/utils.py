@@ -1,6 +1,9 @@
-import json
-from datetime import timedelta
+import asyncio
+from copy import deepcopy
+from functools import partial
+from time import monotonic, time
 from typing import Callable, Any, Awaitable
+from uuid import uuid4
 
 import bcrypt
 from fastapi.exceptions import RequestValidationError
@@ -8,6 +11,8 @@ from fastapi import Request
 from redis.asyncio import Redis
 
 from app.base import logger
+from app.env import settings
+from app.cache import CacheEntry, two_tier_cache
 
 
 def get_ip_from_request(request: Request) -> str:
@@ -28,19 +33,113 @@ def validation_error(error_message: str, location: tuple[str, str]) -> RequestVa
     )
 
 
+# cache misses of this process being loaded: concurrent callers of a key await one load
+_cache_misses_in_flight: dict[str, asyncio.Task] = {}
+
+
 async def get_data_with_cache(
     key: str,
     func: Callable[[], Awaitable[Any]],
     redis: Redis,
     short_key_exp_seconds: int = 30,
     long_key_exp_minutes: int = 20,
+    lease: bool = False,
+    stale_while_revalidate: bool = False,
+    max_stale_seconds: int | None = None,
+    version: int = 1,
 ):
-    if await redis.exists(key):
-        cached_data = await redis.get(key)
-        if cached_data:
-            cached_data = cached_data.decode()
-            cached_data = json.loads(cached_data)
-            return cached_data
+    """
+    Returns data cached at `key` or calls `func` and caches its result.
+    Fresh values are kept in process memory as well (see TwoTierCache). Bump `version`
+    when the shape of the data changes.
+    A cached value is the same as the one `func` returned: int dict keys stay ints,
+    while the json cache of earlier releases turned them into strings.
+    Only one call of `func` per key is made at a time in the process, other callers
+    await its result. With `lease`, the same holds across all workers: the worker
+    holding a lease in redis calls `func`, the others wait for the value to be cached.
+    When `func` fails, the value from the long cache is returned.
+    With `stale_while_revalidate`, an expired value from the long cache is returned
+    at once (if it's not older than `max_stale_seconds`) and refreshed in background.
+    """
+    data, _ = await get_data_with_cache_and_age(
+        key,
+        func,
+        redis,
+        short_key_exp_seconds=short_key_exp_seconds,
+        long_key_exp_minutes=long_key_exp_minutes,
+        lease=lease,
+        stale_while_revalidate=stale_while_revalidate,
+        max_stale_seconds=max_stale_seconds,
+        version=version,
+    )
+    return data
+
+
+async def get_data_with_cache_and_age(
+    key: str,
+    func: Callable[[], Awaitable[Any]],
+    redis: Redis,
+    short_key_exp_seconds: int = 30,
+    long_key_exp_minutes: int = 20,
+    lease: bool = False,
+    stale_while_revalidate: bool = False,
+    max_stale_seconds: int | None = None,
+    version: int = 1,
+) -> tuple[Any, float | None]:
+    """The same as get_data_with_cache, also returns seconds since the data was loaded"""
+    entry, stale_entry = await two_tier_cache.get(redis, key, version)
+    if entry is not None:
+        return entry.data, time() - entry.updated_at
+
+    task = _cache_misses_in_flight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(
+            _load_data_to_cache(
+                key, func, redis, short_key_exp_seconds, long_key_exp_minutes, lease, version
+            )
+        )
+        _cache_misses_in_flight[key] = task
+        task.add_done_callback(partial(_forget_cache_miss, key))
+
+    if (
+        stale_while_revalidate
+        and stale_entry is not None
+        and (max_stale_seconds is None or time() - stale_entry.updated_at <= max_stale_seconds)
+    ):
+        return stale_entry.data, time() - stale_entry.updated_at
+
+    # a cancelled caller must not cancel the load for the others
+    if (entry := await asyncio.shield(task)) is None:
+        return None, None
+    # every caller gets its own copy, as if it was read from the cache
+    return deepcopy(entry.data), time() - entry.updated_at
+
+
+def _forget_cache_miss(key: str, task: asyncio.Task) -> None:
+    if _cache_misses_in_flight.get(key) is task:
+        del _cache_misses_in_flight[key]
+    # nobody awaits background refreshes of stale values
+    if not task.cancelled() and (e := task.exception()) is not None:
+        logger.warning(f"Cache: can't load data for {key}: {e}")
+
+
+async def _load_data_to_cache(
+    key: str,
+    func: Callable[[], Awaitable[Any]],
+    redis: Redis,
+    short_key_exp_seconds: int,
+    long_key_exp_minutes: int,
+    lease: bool,
+    version: int,
+) -> CacheEntry | None:
+    lease_key, lease_token = f"{key}:lease", uuid4().hex
+    if lease and not await redis.set(
+        lease_key, lease_token, nx=True, ex=settings.cache_lease_seconds
+    ):
+        # another worker is loading the data
+        if (entry := await _wait_for_lease(key, lease_key, redis, version)) is not None:
+            return entry
+        lease = False
 
     try:
         cached_data = await func()
@@ -48,26 +147,33 @@ async def get_data_with_cache(
             logger.info("Get none from main function in get_data")
             raise Exception
 
-        await redis.setex(
-            key,
-            timedelta(seconds=short_key_exp_seconds),
-            json.dumps(cached_data),
-        )
-        await redis.setex(
-            f"{key}:long",
-            timedelta(minutes=long_key_exp_minutes),
-            json.dumps(cached_data),
+        return await two_tier_cache.set(
+            redis, key, cached_data, short_key_exp_seconds, long_key_exp_minutes, version
         )
     except Exception:
-        cached_data = await redis.get(key + ":long")
-
-        if cached_data is None:
+        if (entry := await two_tier_cache.get_long(redis, key, version)) is None:
             logger.info("No data in long cache")
-            return cached_data
+        return entry
+    finally:
+        if lease and (await redis.get(lease_key) or b"").decode() == lease_token:
+            await redis.delete(lease_key)
+
 
-        cached_data = cached_data.decode()
-        cached_data = json.loads(cached_data) if cached_data is not None else None
-    return cached_data
+async def _wait_for_lease(
+    key: str, lease_key: str, redis: Redis, version: int
+) -> CacheEntry | None:
+    """
+    Waits for the data loaded by the lease holder. If the holder has failed, returns
+    the long cache. Returns None when the caller should load the data itself.
+    """
+    deadline = monotonic() + settings.cache_lease_seconds
+    while monotonic() < deadline:
+        await asyncio.sleep(settings.cache_lease_poll_ms / 1000)
+        if (entry := await two_tier_cache.get_fresh(redis, key, version)) is not None:
+            return entry
+        if not await redis.exists(lease_key):
+            return await two_tier_cache.get_long(redis, key, version)
+    return None
 
 
 def check_password(password: str, hashed: str) -> bool:
@@ -0,0 +1,81 @@
+"""
+Compares the precompiled ABI codec with web3/eth_abi for a daily points run.
+
+    PYTHONPATH=. python benchmarks/abi_codec.py [users]
+"""
+
+import os
+import sys
+import time
+
+from eth_abi import decode, encode
+from web3 import Web3
+from web3._utils.abi import get_abi_output_types
+from web3._utils.contracts import encode_abi
+
+from app.abi import TRY_AGGREGATE_ABI
+from app.selectors import staking_user_info_fn, try_aggregate_selector
+from app.services.abi_codec import encode_try_aggregate, decode_try_aggregate
+from app.services.ido_staking.abi import STAKING_USER_INFO_ABI
+
+STAKING_ADDRESS = "0x" + "11" * 20
+TOKEN_ADDRESS = "0x" + "22" * 20
+USER_INFO_TYPES = [x["type"] for x in STAKING_USER_INFO_ABI["outputs"][0]["components"]]
+TRY_AGGREGATE_OUTPUT_TYPES = get_abi_output_types(TRY_AGGREGATE_ABI)
+
+
+def web3_path(web3: Web3, users: list[str], raw_result: bytes) -> list[tuple]:
+    encoded = [
+        (
+            web3.to_checksum_address(STAKING_ADDRESS),
+            encode_abi(
+                web3,
+                STAKING_USER_INFO_ABI,
+                arguments=[
+                    web3.to_checksum_address(TOKEN_ADDRESS),
+                    web3.to_checksum_address(user),
+                ],
+                data="0x" + staking_user_info_fn.selector.hex(),
+            ),
+        )
+        for user in users
+    ]
+    encode_abi(web3, TRY_AGGREGATE_ABI, (False, encoded), try_aggregate_selector)
+    rows = web3.codec.decode(TRY_AGGREGATE_OUTPUT_TYPES, raw_result)[0]
+    return [decode(USER_INFO_TYPES, data) for _, data in rows]
+
+
+def fast_path(users: list[str], raw_result: bytes) -> list[tuple]:
+    calls = [
+        (STAKING_ADDRESS, staking_user_info_fn.encode_call(TOKEN_ADDRESS, user)) for user in users
+    ]
+    encode_try_aggregate(bytes.fromhex(try_aggregate_selector[2:]), False, calls)
+    rows = decode_try_aggregate(raw_result)
+    return [staking_user_info_fn.decode_output(data) for _, data in rows]
+
+
+def measure(name: str, func, *args) -> tuple[float, list]:
+    started_at = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started_at
+    print(f"{name:>6}: {elapsed:.3f}s")  # noqa: T201
+    return elapsed, result
+
+
+def main() -> None:
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    users = ["0x" + os.urandom(20).hex() for _ in range(n_users)]
+    raw_result = encode(
+        TRY_AGGREGATE_OUTPUT_TYPES,
+        [[(True, encode(USER_INFO_TYPES, [i, i * 2, i * 3, i * 4])) for i in range(n_users)]],
+    )
+
+    print(f"encode {n_users} userInfo calls + tryAggregate, decode the result")  # noqa: T201
+    web3_elapsed, web3_result = measure("web3", web3_path, Web3(), users, raw_result)
+    fast_elapsed, fast_result = measure("fast", fast_path, users, raw_result)
+    assert web3_result == fast_result, "results differ"
+    print(f"speedup: {web3_elapsed / fast_elapsed:.1f}x")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares redis memory of per-user cached values stored as a key per value
+and packed into a hash per user (CACHE_COMPACT_ENTITIES).
+Writes synthetic users to REDIS_URL and deletes them afterwards.
+
+    PYTHONPATH=. python benchmarks/redis_memory.py [users]
+"""
+
+import asyncio
+import os
+import sys
+
+from app.cache.values import _CachedKind
+from app.env import settings
+from app.redis import redis_cli
+from app.services.balances.redis import blastup_balance_redis, blp_balance_redis
+from app.services.ido_staking.cache import user_tvl_cache
+from app.services.ido_staking.types import UserLockedAmount
+from app.services.referral_system.cache import n_referrals_cache
+
+CHAIN_IDS = [1, 56, 137, 8453, 81457]
+BATCH_SIZE = 1000
+
+
+async def write_users(users: list[str]) -> None:
+    for i in range(0, len(users), BATCH_SIZE):
+        batch = users[i : i + BATCH_SIZE]  # noqa
+        await asyncio.gather(
+            *(
+                coro
+                for n, user in enumerate(batch)
+                for coro in (
+                    n_referrals_cache.set(n, user),
+                    user_tvl_cache.set(UserLockedAmount(native=n * 0.5, stablecoin=n), user),
+                    blp_balance_redis.set(n * 10**18, user),
+                    blastup_balance_redis.set({x: n * 10**18 for x in CHAIN_IDS}, user),
+                )
+            )
+        )
+
+
+def get_keys(users: list[str], kinds: list[_CachedKind]) -> list[str]:
+    if settings.cache_compact_entities:
+        return list({kind.entity.key(user) for kind in kinds for user in users})
+    return [kind.key(user) for kind in kinds for user in users]
+
+
+async def measure(users: list[str], compact: bool) -> int:
+    settings.cache_compact_entities = compact
+    kinds = [n_referrals_cache, user_tvl_cache, blp_balance_redis, blastup_balance_redis]
+    used_before = (await redis_cli.info("memory"))["used_memory"]
+    await write_users(users)
+    used_after = (await redis_cli.info("memory"))["used_memory"]
+
+    keys = get_keys(users, kinds)
+    sample = keys[: min(len(keys), 1000)]
+    sample_usage = sum([await redis_cli.memory_usage(key) for key in sample])
+    for i in range(0, len(keys), BATCH_SIZE):
+        await redis_cli.delete(*keys[i : i + BATCH_SIZE])  # noqa
+
+    used = used_after - used_before
+    name = "hash per user" if compact else "key per value"
+    print(  # noqa: T201
+        f"{name:>14}: {len(keys)} keys, {used / len(users):.0f} B/user used_memory, "
+        f"{sample_usage / len(sample) * len(keys) / len(users):.0f} B/user MEMORY USAGE"
+    )
+    return used
+
+
+async def main() -> None:
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    users = ["0x" + os.urandom(20).hex() for _ in range(n_users)]
+    print(f"4 cached values (5 balances by chain) for {n_users} users")  # noqa: T201
+    plain = await measure(users, compact=False)
+    compact = await measure(users, compact=True)
+    print(f"saved: {1 - compact / plain:.0%}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
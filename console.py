@@ -6,14 +6,14 @@ import sys
 import sentry_sdk
 
 from app.env import settings
-from app.services.launchpad.jobs import (
-    ProcessLaunchpadContractEvents,
-    ProcessMultichainLaunchpadContractEvents,
-)
+from app.services.launchpad.jobs import ProcessMultichainLaunchpadContractEvents
 from app.services.balances.jobs import SyncBalances
-from app.services.blp_staking.jobs import ProcessBlpHistoryStakingEvent, AddBlpStakingPoints
+from app.services.chain_head.jobs import TrackChainHeads
+from app.services.blp_staking.jobs import AddBlpStakingPoints
 from app.services.prices.jobs import UpdateSupportedTokensCache
-from app.services.ido_staking.jobs import ProcessHistoryStakingEvent, AddIdoStakingPoints
+from app.services.ido_staking.jobs import AddIdoStakingPoints
+from app.services.indexer.jobs import RunIndexer, BackfillContractLogs
+from app.services.leaderboard.jobs import RebuildLeaderboard
 from app.services.projects.jobs import ChangeProjectsStatus
 from app.services.total_raised.jobs import RecalculateProjectsTotalRaised
 from onramp.jobs import MonitorSenderBalance
@@ -29,32 +29,38 @@ async def main():
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     for command in [
-        "listen-staking-events",
-        "listen-blp-staking-events",
         "monitor-onramp-balance",
         "update-project-total-raised",
-        "process-launchpad-contract-events",
         "process-launchpad-multichain-contract-events",
         "update-supported-tokens-cache",
         "change-projects-status",
         "add-ido-staking-points",
         "add-blp-staking-points",
         "sync-balances",
+        "track-chain-heads",
+        "run-indexer",
+        "rebuild-leaderboard",
     ]:
         subparsers.add_parser(command)
 
+    backfill_parser = subparsers.add_parser("backfill", help="Index past blocks of contracts")
+    backfill_parser.add_argument("--chain", default="blast", help="Network, e.g. blast")
+    backfill_parser.add_argument(
+        "--contract", help="Address or name, e.g. launchpad, blp_staking[1]; all if not set"
+    )
+    backfill_parser.add_argument("--from", dest="from_block", type=int, required=True)
+    backfill_parser.add_argument(
+        "--to", dest="to_block", type=int, help="Confirmed head of the chain if not set"
+    )
+    backfill_parser.add_argument("--workers", type=int, default=settings.indexer_fetch_concurrency)
+    backfill_parser.add_argument("--range-size", type=int, default=10_000)
+
     args = parser.parse_args()
     match args.command:
-        case "listen-staking-events":
-            command = ProcessHistoryStakingEvent()
-        case "listen-blp-staking-events":
-            command = ProcessBlpHistoryStakingEvent()
         case "monitor-onramp-balance":
             command = MonitorSenderBalance()
         case "update-project-total-raised":
             command = RecalculateProjectsTotalRaised()
-        case "process-launchpad-contract-events":
-            command = ProcessLaunchpadContractEvents()
         case "process-launchpad-multichain-contract-events":
             command = ProcessMultichainLaunchpadContractEvents()
         case "update-supported-tokens-cache":
@@ -67,6 +73,21 @@ async def main():
             command = ChangeProjectsStatus()
         case "sync-balances":
             command = SyncBalances()
+        case "track-chain-heads":
+            command = TrackChainHeads()
+        case "run-indexer":
+            command = RunIndexer()
+        case "rebuild-leaderboard":
+            command = RebuildLeaderboard()
+        case "backfill":
+            command = BackfillContractLogs(
+                network=args.chain,
+                contract=args.contract,
+                from_block=args.from_block,
+                to_block=args.to_block,
+                n_workers=args.workers,
+                range_size=args.range_size,
+            )
         case _:
             command = None
 
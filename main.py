@@ -9,6 +9,7 @@ from app.limiter import limiter
 from onramp.router import router as onramp_router
 from app.schema import InternalServerError
 from app.env import settings
+from app.services.rpc.providers import provider_registry
 
 environment = settings.app_env
 
@@ -19,6 +20,7 @@ app = FastAPI(debug=not environment.startswith("prod"))
 app.include_router(router)
 app.include_router(onramp_router)
 app.state.limiter = limiter
+app.add_event_handler("shutdown", provider_registry.close)
 
 app.add_middleware(
     CORSMiddleware,
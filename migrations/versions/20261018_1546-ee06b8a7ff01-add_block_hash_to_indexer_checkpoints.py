@@ -0,0 +1,38 @@
+"""add block_hash to indexer_checkpoints
+
+Revision ID: ee06b8a7ff01
+Revises: 9ef20d53baf2
+Create Date: 2026-10-18 15:46:02.731548
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee06b8a7ff01'
+down_revision: Union[str, None] = '9ef20d53baf2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('indexer_checkpoints', sa.Column('block_hash', sa.Text(), nullable=True))
+    op.drop_constraint('indexer_checkpoints_pkey', 'indexer_checkpoints', type_='primary')
+    op.create_primary_key('indexer_checkpoints_pkey', 'indexer_checkpoints', ['chain_id', 'stream', 'block_number'])
+
+
+def downgrade() -> None:
+    # only the last checkpoint of a stream is kept
+    op.execute("""
+        DELETE FROM indexer_checkpoints c
+        WHERE block_number < (
+            SELECT MAX(block_number) FROM indexer_checkpoints
+            WHERE chain_id = c.chain_id AND stream = c.stream
+        )
+    """)
+    op.drop_constraint('indexer_checkpoints_pkey', 'indexer_checkpoints', type_='primary')
+    op.create_primary_key('indexer_checkpoints_pkey', 'indexer_checkpoints', ['chain_id', 'stream'])
+    op.drop_column('indexer_checkpoints', 'block_hash')
@@ -35,12 +35,13 @@ class ProcessMunzenOrder(Command):
         order_lock_key = f"munzen-order:{self.order_id}"
         global_lock_key = "is-ready:munzen-processing"
 
-        if not await lock.acquire(global_lock_key):
+        if not (global_lease := await lock.acquire(global_lock_key)):
             logger.debug(f"[ProcessMunzenOrder({self.order_id})] Another order in progress")
             return CommandResult(success=False, need_retry=True, retry_after=10)
 
-        if not await lock.acquire(order_lock_key):
+        if not (order_lease := await lock.acquire(order_lock_key)):
             logger.debug(f"[ProcessMunzenOrder({self.order_id})] this order in progress")
+            await lock.release(global_lease)
             return CommandResult(success=False, need_retry=True, retry_after=60)
 
         try:
@@ -81,8 +82,8 @@ class ProcessMunzenOrder(Command):
                     )
                 return CommandResult(success=True)
         finally:
-            await lock.release(order_lock_key)
-            await lock.release(global_lock_key)
+            await lock.release(order_lease)
+            await lock.release(global_lease)
 
 
 class MonitorSenderBalance(Command):
@@ -0,0 +1,22 @@
+import os
+
+# settings without defaults, so that the app can be imported without a .env
+for _name, _value in {
+    "ETH_PRICE_FEED_ADDR": "0x0000000000000000000000000000000000000001",
+    "ONRAMP_RECIPIENT_ADDR": "0x0000000000000000000000000000000000000001",
+    "ONRAMP_SENDER_SEED_PHRASE": "test",
+    "CONTRACT_ADDR_ETH": "0x0000000000000000000000000000000000000001",
+    "CONTRACT_ADDR_POLYGON": "0x0000000000000000000000000000000000000001",
+    "CONTRACT_ADDR_BSC": "0x0000000000000000000000000000000000000001",
+    "CONTRACT_ADDR_BLAST": "0x0000000000000000000000000000000000000001",
+    "PROXY_BASE_URL": "http://localhost",
+    "TG_BOT_NOTIFICATION_TOKEN": "test",
+    "TG_NOTIFICATION_CHAT_ID": "test",
+    "STAKING_BLP_ORACLE_CONTRACT": "0x0000000000000000000000000000000000000002",
+    "STAKING_BLP_CONTRACT_POOL_1": "0x0000000000000000000000000000000000000011",
+    "STAKING_BLP_CONTRACT_POOL_2": "0x0000000000000000000000000000000000000012",
+    "STAKING_BLP_CONTRACT_POOL_3": "0x0000000000000000000000000000000000000013",
+    "BLP_BALANCE_CONTRACT": "0x0000000000000000000000000000000000000003",
+    "LOCKED_BLP_BALANCE_CONTRACT": "0x0000000000000000000000000000000000000004",
+}.items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,107 @@
+from unittest import TestCase
+
+from eth_abi import decode, encode
+from eth_utils import function_abi_to_4byte_selector
+
+from app.abi import TRY_AGGREGATE_ABI
+from app.services.abi_codec import StaticAbiFunction, decode_try_aggregate, encode_try_aggregate
+from app.services.ido_staking.abi import STAKING_USER_INFO_ABI
+
+MIXED_ABI = {
+    "inputs": [
+        {"name": "user", "type": "address"},
+        {"name": "delta", "type": "int256"},
+        {"name": "flag", "type": "bool"},
+        {"name": "key", "type": "bytes32"},
+    ],
+    "name": "mixed",
+    "outputs": [
+        {"name": "owner", "type": "address"},
+        {"name": "amount", "type": "int128"},
+        {"name": "active", "type": "bool"},
+        {"name": "tag", "type": "bytes4"},
+    ],
+    "stateMutability": "view",
+    "type": "function",
+}
+USER = "0x" + "ab" * 20
+TOKEN = "0x" + "cd" * 20
+
+
+class StaticAbiFunctionTest(TestCase):
+    def test_encode_call_as_eth_abi(self):
+        fn = StaticAbiFunction(MIXED_ABI)
+        args = (USER, -5, True, b"\x01" * 32)
+        self.assertEqual(
+            fn.encode_call(*args),
+            function_abi_to_4byte_selector(MIXED_ABI)
+            + encode(["address", "int256", "bool", "bytes32"], args),
+        )
+
+    def test_decode_output_as_eth_abi(self):
+        fn = StaticAbiFunction(MIXED_ABI)
+        types = ["address", "int128", "bool", "bytes4"]
+        data = encode(types, [USER, -(2**100), True, b"\xde\xad\xbe\xef"])
+        self.assertEqual(fn.decode_output(data), decode(types, data))
+
+    def test_struct_output(self):
+        fn = StaticAbiFunction(STAKING_USER_INFO_ABI)
+        data = encode(["uint256"] * 4, [1, 2**255, 3, 4])
+        self.assertTrue(fn.is_static)
+        self.assertEqual(fn.output_size, 128)
+        self.assertEqual(fn.decode_output(data), (1, 2**255, 3, 4))
+        self.assertEqual(
+            fn.encode_call(TOKEN, USER),
+            fn.selector + encode(["address", "address"], [TOKEN, USER]),
+        )
+
+    def test_short_output(self):
+        fn = StaticAbiFunction(STAKING_USER_INFO_ABI)
+        with self.assertRaises(ValueError):
+            fn.decode_output(bytes(96))
+
+    def test_dynamic_type_falls_back_to_eth_abi(self):
+        fn = StaticAbiFunction({**MIXED_ABI, "inputs": [{"name": "data", "type": "bytes"}]})
+        self.assertFalse(fn.is_static)
+        self.assertEqual(
+            fn.encode_call(b"\x01\x02"), fn.selector + encode(["bytes"], [b"\x01\x02"])
+        )
+
+    def test_array_output_is_not_static(self):
+        for abi_type in ("uint256[]", "uint256[2]", "int8[]"):
+            outputs = [{"name": "values", "type": abi_type}, {"name": "flag", "type": "bool"}]
+            fn = StaticAbiFunction({**MIXED_ABI, "outputs": outputs})
+            self.assertFalse(fn.is_static)
+            data = encode([abi_type, "bool"], [[1, 2], True])
+            self.assertEqual(fn.decode_output(data), ((1, 2), True))
+
+    def test_dynamic_struct_output(self):
+        components = [{"name": "ids", "type": "uint256[]"}, {"name": "owner", "type": "address"}]
+        outputs = [{"name": "info", "type": "tuple", "components": components}]
+        fn = StaticAbiFunction({**MIXED_ABI, "outputs": outputs})
+        self.assertFalse(fn.is_static)
+        data = encode(["(uint256[],address)"], [([7], USER)])
+        self.assertEqual(fn.decode_output(data), ((7,), USER))
+
+
+class TryAggregateCodecTest(TestCase):
+    def test_encode_as_eth_abi(self):
+        selector = function_abi_to_4byte_selector(TRY_AGGREGATE_ABI)
+        calls = [(USER, b""), (TOKEN, b"\x01\x02\x03"), (USER, bytes(range(70)))]
+        self.assertEqual(
+            encode_try_aggregate(selector, False, calls),
+            selector + encode(["bool", "(address,bytes)[]"], [False, calls]),
+        )
+
+    def test_decode_as_eth_abi(self):
+        results = [(True, b""), (False, b"\x08\xc3\x79\xa0"), (True, bytes(range(100)))]
+        data = encode(["(bool,bytes)[]"], [results])
+        self.assertEqual(decode_try_aggregate(data), results)
+
+    def test_decode_empty(self):
+        self.assertEqual(decode_try_aggregate(encode(["(bool,bytes)[]"], [[]])), [])
+
+    def test_decode_truncated(self):
+        data = encode(["(bool,bytes)[]"], [[(True, bytes(64))]])
+        with self.assertRaises(ValueError):
+            decode_try_aggregate(data[:-32])
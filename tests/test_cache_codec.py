@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from app.cache.codec import CacheEntry, decode_entry, encode_entry
+
+
+class CacheCodecTest(TestCase):
+    def test_round_trip(self):
+        data = {"tokens": {168587773: ["0x" + "11" * 20]}, "balance": 10**30, "debt": -(10**25)}
+        entry = CacheEntry(data=data, updated_at=1.5, expires_at=31.5)
+        self.assertEqual(decode_entry(encode_entry(entry, version=2), version=2), entry)
+
+    def test_other_version_is_missing(self):
+        raw = encode_entry(CacheEntry(data=1, updated_at=0, expires_at=30), version=1)
+        self.assertIsNone(decode_entry(raw, version=2))
+
+    def test_json_of_older_release_is_missing(self):
+        self.assertIsNone(decode_entry(b'{"data": 1}', version=1))
+        self.assertIsNone(decode_entry(None, version=1))
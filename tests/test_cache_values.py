@@ -0,0 +1,111 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app.cache import get_all, set_all
+from app.env import settings
+from app.services.ido_staking.cache import user_tvl_cache
+from app.services.ido_staking.types import UserLockedAmount
+from app.services.referral_system.cache import n_referrals_cache
+
+USER = "0x" + "Ab" * 20
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [self.redis.run(name, *args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    def run(self, name, *args, **kwargs):
+        if name == "get":
+            return self.data.get(args[0])
+        if name == "set":
+            key, value = args
+            self.data[key] = value.encode() if isinstance(value, str) else value
+            return True
+        if name == "hget":
+            key, field = args
+            return self.data.get(key, {}).get(field)
+        if name == "hset":
+            key, field, value = args
+            self.data.setdefault(key, {})[field] = value
+            return 1
+        if name == "pexpire":
+            return True
+        raise NotImplementedError(name)
+
+
+class CachedValuesOfUserTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+
+    async def _get_all(self) -> list:
+        return await get_all(
+            n_referrals_cache.bind(USER), user_tvl_cache.bind(USER), redis_cli=self.redis
+        )
+
+    def test_keys_of_user_share_slot(self):
+        tag = "{" + USER.lower() + "}"
+        self.assertIn(tag, n_referrals_cache.key(USER))
+        self.assertIn(tag, user_tvl_cache.key(USER))
+
+    async def test_set_all_and_get_all(self):
+        locked_amount = UserLockedAmount(native=1.5, stablecoin=20)
+        await set_all(
+            (n_referrals_cache.bind(USER), 3),
+            (user_tvl_cache.bind(USER), locked_amount),
+            redis_cli=self.redis,
+        )
+        self.assertEqual(await self._get_all(), [3, locked_amount])
+        self.assertEqual(self.redis.round_trips, 2)
+
+    async def test_partial_miss(self):
+        await set_all((n_referrals_cache.bind(USER), 0), redis_cli=self.redis)
+        self.assertEqual(await self._get_all(), [0, None])
+        self.assertEqual(self.redis.round_trips, 2)
+
+    @patch.object(settings, "cache_compact_entities", True)
+    async def test_compact_layout(self):
+        await set_all((n_referrals_cache.bind(USER), 7), redis_cli=self.redis)
+        self.assertEqual(list(self.redis.data), [f"user_cache_{USER.lower()}"])
+        self.assertEqual(await self._get_all(), [7, None])
+
+    @patch.object(settings, "cache_compact_entities", True)
+    async def test_expired_field_is_a_miss(self):
+        locked_amount = UserLockedAmount(native=1, stablecoin=2)
+        await set_all(
+            (n_referrals_cache.bind(USER), 7),
+            (user_tvl_cache.bind(USER), locked_amount),
+            redis_cli=self.redis,
+        )
+        # the locked amount expires first
+        expires_at = time.time() + user_tvl_cache.ttl.ttl.total_seconds() + 1
+        with patch("time.time", return_value=expires_at):
+            self.assertEqual(await self._get_all(), [7, None])
+        self.assertEqual(await self._get_all(), [7, locked_amount])
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from app.services.indexer.backfill import get_remaining_ranges, merge_ranges
+
+
+class GetRemainingRangesTest(TestCase):
+    def test_nothing_done(self):
+        self.assertEqual(
+            get_remaining_ranges(100, 349, {}, range_size=100),
+            [(100, 199), (200, 299), (300, 349)],
+        )
+
+    def test_without_done_ranges(self):
+        done = {150: 179, 300: 399}
+        self.assertEqual(
+            get_remaining_ranges(100, 449, done, range_size=100),
+            [(100, 149), (180, 279), (280, 299), (400, 449)],
+        )
+
+    def test_done_ranges_over_the_span(self):
+        done = {0: 119, 430: 500}
+        self.assertEqual(
+            get_remaining_ranges(100, 449, done, range_size=1000),
+            [(120, 429)],
+        )
+
+    def test_all_done(self):
+        self.assertEqual(get_remaining_ranges(100, 449, {100: 449}, range_size=100), [])
+        self.assertEqual(get_remaining_ranges(100, 449, {0: 1000}, range_size=100), [])
+
+    def test_single_block(self):
+        self.assertEqual(get_remaining_ranges(100, 100, {}, range_size=100), [(100, 100)])
+
+
+class MergeRangesTest(TestCase):
+    def test_adjacent_ranges(self):
+        self.assertEqual(merge_ranges({200: 299, 100: 199, 300: 349}), {100: 349})
+
+    def test_gaps_are_kept(self):
+        self.assertEqual(merge_ranges({100: 199, 201: 299}), {100: 199, 201: 299})
+
+    def test_overlapping_ranges(self):
+        self.assertEqual(merge_ranges({100: 299, 150: 199, 250: 400}), {100: 400})
+
+    def test_remaining_ranges_of_merged_progress(self):
+        done = {}
+        for from_block, to_block in [(300, 399), (100, 199), (500, 599)]:
+            done = merge_ranges({**done, from_block: to_block})
+        self.assertEqual(done, {100: 199, 300: 399, 500: 599})
+        self.assertEqual(
+            get_remaining_ranges(100, 599, done, range_size=100), [(200, 299), (400, 499)]
+        )
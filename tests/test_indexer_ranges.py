@@ -0,0 +1,96 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from aiohttp import ClientConnectionError
+
+from app.services.indexer.indexer import LogIndexer
+from app.services.indexer.ranges import AdaptiveBlockRange, is_block_limit_error, is_range_error
+
+
+class FakeEth:
+    def __init__(self, max_blocks: int, error: Exception) -> None:
+        self.max_blocks = max_blocks
+        self.error = error
+        self.requests: list[tuple[int, int]] = []
+
+    async def get_logs(self, params: dict) -> list:
+        self.requests.append((params["fromBlock"], params["toBlock"]))
+        if params["toBlock"] - params["fromBlock"] + 1 > self.max_blocks:
+            raise self.error
+        return []
+
+
+class FakeWeb3:
+    def __init__(self, eth: FakeEth) -> None:
+        self.eth = eth
+
+
+async def _iter_ranges(eth: FakeEth, block_range: AdaptiveBlockRange, to_block: int) -> list:
+    indexer = LogIndexer("test")
+    return [(f, t) async for f, t, _ in indexer.iter_logs(FakeWeb3(eth), 0, to_block, block_range)]
+
+
+class AdaptiveBlockRangeTest(TestCase):
+    def test_grows_up_to_max_size(self):
+        block_range = AdaptiveBlockRange(1, "test", size=30_000)
+        for _ in range(5):
+            block_range.grow()
+        self.assertEqual(block_range.size, AdaptiveBlockRange.MAX_SIZE)
+
+    def test_block_limit_caps_growth(self):
+        block_range = AdaptiveBlockRange(1, "test", size=3000)
+        self.assertTrue(block_range.shrink(3000, is_block_limit=True))
+        block_range.grow()
+        self.assertEqual(block_range.size, 1500)
+
+    def test_result_limit_doesnt_cap_growth(self):
+        block_range = AdaptiveBlockRange(1, "test", size=3000)
+        block_range.shrink(3000)
+        block_range.grow()
+        self.assertEqual(block_range.size, 3000)
+
+    def test_single_block_cant_shrink(self):
+        self.assertFalse(AdaptiveBlockRange(1, "test", size=1).shrink(1))
+
+    def test_errors(self):
+        for error, is_range, is_block_limit in (
+            (ValueError({"code": -32000, "message": "exceed maximum block range: 5000"}), 1, 1),
+            (
+                ValueError({"code": -32005, "message": "query returned more than 10000 results"}),
+                1,
+                0,
+            ),
+            (asyncio.TimeoutError(), 1, 0),
+            (ValueError({"code": 429, "message": "Too many requests"}), 0, 0),
+            (ClientConnectionError("node is down"), 0, 0),
+        ):
+            self.assertEqual(is_range_error(error), bool(is_range), error)
+            self.assertEqual(is_block_limit_error(error), bool(is_block_limit), error)
+
+
+class IterLogsTest(IsolatedAsyncioTestCase):
+    async def test_block_limit_of_node(self):
+        eth = FakeEth(1000, ValueError({"code": -32000, "message": "block range too large"}))
+        block_range = AdaptiveBlockRange(1, "test", size=3000)
+        ranges = await _iter_ranges(eth, block_range, 9999)
+
+        self.assertEqual(ranges[0], (0, 749))
+        self.assertEqual(ranges[-1][1], 9999)
+        # the yielded ranges cover the blocks without gaps
+        self.assertTrue(all(t + 1 == f for (_, t), (f, _) in zip(ranges, ranges[1:])))
+        self.assertEqual(block_range.size, 750)
+        self.assertEqual(eth.requests[:2], [(0, 2999), (0, 1499)])
+
+    async def test_too_many_results_then_grows(self):
+        eth = FakeEth(2000, asyncio.TimeoutError())
+        block_range = AdaptiveBlockRange(1, "test", size=3000)
+        ranges = await _iter_ranges(eth, block_range, 2999)
+        self.assertEqual(ranges, [(0, 1499), (1500, 2999)])
+        # a timeout doesn't cap the size: it grows on every range without logs
+        self.assertEqual(block_range.size, 6000)
+
+    async def test_node_error_is_raised(self):
+        eth = FakeEth(0, ClientConnectionError("node is down"))
+        with self.assertRaises(ClientConnectionError):
+            await _iter_ranges(eth, AdaptiveBlockRange(1, "test", size=3000), 9999)
+        self.assertEqual(eth.requests, [(0, 2999)])
@@ -0,0 +1,188 @@
+import asyncio
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from hexbytes import HexBytes
+
+from app.services.indexer import pipeline as pipeline_module
+from app.services.indexer.indexer import LogIndexer
+from app.services.indexer.pipeline import ChainReorgError, IngestionPipeline
+from app.services.indexer.ranges import AdaptiveBlockRange
+
+
+def _hash(block_number: int, fork: str = "a") -> str:
+    return "0x" + f"{fork}{block_number}".encode().hex().rjust(64, "0")
+
+
+@dataclass
+class FakeCheckpoint:
+    block_number: int
+    block_hash: str | None
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def begin(self):
+        return self
+
+
+class FakeCheckpointsCrud:
+    KEEP_CHECKPOINTS = 100
+    checkpoints: list[FakeCheckpoint] = []
+    deleted_after: list[int] = []
+
+    def __init__(self, session) -> None:
+        pass
+
+    async def get_recent(self, chain_id: int, stream: str, limit: int) -> list[FakeCheckpoint]:
+        return sorted(self.checkpoints, key=lambda x: -x.block_number)[:limit]
+
+    async def delete_after_block(self, chain_id: int, stream: str, block_number: int) -> None:
+        self.deleted_after.append(block_number)
+
+    async def get_last(self, chain_id: int, stream: str) -> FakeCheckpoint | None:
+        return max(self.checkpoints, key=lambda x: x.block_number, default=None)
+
+    async def add(
+        self, chain_id: int, stream: str, block_number: int, block_hash: str | None = None
+    ) -> None:
+        self.checkpoints.append(FakeCheckpoint(block_number, block_hash))
+
+
+class FakeEth:
+    def __init__(self, hashes: dict[int, str]) -> None:
+        self.hashes = hashes
+        self.n_get_block = 0
+
+    async def get_block(self, block_number: int) -> dict:
+        self.n_get_block += 1
+        return {
+            "hash": HexBytes(self.hashes[block_number]),
+            "parentHash": HexBytes(self.hashes[block_number - 1]),
+        }
+
+    async def get_logs(self, params: dict) -> list:
+        return []
+
+
+class FakeWeb3:
+    def __init__(self, eth: FakeEth) -> None:
+        self.eth = eth
+
+
+class RollBackTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.rolled_back_to: list[int] = []
+
+        async def delete_events_after_block(session, chain_id, block_number):
+            self.rolled_back_to.append(block_number)
+
+        indexer = LogIndexer("test")
+        indexer.on_rollback(delete_events_after_block)
+        self.pipeline = IngestionPipeline(indexer, "blast", 1, 1)
+        FakeCheckpointsCrud.deleted_after = []
+
+    async def _roll_back(self, checkpoints: list[FakeCheckpoint], hashes: dict[int, str]) -> None:
+        FakeCheckpointsCrud.checkpoints = checkpoints
+        web3 = FakeWeb3(FakeEth(hashes))
+        with (
+            patch.object(pipeline_module, "AsyncSession", lambda engine: FakeSession()),
+            patch.object(pipeline_module, "IndexerCheckpointsCrud", FakeCheckpointsCrud),
+            patch.object(pipeline_module.web3_node, "get_web3", AsyncMock(return_value=web3)),
+        ):
+            await self.pipeline._roll_back()
+
+    async def test_to_the_newest_checkpoint_on_the_chain(self):
+        checkpoints = [FakeCheckpoint(n, _hash(n)) for n in (100, 110, 120, 130)]
+        # blocks after 115 were reorganized
+        hashes = {n: _hash(n, "a" if n <= 115 else "b") for n in range(90, 140)}
+        await self._roll_back(checkpoints, hashes)
+
+        self.assertEqual(self.rolled_back_to, [110])
+        self.assertEqual(FakeCheckpointsCrud.deleted_after, [110])
+        self.assertEqual(
+            (self.pipeline.checkpoint, self.pipeline.checkpoint_hash), (110, _hash(110))
+        )
+
+    async def test_to_a_seeded_checkpoint(self):
+        checkpoints = [FakeCheckpoint(100, None), FakeCheckpoint(110, _hash(110))]
+        hashes = {n: _hash(n, "b") for n in range(90, 140)}
+        await self._roll_back(checkpoints, hashes)
+
+        self.assertEqual(self.rolled_back_to, [100])
+        self.assertIsNone(self.pipeline.checkpoint_hash)
+
+    async def test_to_the_oldest_checkpoint_if_none_is_on_the_chain(self):
+        checkpoints = [FakeCheckpoint(n, _hash(n)) for n in (100, 110)]
+        hashes = {n: _hash(n, "b") for n in range(90, 140)}
+        await self._roll_back(checkpoints, hashes)
+
+        self.assertEqual(self.rolled_back_to, [100])
+        self.assertEqual(FakeCheckpointsCrud.deleted_after, [100])
+
+
+class FetchTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.pipeline = IngestionPipeline(LogIndexer("test"), "blast", 1, 1)
+        self.pipeline._block_range = AdaptiveBlockRange(1, "test")
+
+    async def test_range_with_its_parent(self):
+        eth = FakeEth({n: _hash(n) for n in range(90, 140)})
+        fetched = await self.pipeline._fetch(FakeWeb3(eth), 100, 120, asyncio.Semaphore(1))
+        self.assertEqual((fetched.parent_hash, fetched.block_hash), (_hash(99), _hash(120)))
+
+    async def test_reorg_while_logs_are_fetched(self):
+        eth = FakeEth({n: _hash(n) for n in range(90, 140)})
+
+        async def get_logs(params):
+            eth.hashes[120] = _hash(120, "b")
+            return []
+
+        eth.get_logs = get_logs
+        with self.assertRaises(ChainReorgError):
+            await self.pipeline._fetch(FakeWeb3(eth), 100, 120, asyncio.Semaphore(1))
+
+
+class RunToHeadTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.pipeline = IngestionPipeline(LogIndexer("test"), "blast", 2, 2)
+        self.web3 = FakeWeb3(FakeEth({n: _hash(n) for n in range(90, 140)}))
+
+    async def _run_to_head(self, head: int) -> bool:
+        block_range = AdaptiveBlockRange(1, "test", size=10)
+        block_range.save = AsyncMock()
+        with (
+            patch.object(pipeline_module, "AsyncSession", lambda engine: FakeSession()),
+            patch.object(pipeline_module, "IndexerCheckpointsCrud", FakeCheckpointsCrud),
+            patch.object(pipeline_module.web3_node, "get_web3", AsyncMock(return_value=self.web3)),
+            patch.object(
+                pipeline_module, "get_confirmed_block_number", AsyncMock(return_value=head)
+            ),
+            patch.object(AdaptiveBlockRange, "load", AsyncMock(return_value=block_range)),
+        ):
+            return await self.pipeline.run_to_head()
+
+    async def test_stops_at_the_head(self):
+        FakeCheckpointsCrud.checkpoints = [FakeCheckpoint(100, _hash(100))]
+        self.assertTrue(await self._run_to_head(125))
+        self.assertEqual(
+            [(x.block_number, x.block_hash) for x in FakeCheckpointsCrud.checkpoints],
+            [(100, _hash(100)), (110, _hash(110)), (120, _hash(120)), (125, _hash(125))],
+        )
+        self.assertEqual(self.pipeline.checkpoint, 125)
+
+    async def test_at_the_head(self):
+        FakeCheckpointsCrud.checkpoints = [FakeCheckpoint(100, _hash(100))]
+        self.assertTrue(await self._run_to_head(100))
+        self.assertEqual(len(FakeCheckpointsCrud.checkpoints), 1)
+
+    async def test_stops_after_an_error(self):
+        FakeCheckpointsCrud.checkpoints = []
+        self.assertFalse(await self._run_to_head(125))
+        self.assertEqual(self.pipeline.n_errors, 1)
@@ -0,0 +1,33 @@
+from decimal import Decimal
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from app.services.points import add_points as add_points_module
+from app.services.points.add_points import AddPoints
+
+USER = "0x" + "Ab" * 20
+
+
+class LeaderboardPointsTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.add_points = AddPoints(None, None, None)
+        self.add_points._leaderboard_points[USER.lower()] = (Decimal(10), 5)
+        patcher = patch.object(add_points_module, "leaderboard_redis")
+        self.leaderboard_redis = patcher.start()
+        self.leaderboard_redis.set_points = AsyncMock()
+        self.addCleanup(patcher.stop)
+
+    async def test_points_are_set_once_after_commit(self):
+        await self.add_points.update_leaderboard()
+        await self.add_points.update_leaderboard()
+        self.leaderboard_redis.set_points.assert_awaited_once_with(USER.lower(), Decimal(10), 5)
+
+    async def test_discarded_points_are_not_set(self):
+        self.add_points.discard_leaderboard_points()
+        await self.add_points.update_leaderboard()
+        self.leaderboard_redis.set_points.assert_not_awaited()
+
+    async def test_redis_error_does_not_fail_committed_points(self):
+        self.leaderboard_redis.set_points.side_effect = ConnectionError("redis is down")
+        await self.add_points.update_leaderboard()
+        self.assertEqual(self.add_points._leaderboard_points, {})
@@ -0,0 +1,16 @@
+from unittest import TestCase
+
+from redis.crc import key_slot
+
+from app.services.lock import Lock
+
+
+class LockKeysTest(TestCase):
+    def test_keys_of_old_lock(self):
+        key, _, _ = Lock._get_keys("munzen-order:1")
+        self.assertEqual(key, "munzen-order:1")
+
+    def test_keys_in_one_slot(self):
+        for name in ("is-ready:munzen-processing", "indexer:blast:launchpad"):
+            slots = {key_slot(key.encode()) for key in Lock._get_keys(name)}
+            self.assertEqual(len(slots), 1, name)
@@ -0,0 +1,83 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from aiohttp import ClientConnectionError
+from eth_abi import decode, encode
+from hexbytes import HexBytes
+
+from app.env import settings
+from app.services.multicall import is_chunk_error, try_aggregate
+
+
+class FakeEth:
+    """Answers tryAggregate with the call data of every call, fails chunks over max_calls"""
+
+    def __init__(self, max_calls: int, error: Exception | None = None) -> None:
+        self.max_calls = max_calls
+        self.error = error
+        self.chunk_sizes: list[int] = []
+
+    async def call(self, transaction, block_identifier=None):
+        _, calls = decode(["bool", "(address,bytes)[]"], HexBytes(transaction["data"])[4:])
+        self.chunk_sizes.append(len(calls))
+        if len(calls) > self.max_calls:
+            raise self.error or ValueError({"code": -32000, "message": "out of gas"})
+        return HexBytes(encode(["(bool,bytes)[]"], [[(True, data) for _, data in calls]]))
+
+
+class FakeWeb3:
+    def __init__(self, eth: FakeEth) -> None:
+        self.eth = eth
+
+
+def _calls(n: int) -> list[tuple[str, bytes]]:
+    return [("0x" + "11" * 20, i.to_bytes(4, "big")) for i in range(n)]
+
+
+@patch.object(settings, "multicall_max_calls", 8)
+class TryAggregateTest(IsolatedAsyncioTestCase):
+    async def test_results_in_order_of_calls(self):
+        eth = FakeEth(max_calls=8)
+        results = await try_aggregate(FakeWeb3(eth), _calls(20), block_identifier=1)
+        self.assertEqual(results, [(True, data) for _, data in _calls(20)])
+        self.assertEqual(sorted(eth.chunk_sizes), [4, 8, 8])
+
+    async def test_chunk_over_gas_limit_is_bisected(self):
+        eth = FakeEth(max_calls=3)
+        results = await try_aggregate(FakeWeb3(eth), _calls(8), block_identifier=1)
+        self.assertEqual(results, [(True, data) for _, data in _calls(8)])
+        self.assertEqual(sorted(eth.chunk_sizes), [2, 2, 2, 2, 4, 4, 8])
+
+    async def test_transport_error_is_not_bisected(self):
+        for error in (ClientConnectionError("node is down"), asyncio.TimeoutError()):
+            eth = FakeEth(max_calls=0, error=error)
+            with self.assertRaises(type(error)):
+                await try_aggregate(FakeWeb3(eth), _calls(8), block_identifier=1)
+            self.assertEqual(eth.chunk_sizes, [8])
+
+    async def test_rate_limit_is_not_bisected(self):
+        error = ValueError({"code": 429, "message": "Too many requests"})
+        eth = FakeEth(max_calls=0, error=error)
+        with self.assertRaises(ValueError):
+            await try_aggregate(FakeWeb3(eth), _calls(8), block_identifier=1)
+        self.assertEqual(eth.chunk_sizes, [8])
+
+    async def test_single_failed_call_is_raised(self):
+        eth = FakeEth(max_calls=0)
+        with self.assertRaises(ValueError):
+            await try_aggregate(FakeWeb3(eth), _calls(2), block_identifier=1)
+        self.assertEqual(eth.chunk_sizes, [2, 1, 1])
+
+
+class IsChunkErrorTest(TestCase):
+    def test_errors(self):
+        for error, expected in (
+            (ValueError({"code": -32000, "message": "gas required exceeds allowance"}), True),
+            (ValueError({"code": -32000, "message": "execution reverted"}), True),
+            (ValueError({"code": -32000, "message": "returndata too large"}), True),
+            (ValueError({"code": -32005, "message": "rate limit exceeded"}), False),
+            (asyncio.TimeoutError(), False),
+            (OSError("connection reset"), False),
+        ):
+            self.assertEqual(is_chunk_error(error), expected, error)
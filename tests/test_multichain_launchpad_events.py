@@ -0,0 +1,103 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from app.models import LaunchpadEventProjectType
+from app.services.indexer import LogBatch
+from app.services.indexer.contracts import create_multichain_presale_indexer
+from app.services.launchpad import events as events_module
+
+CHAIN_ID = 56
+CONTRACT = "0x" + "cd" * 20
+USER = "0x" + "ab" * 20
+
+
+def _event(txn: int, block_number: int, **args) -> AttributeDict:
+    return AttributeDict(
+        {
+            "transactionHash": HexBytes(bytes([txn]) * 32),
+            "blockNumber": block_number,
+            "args": AttributeDict(args),
+        }
+    )
+
+
+class FakeEventsCrud:
+    saved: list = []
+    existing: set[str] = set()
+    deleted: list = []
+
+    def __init__(self, session) -> None:
+        pass
+
+    async def add_events(self, params) -> set[str]:
+        FakeEventsCrud.saved.extend(params)
+        return {x.txn_hash for x in params} - FakeEventsCrud.existing
+
+    async def delete_after_block(self, chain_id, block_number, project_type, project_id=None):
+        FakeEventsCrud.deleted.append((chain_id, block_number, project_type, project_id))
+
+
+class MultichainPresaleEventsTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        FakeEventsCrud.saved, FakeEventsCrud.existing, FakeEventsCrud.deleted = [], set(), []
+        patcher = patch.object(events_module, "LaunchpadContractEventsCrud", FakeEventsCrud)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.indexer = create_multichain_presale_indexer(CONTRACT, "project")
+        self.batch = LogBatch(None, CHAIN_ID, 100, 200)
+
+    async def _dispatch(self) -> dict[str, int]:
+        return await self.indexer.dispatch(
+            self.batch,
+            {
+                "multichain_presale.TokensBought": [
+                    _event(1, 101, user=USER, amount=1),
+                    _event(2, 105, user=USER, amount=2),
+                ],
+                "multichain_presale.AmountAndUSD": [
+                    _event(1, 101, user=USER, amount=10**18, usd=2 * 10**8),
+                    _event(2, 105, user=USER, amount=3 * 10**18, usd=10**8),
+                ],
+            },
+        )
+
+    async def test_every_tokens_bought_event_is_saved(self):
+        await self._dispatch()
+        self.assertEqual(
+            [(x.block_number, x.extra["amount"]) for x in FakeEventsCrud.saved],
+            [(101, str(10**18)), (105, str(3 * 10**18))],
+        )
+        self.assertTrue(
+            all(
+                x.project_type == LaunchpadEventProjectType.MULTICHAIN for x in FakeEventsCrud.saved
+            )
+        )
+
+    async def test_points_of_new_events_are_added_after_commit(self):
+        FakeEventsCrud.existing = {HexBytes(bytes([1]) * 32).hex()}
+        await self._dispatch()
+        with patch("app.tasks.save_multichain_launchpad_txn_and_add_points") as task:
+            for callback in self.batch.on_commit:
+                callback()
+        (call,) = task.apply_async.call_args_list
+        self.assertEqual(call.kwargs["kwargs"]["token_amount"], 3 * 10**18)
+        self.assertEqual(call.kwargs["kwargs"]["usd_rate"], 1)
+        self.assertEqual(call.kwargs["kwargs"]["presale_contract_address"], CONTRACT)
+
+    async def test_tokens_bought_without_amount_and_usd_is_skipped(self):
+        n_events = await self.indexer.dispatch(
+            self.batch, {"multichain_presale.TokensBought": [_event(1, 101, user=USER, amount=1)]}
+        )
+        self.assertEqual(n_events, {"multichain_presale.TokensBought": 1})
+        self.assertEqual(FakeEventsCrud.saved, [])
+        self.assertEqual(self.batch.on_commit, [])
+
+    async def test_roll_back_only_events_of_the_project(self):
+        await self.indexer.roll_back(None, CHAIN_ID, 150)
+        self.assertEqual(
+            FakeEventsCrud.deleted,
+            [(CHAIN_ID, 150, LaunchpadEventProjectType.MULTICHAIN, "project")],
+        )
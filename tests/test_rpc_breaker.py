@@ -0,0 +1,114 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.env import settings
+from app.services.rpc.breaker import BreakerState, CircuitBreaker
+
+
+@patch.object(settings, "rpc_breaker_consecutive_failures", 3)
+@patch.object(settings, "rpc_breaker_min_requests", 10)
+@patch.object(settings, "rpc_breaker_error_rate", 0.5)
+@patch.object(settings, "rpc_breaker_open_seconds", 30)
+@patch.object(settings, "rpc_breaker_max_open_seconds", 100)
+class CircuitBreakerTest(TestCase):
+    def _open(self, breaker: CircuitBreaker) -> float:
+        for _ in range(2):
+            self.assertIsNone(breaker.record_failure())
+        return breaker.record_failure()
+
+    def _half_open_time(self, breaker: CircuitBreaker) -> float:
+        return breaker.open_until + 1
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker()
+        self.assertEqual(self._open(breaker), 30)
+        self.assertEqual(breaker.state(time.monotonic()), BreakerState.OPEN)
+        self.assertFalse(breaker.allows_request(time.monotonic()))
+
+    def test_success_resets_consecutive_failures(self):
+        breaker = CircuitBreaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        self.assertIsNone(breaker.record_failure())
+        self.assertEqual(breaker.state(time.monotonic()), BreakerState.CLOSED)
+
+    def test_opens_on_error_rate(self):
+        breaker = CircuitBreaker()
+        for _ in range(4):
+            breaker.record_success()
+            breaker.record_failure()
+        breaker.record_success()
+        self.assertEqual(breaker.record_failure(), 30)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        now = self._half_open_time(breaker)
+        self.assertEqual(breaker.state(now), BreakerState.HALF_OPEN)
+        self.assertTrue(breaker.acquire_probe(now))
+        self.assertFalse(breaker.acquire_probe(now))
+        self.assertFalse(breaker.allows_request(now))
+
+    def test_probe_success_closes(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        now = self._half_open_time(breaker)
+        breaker.acquire_probe(now)
+        self.assertTrue(breaker.record_success(is_probe=True))
+        self.assertEqual(breaker.state(now), BreakerState.CLOSED)
+        self.assertFalse(breaker.probe_in_flight)
+
+    def test_other_request_success_does_not_close(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        now = self._half_open_time(breaker)
+        breaker.acquire_probe(now)
+        # e.g. a request sent before the breaker has opened
+        self.assertFalse(breaker.record_success())
+        self.assertEqual(breaker.state(now), BreakerState.HALF_OPEN)
+        self.assertTrue(breaker.probe_in_flight)
+
+    def test_other_request_failure_keeps_probe(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        now = self._half_open_time(breaker)
+        breaker.acquire_probe(now)
+        self.assertIsNone(breaker.record_failure())
+        self.assertTrue(breaker.probe_in_flight)
+
+    def test_probe_failure_opens_for_longer(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        now = self._half_open_time(breaker)
+        breaker.acquire_probe(now)
+        self.assertEqual(breaker.record_failure(is_probe=True), 60)
+        self.assertFalse(breaker.probe_in_flight)
+        breaker.open_until = 0
+        breaker.acquire_probe(time.monotonic())
+        self.assertEqual(breaker.record_failure(is_probe=True), 100)
+
+    def test_open_period_is_capped_after_many_failures(self):
+        breaker = CircuitBreaker()
+        self._open(breaker)
+        periods = []
+        for _ in range(2000):
+            breaker.open_until = 0
+            breaker.acquire_probe(time.monotonic())
+            periods.append(breaker.record_failure(is_probe=True))
+        self.assertEqual(periods[:3], [60, 100, 100])
+        self.assertEqual(set(periods[1:]), {100})
+        self.assertEqual(breaker.times_opened, 2001)
+
+    def test_trip_does_not_shorten_open_period(self):
+        breaker = CircuitBreaker()
+        self.assertTrue(breaker.trip(60))
+        self.assertFalse(breaker.trip(10))
+        self.assertEqual(breaker.times_opened, 1)
+
+    def test_close(self):
+        breaker = CircuitBreaker()
+        breaker.trip(60)
+        breaker.close()
+        self.assertEqual(breaker.state(time.monotonic()), BreakerState.CLOSED)
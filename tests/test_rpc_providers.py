@@ -0,0 +1,81 @@
+import asyncio
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.env import settings
+from app.services.rpc.providers import (
+    ChainConnectionPool,
+    PooledHTTPProvider,
+    _is_batch_not_supported_error,
+)
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.stats_by_host = {}
+        self.n_posts = 0
+
+    async def post(self, endpoint_uri: str, data: bytes, **kwargs) -> bytes:
+        self.n_posts += 1
+        request = json.loads(data)
+        requests = request if isinstance(request, list) else [request]
+        responses = [{"jsonrpc": "2.0", "id": x["id"], "result": x["method"]} for x in requests]
+        return json.dumps(responses if isinstance(request, list) else responses[0]).encode()
+
+
+@patch.object(settings, "rpc_batch_max_size", 10)
+class PooledHTTPProviderTest(TestCase):
+    def test_batch_state_of_a_closed_loop_is_reset(self):
+        pool = FakePool()
+        provider = PooledHTTPProvider("http://node", pool)
+
+        async def leave_pending_flush():
+            # e.g. a celery task which finished while its request was waiting for the window
+            provider._batch_loop = asyncio.get_running_loop()
+            provider._flush_handle = asyncio.get_running_loop().call_later(60, provider._flush)
+
+        async def make_requests():
+            return await asyncio.wait_for(
+                asyncio.gather(
+                    provider.make_request("eth_chainId", []),
+                    provider.make_request("eth_blockNumber", []),
+                ),
+                timeout=1,
+            )
+
+        asyncio.run(leave_pending_flush())
+        responses = asyncio.run(make_requests())
+        self.assertEqual([x["result"] for x in responses], ["eth_chainId", "eth_blockNumber"])
+        # the requests of one iteration of the loop are sent together
+        self.assertEqual(pool.n_posts, 1)
+        self.assertEqual(asyncio.run(make_requests())[0]["result"], "eth_chainId")
+
+    def test_batch_not_supported_errors(self):
+        for error, expected in (
+            ({"code": -32600, "message": "Batch requests are not supported"}, True),
+            ({"code": -32000, "message": "batch requests are disabled for this endpoint"}, True),
+            ({"code": -32601, "message": "Batch requests are not available on your plan"}, True),
+            ("batch request is not supported", True),
+            ({"code": -32005, "message": "batch size exceeds the rate limit"}, False),
+            ({"code": -32600, "message": "batch size too large"}, False),
+            ({"code": 429, "message": "Batch requests are not supported"}, False),
+            ({"code": -32000, "message": "execution reverted"}, False),
+        ):
+            self.assertEqual(_is_batch_not_supported_error({"error": error}), expected, error)
+
+
+class ChainConnectionPoolTest(TestCase):
+    def test_session_of_a_closed_loop_is_closed(self):
+        pool = ChainConnectionPool(1, limit=10, limit_per_host=5)
+
+        async def get_session():
+            return await pool._get_session()
+
+        first = asyncio.run(get_session())
+        second = asyncio.run(get_session())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(pool.sessions_created, 2)
+        asyncio.run(pool.close())
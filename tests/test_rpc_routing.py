@@ -0,0 +1,122 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from aiohttp import ClientError
+
+from app.env import settings
+from app.services.rpc.breaker import BreakerState
+from app.services.rpc.routing import EndpointRouter, NoEndpointsError, RoutedProvider, RpcEndpoint
+
+CHAIN_ID = 81457
+
+
+class FakeProvider:
+    def __init__(self, delay: float = 0, chain_id: int = CHAIN_ID) -> None:
+        self.delay = delay
+        self.chain_id = chain_id
+        self.methods: list[str] = []
+
+    async def make_request(self, method, params):
+        self.methods.append(method)
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": hex(self.chain_id)}
+        await asyncio.sleep(self.delay)
+        return {"jsonrpc": "2.0", "id": 1, "result": self.delay}
+
+
+class FailingProvider(FakeProvider):
+    async def make_request(self, method, params):
+        response = await super().make_request(method, params)
+        if method == "eth_chainId":
+            return response
+        raise ClientError("connection reset")
+
+
+def _half_open(endpoint: RpcEndpoint) -> None:
+    endpoint.breaker.times_opened = 1
+    endpoint.breaker.open_until = 0
+
+
+@patch.object(settings, "rpc_hedging_enabled", True)
+@patch.object(settings, "rpc_hedge_default_delay_seconds", 0.01)
+@patch.object(settings, "rpc_hedge_min_delay_seconds", 0.001)
+class RoutedProviderTest(IsolatedAsyncioTestCase):
+    async def _make_request_half_opening(
+        self, provider: RoutedProvider, endpoint: RpcEndpoint
+    ) -> dict:
+        """The endpoint becomes half-open while the request waits for the first one"""
+        with patch("random.choices", lambda candidates, weights: [candidates[0]]):
+            request = asyncio.create_task(provider.make_request("eth_call", []))
+            await asyncio.sleep(0.001)
+            _half_open(endpoint)
+            return await request
+
+    def _create(self, *providers: FakeProvider) -> tuple[RoutedProvider, list[RpcEndpoint]]:
+        endpoints = [RpcEndpoint(f"e{i}", p, priority=i) for i, p in enumerate(providers)]
+        return RoutedProvider(EndpointRouter(CHAIN_ID, endpoints), CHAIN_ID), endpoints
+
+    async def test_hedge_is_sent_as_probe_of_half_open_endpoint(self):
+        provider, (primary, secondary) = self._create(FakeProvider(0.2), FakeProvider(0))
+        response = await self._make_request_half_opening(provider, secondary)
+        self.assertEqual(response["result"], 0)
+        self.assertEqual(provider.router.hedged_requests, 1)
+        self.assertEqual(secondary.breaker.state(0), BreakerState.CLOSED)
+        self.assertFalse(secondary.breaker.probe_in_flight)
+
+    async def test_lost_hedge_probe_is_released(self):
+        provider, (primary, secondary) = self._create(FakeProvider(0.05), FakeProvider(1))
+        response = await self._make_request_half_opening(provider, secondary)
+        self.assertEqual(response["result"], 0.05)
+        self.assertEqual(provider.router.hedged_requests, 1)
+        self.assertEqual(secondary.breaker.state(0), BreakerState.HALF_OPEN)
+        self.assertFalse(secondary.breaker.probe_in_flight)
+        selected, is_probe = provider.router.select(exclude={primary.name})
+        self.assertIs(selected, secondary)
+        self.assertTrue(is_probe)
+
+    async def test_no_hedge_to_open_endpoint(self):
+        provider, (primary, secondary) = self._create(FakeProvider(0.05), FakeProvider(0))
+        secondary.breaker.trip(60)
+        response = await provider.make_request("eth_call", [])
+        self.assertEqual(response["result"], 0.05)
+        self.assertEqual(provider.router.hedged_requests, 0)
+        self.assertEqual(secondary.provider.methods, [])
+
+    async def test_cancel_of_other_request_keeps_probe(self):
+        provider, (endpoint,) = self._create(FakeProvider())
+        _half_open(endpoint)
+        self.assertEqual(provider.router.select(), (endpoint, True))
+        provider.router.record_cancel(endpoint, 0.1)
+        self.assertTrue(endpoint.breaker.probe_in_flight)
+        provider.router.record_cancel(endpoint, 0.1, is_probe=True)
+        self.assertFalse(endpoint.breaker.probe_in_flight)
+
+    async def test_endpoint_of_another_chain_is_disabled(self):
+        provider, (wrong, right) = self._create(FakeProvider(chain_id=1), FakeProvider())
+        with patch("random.choices", lambda candidates, weights: [candidates[0]]):
+            response = await provider.make_request("eth_blockNumber", [])
+        self.assertEqual(response["result"], 0)
+        self.assertIsNotNone(wrong.disabled_reason)
+        self.assertEqual(wrong.provider.methods, ["eth_chainId"])
+
+    async def test_check_chain_ids_fails_without_endpoints_of_chain(self):
+        provider, _ = self._create(FakeProvider(chain_id=1))
+        with self.assertRaises(NoEndpointsError):
+            await provider.check_chain_ids()
+
+    async def test_retries_stop_when_enabled_endpoints_are_tried(self):
+        provider, (wrong, failing) = self._create(FakeProvider(chain_id=1), FailingProvider())
+        provider.router.disable(wrong, "chain id is 1")
+        with patch.object(settings, "rpc_max_attempts", 3), self.assertRaises(ClientError):
+            await asyncio.wait_for(provider.make_request("eth_getBalance", []), timeout=1)
+        self.assertEqual(failing.provider.methods, ["eth_chainId", "eth_getBalance"])
+        self.assertEqual(wrong.provider.methods, [])
+
+    async def test_failover_skips_endpoint_disabled_during_request(self):
+        provider, (failing, wrong) = self._create(FailingProvider(), FakeProvider(chain_id=1))
+        with patch.object(settings, "rpc_max_attempts", 3), self.assertRaises(ClientError):
+            with patch("random.choices", lambda candidates, weights: [candidates[0]]):
+                await asyncio.wait_for(provider.make_request("eth_getBalance", []), timeout=1)
+        self.assertIsNotNone(wrong.disabled_reason)
+        self.assertEqual(failing.provider.methods, ["eth_chainId", "eth_getBalance"])